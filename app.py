@@ -1,8 +1,12 @@
 """Flask application entrypoint."""
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import logging
+from contextlib import nullcontext
 from core.container import container
+from core.request_trace import trace_request
+from core.settings import settings
+from core.validation import is_admin, validate_profile_request, validate_query, validate_queries
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,27 +17,25 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# Initialize services on startup
-try:
-    _ = container.storage
-    _ = container.embedding_provider
-    _ = container.query_transformer
-    logger.info("Service initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize service: {e}")
-    raise
-
-
-def _validate_query(data: dict | None) -> str:
-    """Validate and extract query from request data."""
-    if not data or "query" not in data:
-        raise ValueError("Missing 'query' field")
-    
-    query_text = data["query"]
-    if not isinstance(query_text, str) or not query_text.strip():
-        raise ValueError("Query must be a non-empty string")
-    
-    return query_text
+
+def _profiled(wsgi_app):
+    """Wrap the WSGI app so sampled requests are profiled end to end."""
+    def profiled_app(environ, start_response):
+        with container.profiler.request():
+            return wsgi_app(environ, start_response)
+    return profiled_app
+
+
+app.wsgi_app = _profiled(app.wsgi_app)
+
+# Build, ping and warm up the services in the background; the worker serves
+# /livez at once and /readyz once the models are loaded
+container.start()
+
+
+def _not_ready():
+    """503 for routes that need the services while they are still starting (see /readyz)."""
+    return jsonify({"error": "Service is not ready"}), 503, {"Retry-After": "1"}
 
 
 @app.route("/health")
@@ -46,18 +48,66 @@ def health():
     })
 
 
+@app.route("/livez")
+def livez():
+    """Liveness probe: the worker is up (does not touch any dependency)."""
+    return jsonify({"status": "alive"})
+
+
+@app.route("/readyz")
+def readyz():
+    """Readiness probe: 200 once every component is initialized and its model loaded, else 503."""
+    readiness = container.readiness()
+    return jsonify(readiness), 200 if readiness["ready"] else 503
+
+
+@app.route("/stats")
+def stats():
+    """Cache statistics endpoint."""
+    if not container.ready:
+        return _not_ready()
+    return jsonify(container.semantic_service.stats())
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics endpoint."""
+    if container.metrics is None:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    body, content_type = container.metrics.render(container.storage if container.ready else None)
+    return Response(body, content_type=content_type)
+
+
 @app.route("/query", methods=["POST"])
 def query():
     """
     Process a user query through the semantic cache.
     
+    With ?debug=1 and Authorization: Bearer ADMIN_TOKEN the response carries
+    a Server-Timing header and a "debug" block with per-stage durations and
+    the similarity seen at each tier (SERVER_TIMING adds the header to every
+    response).
+    
     Request JSON: {"query": "string"}
-    Response JSON: {"query": "string"}
+    Response JSON: {"query": "string", "path": "string", "degraded": "string" | null}
     """
+    if not container.ready:
+        return _not_ready()
+    debug = request.args.get("debug", "").lower() in ("1", "true", "yes")
+    # Debug traces expose similarity scores and cost extra lookups
+    if debug and not is_admin(request.headers.get("Authorization")):
+        return jsonify({"error": "debug requires an admin token"}), 401
     try:
-        query_text = _validate_query(request.get_json())
-        result_query = container.semantic_service.process_query(query_text)
-        return jsonify({"query": result_query})
+        query_text = validate_query(request.get_json())
+        with trace_request(debug=debug) if debug or settings.SERVER_TIMING else nullcontext() as trace:
+            result = container.semantic_service.route_query(query_text)
+        body = {"query": result.query, "path": result.path, "degraded": result.degraded}
+        if debug:
+            body["debug"] = trace.to_dict()
+        response = jsonify(body)
+        if trace is not None:
+            response.headers["Server-Timing"] = trace.server_timing()
+        return response
     
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -66,5 +116,48 @@ def query():
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+@app.route("/query/batch", methods=["POST"])
+def query_batch():
+    """
+    Process several user queries through the semantic cache in one pass.
+    
+    Request JSON: {"queries": ["string", ...]}
+    Response JSON: {"queries": ["string", ...]}
+    """
+    if not container.ready:
+        return _not_ready()
+    try:
+        queries = validate_queries(request.get_json())
+        result_queries = container.semantic_service.process_queries(queries)
+        return jsonify({"queries": result_queries})
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error processing query batch: {e}", exc_info=True)
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
+@app.route("/admin/profile", methods=["GET", "POST"])
+def admin_profile():
+    """
+    Inspect or start the sampling profiler (requires Authorization: Bearer ADMIN_TOKEN).
+    
+    Request JSON (POST): {"sample_rate": 0.05, "duration_seconds": 60}
+    Response JSON: profiler status of the worker that served the request
+    """
+    if not settings.ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled"}), 404
+    if not is_admin(request.headers.get("Authorization")):
+        return jsonify({"error": "Unauthorized"}), 401
+    if request.method == "GET":
+        return jsonify(container.profiler.status())
+    try:
+        sample_rate, duration = validate_profile_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(container.profiler.configure(sample_rate, duration))
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=True, use_reloader=True)
@@ -0,0 +1,194 @@
+"""ASGI application entrypoint (async serving path).
+
+Serves the same API as app.py, but /query runs SemanticService.aroute_query
+on the event loop, so one process can hold many in-flight queries while they
+wait on Ollama. Run with: uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import contextlib
+import logging
+from contextlib import nullcontext
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from core.container import container
+from core.request_trace import trace_request
+from core.settings import settings
+from core.validation import is_admin, validate_profile_request, validate_query, validate_queries
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Start initializing services in the background (see /readyz)."""
+    container.start()
+    yield
+
+
+class ProfilerMiddleware:
+    """Profile sampled HTTP requests end to end."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with container.profiler.request():
+            await self.app(scope, receive, send)
+
+
+async def _json_body(request: Request) -> dict | None:
+    """Parse the request body as JSON, returning None if it is not valid JSON."""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def _not_ready() -> JSONResponse:
+    """503 for routes that need the services while they are still starting (see /readyz)."""
+    return JSONResponse({"error": "Service is not ready"}, status_code=503, headers={"Retry-After": "1"})
+
+
+async def health(request: Request) -> JSONResponse:
+    """Health check endpoint."""
+    return JSONResponse({
+        "service": "Semantic Query Router",
+        "status": "healthy",
+        "version": "1.0.0"
+    })
+
+
+async def livez(request: Request) -> JSONResponse:
+    """Liveness probe: the process is up (does not touch any dependency)."""
+    return JSONResponse({"status": "alive"})
+
+
+async def readyz(request: Request) -> JSONResponse:
+    """Readiness probe: 200 once every component is initialized and its model loaded, else 503."""
+    readiness = container.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+
+async def stats(request: Request) -> JSONResponse:
+    """Cache statistics endpoint."""
+    if not container.ready:
+        return _not_ready()
+    return JSONResponse(container.semantic_service.stats())
+
+
+async def metrics(request: Request) -> Response:
+    """Prometheus metrics endpoint."""
+    if container.metrics is None:
+        return JSONResponse({"error": "Metrics are disabled"}, status_code=404)
+    body, content_type = await run_in_threadpool(container.metrics.render, container.storage if container.ready else None)
+    return Response(body, media_type=content_type)
+
+
+async def query(request: Request) -> JSONResponse:
+    """
+    Process a user query through the semantic cache.
+    
+    With ?debug=1 and Authorization: Bearer ADMIN_TOKEN the response carries
+    a Server-Timing header and a "debug" block with per-stage durations and
+    the similarity seen at each tier (SERVER_TIMING adds the header to every
+    response).
+    
+    Request JSON: {"query": "string"}
+    Response JSON: {"query": "string", "path": "string", "degraded": "string" | null}
+    """
+    # Building the services would block the event loop (and /livez) until Ollama is up
+    if not container.ready:
+        return _not_ready()
+    debug = request.query_params.get("debug", "").lower() in ("1", "true", "yes")
+    # Debug traces expose similarity scores and cost extra lookups
+    if debug and not is_admin(request.headers.get("Authorization")):
+        return JSONResponse({"error": "debug requires an admin token"}, status_code=401)
+    try:
+        query_text = validate_query(await _json_body(request))
+        with trace_request(debug=debug) if debug or settings.SERVER_TIMING else nullcontext() as trace:
+            result = await container.semantic_service.aroute_query(query_text)
+        body = {"query": result.query, "path": result.path, "degraded": result.degraded}
+        if debug:
+            body["debug"] = trace.to_dict()
+        headers = {"Server-Timing": trace.server_timing()} if trace is not None else None
+        return JSONResponse(body, headers=headers)
+    
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        logger.error(f"Error processing query: {e}", exc_info=True)
+        return JSONResponse({"error": f"Internal server error: {str(e)}"}, status_code=500)
+
+
+async def query_batch(request: Request) -> JSONResponse:
+    """
+    Process several user queries through the semantic cache in one pass.
+    
+    The batch path already makes one embed call per tier, so it runs the
+    synchronous implementation in a worker thread.
+    
+    Request JSON: {"queries": ["string", ...]}
+    Response JSON: {"queries": ["string", ...]}
+    """
+    if not container.ready:
+        return _not_ready()
+    try:
+        queries = validate_queries(await _json_body(request))
+        result_queries = await run_in_threadpool(container.semantic_service.process_queries, queries)
+        return JSONResponse({"queries": result_queries})
+    
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        logger.error(f"Error processing query batch: {e}", exc_info=True)
+        return JSONResponse({"error": f"Internal server error: {str(e)}"}, status_code=500)
+
+
+async def admin_profile(request: Request) -> JSONResponse:
+    """
+    Inspect or start the sampling profiler (requires Authorization: Bearer ADMIN_TOKEN).
+    
+    Request JSON (POST): {"sample_rate": 0.05, "duration_seconds": 60}
+    Response JSON: profiler status of the worker that served the request
+    """
+    if not settings.ADMIN_TOKEN:
+        return JSONResponse({"error": "Admin endpoints are disabled"}, status_code=404)
+    if not is_admin(request.headers.get("Authorization")):
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    if request.method == "GET":
+        return JSONResponse(container.profiler.status())
+    try:
+        sample_rate, duration = validate_profile_request(await _json_body(request))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(container.profiler.configure(sample_rate, duration))
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/livez", livez),
+        Route("/readyz", readyz),
+        Route("/stats", stats),
+        Route("/metrics", metrics),
+        Route("/query", query, methods=["POST"]),
+        Route("/query/batch", query_batch, methods=["POST"]),
+        Route("/admin/profile", admin_profile, methods=["GET", "POST"]),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+        Middleware(ProfilerMiddleware)
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,71 @@
+"""Compare first- and second-tier hit rates with and without alias rows.
+
+Replays a workload in which every query of the pairs file is asked several
+times (shuffled) against a fresh store, once storing only normalized queries
+and once also storing raw phrasings as alias rows. The query cache and
+lexical index are left out so every repeat reaches the vector store. Every
+second-tier hit or miss costs one LLM call ("transforms"); model outputs are
+memoized and warmed up first, so both runs see identical normalizations.
+
+Usage:
+    python -m benchmarks.alias_tiers
+    python -m benchmarks.alias_tiers --repeats 5 --alias-limit 8
+"""
+import argparse
+import random
+import tempfile
+from core.settings import settings
+from providers.caching_provider import CachingEmbeddingProvider
+from providers.ollama_provider import OllamaEmbeddingProvider
+from storage.numpy_store import NumpyStore
+from transformer.caching_transformer import CachingQueryTransformer
+from transformer.ollama_transformer import OllamaQueryTransformer
+from services.semantic_service import SemanticService
+from benchmarks.dimension_recall import DEFAULT_PAIRS, load_pairs
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pairs", default=DEFAULT_PAIRS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--alias-limit", type=int, default=settings.ALIAS_MAX_PER_ENTRY or 4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    queries = sorted({pair[key] for pair in load_pairs(args.pairs) for key in ("query_a", "query_b")})
+    workload = queries * args.repeats
+    random.Random(args.seed).shuffle(workload)
+    
+    embedding_provider = CachingEmbeddingProvider(
+        provider=OllamaEmbeddingProvider(model=settings.EMBEDDING_MODEL),
+        model=settings.EMBEDDING_MODEL
+    )
+    transformer = CachingQueryTransformer(transformer=OllamaQueryTransformer(model=settings.TRANSFORMER_MODEL))
+    for query in queries:
+        embedding_provider.create(query)
+        embedding_provider.create(transformer.transform(query))
+    
+    print(f"{len(queries)} distinct queries x {args.repeats} repeats")
+    print(f"{'aliases':>8} {'first tier':>11} {'alias hits':>11} {'second tier':>12} "
+          f"{'misses':>7} {'transforms':>11}")
+    for alias_limit in (0, args.alias_limit):
+        with tempfile.TemporaryDirectory() as directory:
+            service = SemanticService(
+                embedding_provider=embedding_provider,
+                storage=NumpyStore("bench", persist_directory=directory),
+                query_transformer=transformer,
+                similarity_threshold=settings.SIMILARITY_THRESHOLD,
+                high_confidence_threshold=settings.HIGH_CONFIDENCE_THRESHOLD,
+                alias_limit=alias_limit
+            )
+            for query in workload:
+                service.route_query(query)
+            tiers = service.stats()["tiers"]
+            print(f"{alias_limit:>8} {tiers['first_tier_hit_rate']:>11.1%} {tiers['alias_hits']:>11} "
+                  f"{tiers['second_tier_hit_rate']:>12.1%} {tiers['misses']:>7} "
+                  f"{tiers['second_tier_hits'] + tiers['misses']:>11}")
+
+
+if __name__ == "__main__":
+    main()
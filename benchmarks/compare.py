@@ -0,0 +1,78 @@
+"""Compare two benchmark runs recorded by benchmarks.report.write_results.
+
+Picks the last two records of the same benchmark in a results file (or the
+records of two given commits) and prints every latency percentile and
+throughput figure with its relative change. Exits with status 1 if any
+latency grew, or throughput dropped, by more than --tolerance.
+
+Usage:
+    python -m benchmarks.compare results/load.jsonl
+    python -m benchmarks.compare results/store.jsonl --benchmark store_chroma --base a1b2c3d --head e4f5a6b
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+HIGHER_IS_BETTER = ("throughput_rps", "load_rows_per_second", "first_tier_hit_rate")
+
+
+def flatten(results, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield (dotted path, value) for every comparable number in a results tree."""
+    if isinstance(results, dict):
+        for key, value in results.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(results, list):
+        for index, item in enumerate(results):
+            label = f"size={item['size']}" if isinstance(item, dict) and "size" in item else str(index)
+            yield from flatten(item, f"{prefix}[{label}]")
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        name = prefix.rsplit(".", 1)[-1]
+        if name in LATENCY_KEYS or name in HIGHER_IS_BETTER:
+            yield prefix, float(results)
+
+
+def select(records: List[Dict], benchmark: Optional[str], base: Optional[str], head: Optional[str]) -> Tuple[Dict, Dict]:
+    """Pick the base and head records to compare."""
+    benchmark = benchmark or records[-1]["benchmark"]
+    runs = [record for record in records if record["benchmark"] == benchmark]
+    if base or head:
+        by_commit = {record["commit"]: record for record in runs}
+        return by_commit[base or runs[-2]["commit"]], by_commit[head or runs[-1]["commit"]]
+    if len(runs) < 2:
+        raise SystemExit(f"Need two runs of {benchmark} to compare")
+    return runs[-2], runs[-1]
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("results", help="JSONL file written with --output")
+    parser.add_argument("--benchmark", help="Benchmark name (defaults to the last record's)")
+    parser.add_argument("--base", help="Commit of the baseline run")
+    parser.add_argument("--head", help="Commit of the run under test")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+    
+    with open(args.results, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    base, head = select(records, args.benchmark, args.base, args.head)
+    base_values = dict(flatten(base["results"]))
+    
+    print(f"{base['benchmark']}: {base['commit']} ({base['timestamp']}) -> {head['commit']} ({head['timestamp']})")
+    regressions = 0
+    for name, value in flatten(head["results"]):
+        previous = base_values.get(name)
+        if not previous:
+            continue
+        change = (value - previous) / previous
+        worse = -change if name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change
+        flag = "  REGRESSION" if worse > args.tolerance else ""
+        regressions += bool(flag)
+        print(f"{name:<48} {previous:>11.3f} {value:>11.3f} {change:>+8.1%}{flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
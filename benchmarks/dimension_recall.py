@@ -0,0 +1,121 @@
+"""Measure how reduced-dimension embeddings change the cache decision.
+
+For every labeled query pair the cache decision is "similarity >= threshold".
+Each reduced configuration is compared with the full-dimension decision
+(agreement recall/precision: does the reduced index still hit where the full
+index hits?) and with the human labels.
+
+The pairs file is JSONL with {"query_a": ..., "query_b": ..., "duplicate": bool}.
+
+Usage:
+    python -m benchmarks.dimension_recall
+    python -m benchmarks.dimension_recall --dimensions 128 256 --threshold 0.85
+    python -m benchmarks.dimension_recall --projection ./cache/pca256.npz --dimensions 256
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+import numpy as np
+from core.settings import settings
+from providers.caching_provider import CachingEmbeddingProvider
+from providers.ollama_provider import OllamaEmbeddingProvider
+from providers.reduced_dimension_provider import ReducedDimensionEmbeddingProvider
+
+DEFAULT_PAIRS = os.path.join(os.path.dirname(__file__), "data", "query_pairs.jsonl")
+
+
+def load_pairs(path: str) -> List[Dict]:
+    """Read labeled query pairs from a JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def pair_similarities(embeddings_a: np.ndarray, embeddings_b: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each row of embeddings_a with the same row of embeddings_b."""
+    a = embeddings_a / np.linalg.norm(embeddings_a, axis=1, keepdims=True)
+    b = embeddings_b / np.linalg.norm(embeddings_b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def decision_metrics(predicted: np.ndarray, expected: np.ndarray) -> Dict[str, float]:
+    """
+    Precision and recall of boolean cache decisions.
+    
+    Args:
+        predicted: Decisions under test
+        expected: Reference decisions (full-dimension search or labels)
+    
+    Returns:
+        Dictionary with precision, recall and accuracy
+    """
+    true_positives = int((predicted & expected).sum())
+    return {
+        "precision": true_positives / int(predicted.sum()) if predicted.any() else 1.0,
+        "recall": true_positives / int(expected.sum()) if expected.any() else 1.0,
+        "accuracy": float((predicted == expected).mean())
+    }
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pairs", default=DEFAULT_PAIRS)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[64, 128, 256, 512])
+    parser.add_argument("--threshold", type=float, default=settings.SIMILARITY_THRESHOLD)
+    parser.add_argument("--projection", help="PCA projection (.npz) to evaluate instead of truncation")
+    args = parser.parse_args()
+    
+    pairs = load_pairs(args.pairs)
+    labels = np.array([bool(pair["duplicate"]) for pair in pairs])
+    provider = CachingEmbeddingProvider(
+        provider=OllamaEmbeddingProvider(model=settings.EMBEDDING_MODEL),
+        model=settings.EMBEDDING_MODEL,
+        cache_path=settings.EMBEDDING_CACHE_PATH or None
+    )
+    full_a = np.asarray(provider.create_batch([pair["query_a"] for pair in pairs]), dtype=np.float32)
+    full_b = np.asarray(provider.create_batch([pair["query_b"] for pair in pairs]), dtype=np.float32)
+    full_decisions = pair_similarities(full_a, full_b) >= args.threshold
+    
+    print(f"{len(pairs)} pairs, threshold {args.threshold}, full dimension {full_a.shape[1]}")
+    print(f"{'dims':>6} {'vs full P/R':>14} {'vs labels P/R':>15} {'search us/row':>14}")
+    label_metrics = decision_metrics(full_decisions, labels)
+    print(f"{full_a.shape[1]:>6} {'-':>14} "
+          f"{label_metrics['precision']:>7.3f}/{label_metrics['recall']:.3f} "
+          f"{_search_cost(full_a):>14.3f}")
+    
+    for dimensions in args.dimensions:
+        if dimensions >= full_a.shape[1]:
+            continue
+        reducer = ReducedDimensionEmbeddingProvider(
+            provider=provider,
+            dimensions=dimensions,
+            method="pca" if args.projection else "truncate",
+            projection_path=args.projection
+        )
+        reduced_a = np.asarray(reducer.reduce(full_a.tolist()), dtype=np.float32)
+        reduced_b = np.asarray(reducer.reduce(full_b.tolist()), dtype=np.float32)
+        decisions = pair_similarities(reduced_a, reduced_b) >= args.threshold
+        
+        versus_full = decision_metrics(decisions, full_decisions)
+        versus_labels = decision_metrics(decisions, labels)
+        print(f"{dimensions:>6} "
+              f"{versus_full['precision']:>7.3f}/{versus_full['recall']:.3f} "
+              f"{versus_labels['precision']:>7.3f}/{versus_labels['recall']:.3f} "
+              f"{_search_cost(reduced_a):>14.3f}")
+
+
+def _search_cost(sample: np.ndarray, rows: int = 100_000, repeats: int = 5) -> float:
+    """Time a brute-force scan of ``rows`` vectors of the sample's dimension (us per row)."""
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((rows, sample.shape[1]), dtype=np.float32)
+    query = sample[0]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        matrix @ query
+    return (time.perf_counter() - start) / repeats / rows * 1e6
+
+
+if __name__ == "__main__":
+    main()
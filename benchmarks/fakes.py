@@ -0,0 +1,313 @@
+"""Deterministic stand-ins for Ollama with configurable latency.
+
+The fake embedding is a normalized sum of per-word random vectors (seeded
+by the word), so texts with the same words embed identically and the
+similarity of two texts tracks their word overlap, the property the cache
+tiers rely on. The fake transformer is the rule-based normalizer plus a
+simulated LLM delay.
+"""
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from providers.base import EmbeddingProvider
+from storage.base import VectorStore
+from transformer.base import QueryTransformer
+from transformer.rule_transformer import RuleBasedQueryTransformer
+from services.lexical_index import tokenize
+from benchmarks.report import StageTimer
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution.
+    
+    Specs are "constant:MS", "uniform:LOW_MS:HIGH_MS" or
+    "lognormal:MEDIAN_MS:SIGMA" (long right tail, like model servers).
+    """
+    
+    def __init__(self, spec: str = "constant:0", seed: int = 0):
+        """
+        Initialize latency model.
+        
+        Args:
+            spec: Distribution spec (see class docstring)
+            seed: Seed of the sample sequence
+        
+        Raises:
+            ValueError: If the spec is malformed
+        """
+        kind, *values = spec.split(":")
+        try:
+            self.values = [float(value) for value in values]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec: {spec}") from None
+        expected = {"constant": 1, "uniform": 2, "lognormal": 2}.get(kind)
+        if expected is None or len(self.values) != expected:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def sample(self) -> float:
+        """Draw one latency in seconds."""
+        if self.kind == "constant":
+            return self.values[0] / 1000
+        with self._lock:
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.values) / 1000
+            median_ms, sigma = self.values
+            return self._rng.lognormvariate(np.log(median_ms), sigma) / 1000 if median_ms > 0 else 0.0
+    
+    def sleep(self) -> None:
+        """Block for one sampled latency."""
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def asleep(self) -> None:
+        """Await one sampled latency."""
+        delay = self.sample()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """Bag-of-words embedding provider with simulated model latency."""
+    
+    def __init__(
+        self,
+        dimension: int = 256,
+        latency: Optional[LatencyModel] = None,
+        timer: Optional[StageTimer] = None,
+        seed: int = 0
+    ):
+        """
+        Initialize fake provider.
+        
+        Args:
+            dimension: Embedding dimension
+            latency: Delay of each create/create_batch call
+            timer: Collector the "embed" stage is recorded in
+            seed: Seed of the word vectors
+        """
+        self.dimension = dimension
+        self.latency = latency or LatencyModel()
+        self.timer = timer
+        self.seed = seed
+        self._word_vectors: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+    
+    def _word_vector(self, word: str) -> np.ndarray:
+        """Random unit vector determined by the word and seed."""
+        with self._lock:
+            vector = self._word_vectors.get(word)
+            if vector is None:
+                digest = hashlib.blake2b(f"{self.seed}:{word}".encode("utf-8"), digest_size=8).digest()
+                vector = np.random.default_rng(int.from_bytes(digest, "little")).standard_normal(self.dimension)
+                vector /= np.linalg.norm(vector)
+                self._word_vectors[word] = vector
+            return vector
+    
+    def embed(self, text: str) -> List[float]:
+        """Embed text without any delay."""
+        words = sorted(tokenize(text)) or [text]
+        vector = np.sum([self._word_vector(word) for word in words], axis=0)
+        return (vector / np.linalg.norm(vector)).tolist()
+    
+    def _record(self, start: float) -> None:
+        """Record the "embed" stage since start, if a timer is set."""
+        if self.timer is not None:
+            self.timer.record("embed", time.perf_counter() - start)
+    
+    def create(self, text: str) -> List[float]:
+        """
+        Embed text after one simulated model delay.
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Unit-length embedding vector
+        """
+        start = time.perf_counter()
+        self.latency.sleep()
+        embedding = self.embed(text)
+        self._record(start)
+        return embedding
+    
+    def create_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts after one simulated model delay for the whole batch.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            Unit-length embedding vectors in input order
+        """
+        start = time.perf_counter()
+        self.latency.sleep()
+        embeddings = [self.embed(text) for text in texts]
+        self._record(start)
+        return embeddings
+    
+    async def acreate(self, text: str) -> List[float]:
+        """
+        Async version of create (the delay does not block the event loop).
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Unit-length embedding vector
+        """
+        start = time.perf_counter()
+        await self.latency.asleep()
+        embedding = self.embed(text)
+        self._record(start)
+        return embedding
+    
+    async def acreate_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Async version of create_batch.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            Unit-length embedding vectors in input order
+        """
+        start = time.perf_counter()
+        await self.latency.asleep()
+        embeddings = [self.embed(text) for text in texts]
+        self._record(start)
+        return embeddings
+    
+    def ping(self) -> bool:
+        """
+        Check the provider is healthy.
+        
+        Returns:
+            Always True (there is no model server)
+        """
+        return True
+
+
+class FakeQueryTransformer(QueryTransformer):
+    """Rule-based normalizer with simulated LLM latency."""
+    
+    def __init__(self, latency: Optional[LatencyModel] = None, timer: Optional[StageTimer] = None):
+        """
+        Initialize fake transformer.
+        
+        Args:
+            latency: Delay of each transform call
+            timer: Collector the "transform" stage is recorded in
+        """
+        self.latency = latency or LatencyModel()
+        self.timer = timer
+        self.rules = RuleBasedQueryTransformer()
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def _record(self, start: float) -> None:
+        """Count one call and record the "transform" stage since start, if a timer is set."""
+        with self._lock:
+            self.calls += 1
+        if self.timer is not None:
+            self.timer.record("transform", time.perf_counter() - start)
+    
+    def transform(self, query: str) -> str:
+        """
+        Normalize a query with the rule-based transformer after one simulated LLM delay.
+        
+        Args:
+            query: Raw user query
+        
+        Returns:
+            Normalized query
+        """
+        start = time.perf_counter()
+        self.latency.sleep()
+        normalized_query = self.rules.transform(query)
+        self._record(start)
+        return normalized_query
+    
+    async def atransform(self, query: str) -> str:
+        """
+        Async version of transform (the delay does not block the event loop).
+        
+        Args:
+            query: Raw user query
+        
+        Returns:
+            Normalized query
+        """
+        start = time.perf_counter()
+        await self.latency.asleep()
+        normalized_query = self.rules.transform(query)
+        self._record(start)
+        return normalized_query
+    
+    def ping(self) -> bool:
+        """
+        Check the transformer is healthy.
+        
+        Returns:
+            Always True (there is no LLM)
+        """
+        return True
+
+
+class TimedStore(VectorStore):
+    """Vector store decorator recording "find" and "put" stage durations."""
+    
+    def __init__(self, storage: VectorStore, timer: StageTimer):
+        """
+        Initialize decorator.
+        
+        Args:
+            storage: Store every call is delegated to
+            timer: Collector the "find" and "put" stages are recorded in
+        """
+        self.storage = storage
+        self.timer = timer
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        """Embedding dimension of the wrapped store."""
+        return self.storage.dimension
+    
+    def ping(self) -> bool:
+        """Check the wrapped store is healthy (see VectorStore.ping)."""
+        return self.storage.ping()
+    
+    def put(self, query, embedding, metadata=None):
+        """Store an embedding, timed as "put" (see VectorStore.put)."""
+        with self.timer.time("put"):
+            return self.storage.put(query=query, embedding=embedding, metadata=metadata)
+    
+    def put_batch(self, queries, embeddings, metadatas=None):
+        """Store several embeddings, timed as one "put" (see VectorStore.put_batch)."""
+        with self.timer.time("put"):
+            return self.storage.put_batch(queries=queries, embeddings=embeddings, metadatas=metadatas)
+    
+    def find(self, embedding, threshold=0.85, top_k=10, record_hits=True):
+        """Find similar embeddings, timed as "find" (see VectorStore.find)."""
+        with self.timer.time("find"):
+            return self.storage.find(embedding=embedding, threshold=threshold, top_k=top_k, record_hits=record_hits)
+    
+    def find_batch(self, embeddings, threshold=0.85, top_k=10):
+        """Search for several vectors, timed as one "find" (see VectorStore.find_batch)."""
+        with self.timer.time("find"):
+            return self.storage.find_batch(embeddings=embeddings, threshold=threshold, top_k=top_k)
+    
+    def stats(self) -> Optional[Dict]:
+        """Return the wrapped store's stats, or None if it has none."""
+        storage_stats = getattr(self.storage, "stats", None)
+        return storage_stats() if callable(storage_stats) else None
@@ -0,0 +1,200 @@
+"""Open-loop load generator for /query.
+
+Requests arrive as a Poisson process at a fixed rate, independently of how
+fast earlier requests complete, so a slow server builds a queue instead of
+slowing the generator down; latency is measured from each request's
+scheduled arrival (no coordinated omission).
+
+By default the service runs in-process on the async path with deterministic
+fake models (benchmarks.fakes), so per-stage timings and tier hit rates are
+reported and runs are reproducible. With --url the same workload is sent to
+a running server over HTTP instead.
+
+Usage:
+    python -m benchmarks.load --rate 200 --duration 10
+    python -m benchmarks.load --transform-latency lognormal:800:0.6 --latency-budget-ms 300
+    python -m benchmarks.load --url http://localhost:8000 --rate 50 --output results/load.jsonl
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from core.settings import settings
+from storage.chroma_store import ChromaStore
+from storage.numpy_store import NumpyStore
+from services.lexical_index import LexicalIndex
+from services.query_cache import QueryCache
+from services.semantic_service import SemanticService
+from benchmarks.fakes import FakeEmbeddingProvider, FakeQueryTransformer, LatencyModel, TimedStore
+from benchmarks.report import StageTimer, format_table, percentiles, write_results
+from benchmarks.workload import ZipfWorkload
+
+Sender = Callable[[str], Awaitable[str]]
+
+
+async def run_open_loop(send: Sender, queries: List[str], rate: float, seed: int = 0) -> Tuple[List[Tuple[float, str]], float]:
+    """
+    Send queries at Poisson arrival times.
+    
+    Args:
+        send: Coroutine function that processes one query and returns its path
+        queries: Query texts in arrival order
+        rate: Mean arrival rate in requests per second
+        seed: Seed of the inter-arrival times
+    
+    Returns:
+        (latency in seconds, path or "error") per request, and the wall time in seconds
+    """
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    start = loop.time()
+    
+    async def timed(query: str, scheduled: float) -> Tuple[float, str]:
+        try:
+            path = await send(query)
+        except Exception as e:
+            path = f"error:{type(e).__name__}"
+        return loop.time() - scheduled, path
+    
+    tasks = []
+    arrival = start
+    for query in queries:
+        arrival += rng.expovariate(rate)
+        delay = arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(timed(query, arrival)))
+    results = await asyncio.gather(*tasks)
+    return results, loop.time() - start
+
+
+def build_service(args, timer: StageTimer, directory: str) -> SemanticService:
+    """Wire a SemanticService over fake models and a real vector store."""
+    embedding_provider = FakeEmbeddingProvider(
+        dimension=args.dim,
+        latency=LatencyModel(args.embed_latency, seed=args.seed),
+        timer=timer,
+        seed=args.seed
+    )
+    transformer = FakeQueryTransformer(
+        latency=LatencyModel(args.transform_latency, seed=args.seed + 1),
+        timer=timer
+    )
+    if args.store == "chroma":
+        storage = ChromaStore("bench", persist_directory=directory)
+    else:
+        storage = NumpyStore("bench", persist_directory=directory)
+    return SemanticService(
+        embedding_provider=embedding_provider,
+        storage=TimedStore(storage, timer),
+        query_transformer=transformer,
+        similarity_threshold=settings.SIMILARITY_THRESHOLD,
+        high_confidence_threshold=settings.HIGH_CONFIDENCE_THRESHOLD,
+        query_cache=QueryCache(max_size=args.query_cache_size) if args.query_cache_size > 0 else None,
+        storage_executor=ThreadPoolExecutor(max_workers=settings.STORAGE_THREADS, thread_name_prefix="storage"),
+        lexical_index=LexicalIndex() if args.lexical else None,
+        latency_budget_ms=args.latency_budget_ms,
+        alias_limit=args.aliases
+    )
+
+
+def http_sender(url: str) -> Tuple[Sender, Callable[[], Awaitable[None]]]:
+    """Sender posting to a running server, plus a function closing its client."""
+    import httpx
+    client = httpx.AsyncClient(base_url=url, timeout=None, limits=httpx.Limits(max_connections=None))
+    
+    async def send(query: str) -> str:
+        response = await client.post("/query", json={"query": query})
+        response.raise_for_status()
+        return response.json().get("path", "unknown")
+    
+    return send, client.aclose
+
+
+def summarize(latencies: List[Tuple[float, str]], wall_seconds: float, timer: Optional[StageTimer],
+              service: Optional[SemanticService]) -> Dict:
+    """Collect throughput, latency percentiles, paths and tier hit rates."""
+    paths = Counter(path for _, path in latencies)
+    ok = [latency for latency, path in latencies if not path.startswith("error")]
+    stages = {"total": percentiles(ok)}
+    if timer is not None:
+        stages.update(timer.summary())
+    results = {
+        "requests": len(latencies),
+        "errors": len(latencies) - len(ok),
+        "throughput_rps": round(len(ok) / wall_seconds, 2) if wall_seconds else 0.0,
+        "stages": stages,
+        "paths": dict(paths)
+    }
+    if service is not None:
+        results["tiers"] = service.stats()["tiers"]
+        results["transforms"] = service.query_transformer.calls
+    return results
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=100.0, help="Arrivals per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of arrivals")
+    parser.add_argument("--intents", type=int, default=1000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of intent popularity")
+    parser.add_argument("--paraphrase-rate", type=float, default=0.3)
+    parser.add_argument("--embed-latency", default="lognormal:15:0.4", help="Fake embedding latency spec")
+    parser.add_argument("--transform-latency", default="lognormal:400:0.5", help="Fake LLM latency spec")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--store", choices=["numpy", "chroma"], default="numpy")
+    parser.add_argument("--query-cache-size", type=int, default=settings.QUERY_CACHE_SIZE)
+    parser.add_argument("--lexical", action="store_true", help="Enable the lexical index")
+    parser.add_argument("--aliases", type=int, default=settings.ALIAS_MAX_PER_ENTRY)
+    parser.add_argument("--latency-budget-ms", type=float, default=settings.LATENCY_BUDGET_MS)
+    parser.add_argument("--url", help="Send to a running server instead of the in-process service")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Append the results as a JSON line to this file")
+    args = parser.parse_args()
+    
+    queries = ZipfWorkload(args.intents, args.zipf, args.paraphrase_rate, args.seed).queries(
+        int(args.rate * args.duration)
+    )
+    
+    with tempfile.TemporaryDirectory() as directory:
+        timer = service = close = None
+        if args.url:
+            send, close = http_sender(args.url)
+        else:
+            timer = StageTimer()
+            service = build_service(args, timer, directory)
+            
+            async def send(query: str) -> str:
+                return (await service.aroute_query(query)).path
+        
+        async def run():
+            try:
+                return await run_open_loop(send, queries, args.rate, args.seed)
+            finally:
+                if close is not None:
+                    await close()
+        
+        started = time.time()
+        latencies, wall_seconds = asyncio.run(run())
+        results = summarize(latencies, wall_seconds, timer, service)
+    
+    print(f"{results['requests']} requests at {args.rate:g}/s offered, "
+          f"{results['throughput_rps']:g}/s completed, {results['errors']} errors "
+          f"({time.time() - started:.1f}s)")
+    print(format_table(results["stages"]))
+    print("paths: " + ", ".join(f"{path}={count}" for path, count in sorted(results["paths"].items())))
+    if "tiers" in results:
+        tiers = results["tiers"]
+        print(f"first tier {tiers['first_tier_hit_rate']:.1%}, second tier {tiers['second_tier_hit_rate']:.1%}, "
+              f"{results['transforms']} transforms")
+    if args.output:
+        write_results(args.output, "load", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measure how quantized NumPy store modes change the cache-hit decision.
+
+Builds a store of synthetic unit vectors, then queries it with perturbed
+copies of stored rows (at noise levels that put similarities on both sides of
+the threshold) and with unrelated vectors. Each quantized mode opens the same
+files and is compared with the exact float scan on the decision the service
+makes: whether the best match clears the threshold, and which row it is.
+
+Usage:
+    python -m benchmarks.quantization_recall
+    python -m benchmarks.quantization_recall --rows 1000000 --dim 256 --rerank 256
+"""
+import argparse
+import tempfile
+import time
+from typing import List
+import numpy as np
+from core.settings import settings
+from storage.numpy_store import NumpyStore
+
+
+def make_queries(rng: np.random.Generator, vectors: np.ndarray, count: int) -> np.ndarray:
+    """Perturb random stored rows at mixed noise levels, plus some unrelated vectors."""
+    rows = rng.integers(0, len(vectors), size=count)
+    # Per-dimension noise std u gives cosine ~ 1 / sqrt(1 + u^2): 1.0 down to ~0.64
+    noise = rng.uniform(0.0, 1.2, size=(count, 1))
+    queries = vectors[rows] + noise * rng.standard_normal((count, vectors.shape[1]))
+    unrelated = rng.standard_normal((count // 4, vectors.shape[1]))
+    return np.vstack([queries, unrelated]).astype(np.float32)
+
+
+def timed_find(store: NumpyStore, queries: List[List[float]], threshold: float):
+    """Run one find() per query and return the results and mean latency in ms."""
+    start = time.perf_counter()
+    results = [store.find(embedding=query, threshold=threshold, top_k=1) for query in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--threshold", type=float, default=settings.SIMILARITY_THRESHOLD)
+    parser.add_argument("--rerank", type=int, default=settings.NUMPY_STORE_RERANK_CANDIDATES)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.rows, args.dim), dtype=np.float32)
+    queries = make_queries(rng, vectors, args.queries).tolist()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        exact = NumpyStore("bench", persist_directory=directory, initial_capacity=args.rows)
+        for start in range(0, args.rows, 10_000):
+            chunk = vectors[start:start + 10_000]
+            exact.put_batch([f"q{start + i}" for i in range(len(chunk))], chunk.tolist())
+        reference, exact_ms = timed_find(exact, queries, args.threshold)
+        reference_hits = np.array([bool(r) for r in reference])
+        
+        print(f"{args.rows} rows x {args.dim} dims, {len(queries)} queries, "
+              f"threshold {args.threshold}, {reference_hits.mean():.0%} hits")
+        print(f"{'mode':>7} {'index MB':>9} {'ms/query':>9} {'hit recall':>11} "
+              f"{'false hits':>11} {'same row':>9}")
+        print(f"{'none':>7} {exact.stats()['matrix_bytes'] / 1e6:>9.1f} {exact_ms:>9.2f} "
+              f"{1.0:>11.3f} {0:>11} {1.0:>9.3f}")
+        
+        for mode in ("int8", "binary"):
+            store = NumpyStore(
+                "bench",
+                persist_directory=directory,
+                quantization=mode,
+                rerank_candidates=args.rerank
+            )
+            results, ms = timed_find(store, queries, args.threshold)
+            hits = np.array([bool(r) for r in results])
+            same_row = np.mean([
+                bool(a) == bool(b) and (not a or a[0]["id"] == b[0]["id"])
+                for a, b in zip(results, reference)
+            ])
+            recall = (hits & reference_hits).sum() / max(reference_hits.sum(), 1)
+            print(f"{mode:>7} {store.stats()['index_bytes'] / 1e6:>9.1f} {ms:>9.2f} "
+                  f"{recall:>11.3f} {int((hits & ~reference_hits).sum()):>11} {same_row:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Latency summaries and machine-readable benchmark results."""
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+
+def percentiles(samples: Iterable[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples.
+    
+    Args:
+        samples: Durations in seconds
+    
+    Returns:
+        Count plus mean, p50, p95, p99 and max in milliseconds
+    """
+    values = np.asarray(list(samples), dtype=np.float64) * 1000
+    if not len(values):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(len(values)),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+
+class StageTimer:
+    """Thread-safe collector of per-stage durations."""
+    
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+    
+    def record(self, stage: str, seconds: float) -> None:
+        """Add one duration sample for a stage."""
+        with self._lock:
+            self._samples[stage].append(seconds)
+    
+    @contextmanager
+    def time(self, stage: str):
+        """Record the duration of the with-block under a stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Percentiles of every stage."""
+        with self._lock:
+            return {stage: percentiles(samples) for stage, samples in sorted(self._samples.items())}
+
+
+def format_table(rows: Dict[str, Dict[str, float]]) -> str:
+    """Render percentile summaries as a fixed-width table."""
+    lines = [f"{'stage':<18} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for name, row in rows.items():
+        if not row.get("count"):
+            continue
+        lines.append(
+            f"{name:<18} {row['count']:>7} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+            f"{row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def git_commit() -> Optional[str]:
+    """Commit of the working tree the benchmark ran on (None outside git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, params: Dict, results: Dict) -> Dict:
+    """
+    Append one benchmark run as a JSON line.
+    
+    Each record carries the commit, time and parameters of the run, so a
+    results file accumulated across commits can be diffed with
+    ``python -m benchmarks.compare``.
+    
+    Args:
+        path: JSONL file to append to
+        benchmark: Benchmark name
+        params: Parameters the run used
+        results: Measured values
+    
+    Returns:
+        The written record
+    """
+    record = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+    return record
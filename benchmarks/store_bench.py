@@ -0,0 +1,95 @@
+"""Microbenchmark vector-store put and find latency across collection sizes.
+
+For each size a fresh store is bulk-loaded with random vectors (timed
+as rows per second), then single put() calls and find() calls with
+perturbed copies of stored rows (hits) and unrelated vectors (misses) are
+timed one at a time.
+
+Usage:
+    python -m benchmarks.store_bench
+    python -m benchmarks.store_bench --sizes 1000 10000 100000 1000000 --store chroma
+    python -m benchmarks.store_bench --store numpy --output results/store.jsonl
+"""
+import argparse
+import tempfile
+import time
+from typing import Dict
+import numpy as np
+from core.settings import settings
+from storage.base import VectorStore
+from storage.chroma_store import ChromaStore
+from storage.numpy_store import NumpyStore
+from benchmarks.report import format_table, percentiles, write_results
+
+LOAD_CHUNK = 5000  # below Chroma's maximum add() batch
+
+
+def open_store(kind: str, directory: str) -> VectorStore:
+    """Create an empty store of the given kind in directory."""
+    if kind == "chroma":
+        return ChromaStore("bench", persist_directory=directory)
+    return NumpyStore("bench", persist_directory=directory)
+
+
+def bench_size(kind: str, size: int, dim: int, samples: int, threshold: float, seed: int) -> Dict:
+    """Load a store with size rows and time put/find on it."""
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_store(kind, directory)
+        start = time.perf_counter()
+        for offset in range(0, size, LOAD_CHUNK):
+            count = min(LOAD_CHUNK, size - offset)
+            vectors = rng.standard_normal((count, dim), dtype=np.float32)
+            if offset == 0:
+                probes = vectors[:samples].copy()
+            store.put_batch([f"q{offset + i}" for i in range(count)], vectors.tolist())
+        load_seconds = time.perf_counter() - start
+        
+        hits = probes + 0.3 * rng.standard_normal(probes.shape, dtype=np.float32)
+        misses = rng.standard_normal((samples, dim), dtype=np.float32)
+        timings = {"find_hit": [], "find_miss": [], "put": []}
+        for hit, miss in zip(hits.tolist(), misses.tolist()):
+            for stage, embedding in (("find_hit", hit), ("find_miss", miss)):
+                began = time.perf_counter()
+                store.find(embedding=embedding, threshold=threshold, top_k=1)
+                timings[stage].append(time.perf_counter() - began)
+        for i, vector in enumerate(rng.standard_normal((samples, dim), dtype=np.float32).tolist()):
+            began = time.perf_counter()
+            store.put(query=f"extra{i}", embedding=vector)
+            timings["put"].append(time.perf_counter() - began)
+        close = getattr(store, "close", None)
+        if callable(close):
+            close()
+    
+    return {
+        "size": size,
+        "load_rows_per_second": round(size / load_seconds, 1),
+        **{stage: percentiles(samples) for stage, samples in timings.items()}
+    }
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--store", choices=["chroma", "numpy"], default=settings.VECTOR_STORE)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--samples", type=int, default=200, help="Timed calls per operation and size")
+    parser.add_argument("--threshold", type=float, default=settings.SIMILARITY_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Append the results as a JSON line to this file")
+    args = parser.parse_args()
+    
+    results = []
+    for size in args.sizes:
+        result = bench_size(args.store, size, args.dim, min(args.samples, size), args.threshold, args.seed)
+        results.append(result)
+        print(f"\n{args.store}, {size} rows x {args.dim} dims, "
+              f"bulk load {result['load_rows_per_second']:.0f} rows/s")
+        print(format_table({stage: result[stage] for stage in ("find_hit", "find_miss", "put")}))
+    if args.output:
+        write_results(args.output, f"store_{args.store}", vars(args), {"sizes": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Skewed (Zipfian) query workloads with tunable paraphrase rates."""
+import random
+from typing import List
+import numpy as np
+
+_SYLLABLES = ["ba", "ko", "mi", "nu", "re", "ta", "vo", "zi", "pe", "du", "la", "go", "fi", "ra", "te", "no"]
+_FILLERS = ["what is the", "tell me the", "please show", "can you find", "i want to know the", "give me"]
+
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """Pseudo-words that are neither stopwords nor changed by stemming."""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(3)))
+    return sorted(words)
+
+
+class ZipfWorkload:
+    """
+    Stream of queries over a fixed set of intents with Zipf-distributed popularity.
+    
+    Each intent has a canonical phrasing of two to four content words. A
+    request asks for intent ``k`` with probability proportional to
+    ``1 / k**exponent`` and, with probability ``paraphrase_rate``, phrases it
+    differently: filler words, changed casing and punctuation. The raw text of a paraphrase is less similar to the
+    canonical phrasing than the high-confidence threshold, while its
+    normalization by the rule-based (or an LLM) transformer is the same.
+    """
+    
+    def __init__(self, intents: int = 1000, exponent: float = 1.1, paraphrase_rate: float = 0.3, seed: int = 0):
+        """
+        Initialize workload.
+        
+        Args:
+            intents: Number of distinct intents
+            exponent: Zipf exponent (0 is uniform, larger is more skewed)
+            paraphrase_rate: Probability a request is paraphrased
+            seed: Seed of the intents and the request stream
+        """
+        self.exponent = exponent
+        self.paraphrase_rate = paraphrase_rate
+        self._rng = random.Random(seed + 1)
+        vocabulary = make_vocabulary(max(intents * 2, 64), seed)
+        self.intents = [
+            " ".join(self._rng.sample(vocabulary, self._rng.randint(2, 4)))
+            for _ in range(intents)
+        ]
+        weights = 1.0 / np.arange(1, intents + 1, dtype=np.float64) ** exponent
+        self._cumulative = np.cumsum(weights / weights.sum())
+    
+    def paraphrase(self, text: str) -> str:
+        """Rephrase a canonical query without changing its content words."""
+        rephrased = f"{self._rng.choice(_FILLERS)} {text}"
+        if self._rng.random() < 0.5:
+            rephrased = rephrased.capitalize()
+        return rephrased + self._rng.choice(["?", "", "??", "."])
+    
+    def queries(self, count: int) -> List[str]:
+        """
+        Draw the next ``count`` requests.
+        
+        Returns:
+            Query texts in arrival order
+        """
+        ranks = np.searchsorted(self._cumulative, [self._rng.random() for _ in range(count)])
+        return [
+            self.paraphrase(self.intents[rank]) if self._rng.random() < self.paraphrase_rate
+            else self.intents[rank]
+            for rank in np.minimum(ranks, len(self.intents) - 1)
+        ]
@@ -0,0 +1,2 @@
+# CLI Package
+
@@ -0,0 +1,467 @@
+"""Bulk import, export and restore of the query cache.
+
+import streams queries from JSONL or CSV (or plain text, one per line) in
+bounded memory. Queries are optionally normalized, embedded in batches
+with several batches in flight, checked against the store and the rows
+still waiting to be inserted, and inserted in large put_batch chunks.
+Alias rows are not created; live traffic adds them as usual. With
+LEXICAL_INDEX and LEXICAL_INDEX_PATH set, imported and restored entries are
+also appended to the shared lexical log, so the workers match their
+word-level variants.
+
+export writes the collection to a snapshot directory: embeddings.npy
+(float32 matrix), entries.jsonl (id, query and metadata per row, in
+matrix order) and manifest.json (model, dimension, row count). restore
+loads a snapshot into the configured store without re-embedding and
+points alias rows at the new ids of their entries.
+
+Usage:
+    python -m cli.bulk import queries.jsonl --normalize
+    python -m cli.bulk import history.csv --field text --batch-size 128 --concurrency 8
+    python -m cli.bulk export ./snapshots/2026-10-16
+    python -m cli.bulk restore ./snapshots/2026-10-16
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from core.container import Container
+from core.lru_cache import LRUCache
+from core.settings import settings
+from providers.base import EmbeddingProvider
+from services.lexical_index import LexicalIndex
+from storage.base import VectorStore
+from transformer.base import QueryTransformer
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+ENTRIES_FILE = "entries.jsonl"
+
+
+def read_queries(path: str, field: str = "query", input_format: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream queries from a file ("-" reads stdin).
+    
+    Args:
+        path: Input file
+        field: JSON key or CSV column holding the query
+        input_format: "jsonl", "csv" or "text"; guessed from the extension if None
+    
+    Yields:
+        Non-empty queries, stripped, in file order
+    
+    Raises:
+        ValueError: If the format is unknown or a CSV file lacks the column
+    """
+    if input_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        input_format = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}.get(extension, "text")
+    if input_format not in ("jsonl", "csv", "text"):
+        raise ValueError(f"Unknown input format: {input_format}")
+    
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        if input_format == "csv":
+            reader = csv.DictReader(source)
+            if reader.fieldnames is None or field not in reader.fieldnames:
+                raise ValueError(f"CSV input has no {field!r} column")
+            values = (row[field] for row in reader)
+        elif input_format == "jsonl":
+            values = (_json_query(line, field) for line in source if line.strip())
+        else:
+            values = iter(source)
+        for value in values:
+            query = (value or "").strip()
+            if query:
+                yield query
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def _json_query(line: str, field: str) -> Optional[str]:
+    """Query of one JSONL line: an object's field, or the line itself if it is a JSON string."""
+    record = json.loads(line)
+    return record if isinstance(record, str) else record.get(field)
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _PendingRows:
+    """Rows accepted for insertion but not stored yet, searchable by cosine similarity."""
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.queries: List[str] = []
+        self.embeddings: List[List[float]] = []
+        self._unit: Optional[np.ndarray] = None
+    
+    def __len__(self) -> int:
+        return len(self.queries)
+    
+    def matches(self, embedding: List[float], threshold: float) -> bool:
+        """Whether a pending row is at least threshold-similar to the embedding."""
+        if not self.queries:
+            return False
+        similarities = self._unit[:len(self.queries)] @ _unit_vector(embedding)
+        return float(similarities.max()) >= threshold
+    
+    def add(self, query: str, embedding: List[float]) -> None:
+        if self._unit is None:
+            self._unit = np.empty((self.capacity, len(embedding)), dtype=np.float32)
+        self._unit[len(self.queries)] = _unit_vector(embedding)
+        self.queries.append(query)
+        self.embeddings.append(embedding)
+    
+    def clear(self) -> None:
+        self.queries, self.embeddings = [], []
+
+
+def _unit_vector(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def import_queries(
+    queries: Iterable[str],
+    embedding_provider: EmbeddingProvider,
+    storage: VectorStore,
+    query_transformer: Optional[QueryTransformer] = None,
+    batch_size: int = 256,
+    concurrency: int = 4,
+    insert_size: int = 4096,
+    dedupe_threshold: float = 0.85,
+    recent_size: int = 100000,
+    lexical_index: Optional[LexicalIndex] = None
+) -> Dict[str, int]:
+    """
+    Embed and insert queries that the store does not already answer.
+    
+    At most ``concurrency`` batches are normalized and embedded at a time,
+    and rows are deduplicated and inserted in input order, so memory stays
+    bounded by the batches in flight plus one insert chunk.
+    
+    Args:
+        queries: Queries to import
+        embedding_provider: Provider used to embed the (normalized) queries
+        storage: Store to deduplicate against and insert into
+        query_transformer: Normalizer applied before embedding (None stores raw queries)
+        batch_size: Queries per embedding batch
+        concurrency: Batches normalized and embedded in parallel
+        insert_size: Rows per put_batch call
+        dedupe_threshold: Similarity at which a query counts as already stored
+        recent_size: Recently seen texts remembered to skip exact repeats before embedding
+        lexical_index: Index the inserted queries are added to (None skips it)
+    
+    Returns:
+        Counts: read, repeated (exact repeats of a recent raw or normalized
+        text), existing (near-duplicates of stored or pending rows) and inserted
+    """
+    counts = {"read": 0, "repeated": 0, "existing": 0, "inserted": 0}
+    recent = LRUCache(max_size=recent_size)
+    pending = _PendingRows(capacity=insert_size)
+    
+    def is_new(kind: str, text: str) -> bool:
+        if recent.get((kind, text)) is not None:
+            counts["repeated"] += 1
+            return False
+        recent.set((kind, text), True)
+        return True
+    
+    def prepare(batch: List[str]) -> Tuple[List[str], List[List[float]]]:
+        if query_transformer is not None:
+            batch = [query_transformer.transform(query) for query in batch]
+        return batch, embedding_provider.create_batch(batch)
+    
+    def insert() -> None:
+        ids = storage.put_batch(queries=pending.queries, embeddings=pending.embeddings)
+        _index_lexical(lexical_index, ids, pending.queries)
+        # Write-behind stores must apply the rows before later batches are checked against them
+        flush = getattr(storage, "flush", None)
+        if callable(flush):
+            flush()
+        counts["inserted"] += len(pending)
+        logger.info(f"Imported {counts['inserted']} of {counts['read']} queries read so far")
+        pending.clear()
+    
+    def accept(texts: List[str], embeddings: List[List[float]]) -> None:
+        if query_transformer is not None:
+            keep = [index for index, text in enumerate(texts) if is_new("normalized", text)]
+            texts = [texts[index] for index in keep]
+            embeddings = [embeddings[index] for index in keep]
+        if not texts:
+            return
+        matches = storage.find_batch(embeddings=embeddings, threshold=dedupe_threshold, top_k=1)
+        for text, embedding, stored in zip(texts, embeddings, matches):
+            if stored or pending.matches(embedding, dedupe_threshold):
+                counts["existing"] += 1
+                continue
+            pending.add(text, embedding)
+            if len(pending) >= insert_size:
+                insert()
+    
+    def read() -> Iterator[str]:
+        for query in queries:
+            counts["read"] += 1
+            if is_new("raw", query):
+                yield query
+    
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="import") as executor:
+        in_flight = []
+        for batch in chunked(read(), batch_size):
+            in_flight.append(executor.submit(prepare, batch))
+            if len(in_flight) >= concurrency:
+                accept(*in_flight.pop(0).result())
+        for future in in_flight:
+            accept(*future.result())
+    if pending:
+        insert()
+    return counts
+
+
+def export_snapshot(storage: VectorStore, directory: str, model: str, batch_size: int = 1000) -> int:
+    """
+    Write every row of the store to a snapshot directory.
+    
+    Vectors are streamed to a raw temporary file and copied into the .npy
+    matrix once the row count is known, so memory stays at one page.
+    
+    Args:
+        storage: Store with iter_entries() (ChromaStore or NumpyStore)
+        directory: Snapshot directory (created; existing snapshot files are replaced)
+        model: Embedding model recorded in the manifest
+        batch_size: Rows read per page
+    
+    Returns:
+        Number of rows exported
+    
+    Raises:
+        ValueError: If the store cannot be iterated
+    """
+    iter_entries = getattr(storage, "iter_entries", None)
+    if not callable(iter_entries):
+        raise ValueError(f"{type(storage).__name__} cannot be exported; read the backend store directly")
+    os.makedirs(directory, exist_ok=True)
+    raw_path = os.path.join(directory, f"{EMBEDDINGS_FILE}.tmp")
+    rows, dimension = 0, None
+    with open(raw_path, "wb") as raw, open(os.path.join(directory, ENTRIES_FILE), "w", encoding="utf-8") as entries:
+        for page in iter_entries(batch_size=batch_size, include_embeddings=True):
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            if dimension is None:
+                dimension = vectors.shape[1]
+            raw.write(vectors.tobytes())
+            for entry_id, query, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                entries.write(json.dumps({"id": entry_id, "query": query, "metadata": metadata or {}}) + "\n")
+            rows += len(page["ids"])
+    
+    matrix = np.lib.format.open_memmap(
+        os.path.join(directory, EMBEDDINGS_FILE), mode="w+", dtype=np.float32, shape=(rows, dimension or 0)
+    )
+    if rows:
+        source = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(rows, dimension))
+        for start in range(0, rows, batch_size):
+            matrix[start:start + batch_size] = source[start:start + batch_size]
+        del source
+    matrix.flush()
+    del matrix
+    os.remove(raw_path)
+    
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": SNAPSHOT_FORMAT,
+            "model": model,
+            "dimension": dimension,
+            "rows": rows,
+            "created_at": datetime.utcnow().isoformat()
+        }, f, indent=2)
+    logger.info(f"Exported {rows} rows to {directory}")
+    return rows
+
+
+def restore_snapshot(
+    storage: VectorStore,
+    directory: str,
+    model: Optional[str] = None,
+    batch_size: int = 1000,
+    force: bool = False,
+    lexical_index: Optional[LexicalIndex] = None
+) -> Dict[str, int]:
+    """
+    Load a snapshot into the store without re-embedding.
+    
+    Entries are inserted first and alias rows second, so each alias can be
+    pointed at the id its entry received in this store.
+    
+    Args:
+        storage: Store to insert into
+        directory: Snapshot written by export_snapshot
+        model: Embedding model of this deployment, checked against the manifest
+        batch_size: Rows per put_batch call
+        force: Restore even if the model or dimension differs
+        lexical_index: Index the restored entries are added to (None skips it)
+    
+    Returns:
+        Counts: entries and aliases restored, orphaned aliases skipped
+    
+    Raises:
+        ValueError: If the snapshot is of another format, model or dimension
+    """
+    with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format')}")
+    if not force:
+        if model is not None and manifest["model"] != model:
+            raise ValueError(f"Snapshot was embedded with {manifest['model']}, this deployment uses {model}")
+        dimension = storage.dimension
+        if dimension is not None and manifest["rows"] and dimension != manifest["dimension"]:
+            raise ValueError(f"Snapshot has {manifest['dimension']}-dim embeddings, the store {dimension}-dim")
+    
+    matrix = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+    counts = {"entries": 0, "aliases": 0, "orphaned_aliases": 0}
+    new_ids: Dict[str, str] = {}
+    for aliases in (False, True):
+        batch: List[Tuple[int, Dict]] = []
+        for row, entry in enumerate(_read_entries(directory)):
+            alias_of = entry["metadata"].get("alias_of")
+            if bool(alias_of) != aliases:
+                continue
+            if aliases:
+                if alias_of not in new_ids:
+                    counts["orphaned_aliases"] += 1
+                    continue
+                entry["metadata"]["alias_of"] = new_ids[alias_of]
+            batch.append((row, entry))
+            if len(batch) >= batch_size:
+                _restore_batch(storage, matrix, batch, new_ids, counts, aliases, lexical_index)
+                batch = []
+        if batch:
+            _restore_batch(storage, matrix, batch, new_ids, counts, aliases, lexical_index)
+    flush = getattr(storage, "flush", None)
+    if callable(flush):
+        flush()
+    logger.info(f"Restored {counts['entries']} entries and {counts['aliases']} aliases from {directory}")
+    return counts
+
+
+def _read_entries(directory: str) -> Iterator[Dict]:
+    with open(os.path.join(directory, ENTRIES_FILE), encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _restore_batch(
+    storage: VectorStore,
+    matrix: np.ndarray,
+    batch: List[Tuple[int, Dict]],
+    new_ids: Dict[str, str],
+    counts: Dict[str, int],
+    aliases: bool,
+    lexical_index: Optional[LexicalIndex]
+) -> None:
+    """Insert one batch of snapshot rows and remember the ids entries received."""
+    rows = [row for row, _ in batch]
+    queries = [entry["query"] for _, entry in batch]
+    ids = storage.put_batch(
+        queries=queries,
+        embeddings=np.asarray(matrix[rows], dtype=np.float32).tolist(),
+        metadatas=[entry["metadata"] for _, entry in batch]
+    )
+    if aliases:
+        counts["aliases"] += len(ids)
+        return
+    new_ids.update((entry["id"], new_id) for (_, entry), new_id in zip(batch, ids))
+    _index_lexical(lexical_index, ids, queries)
+    counts["entries"] += len(ids)
+
+
+def _index_lexical(lexical_index: Optional[LexicalIndex], ids: List[str], queries: List[str]) -> None:
+    """Add stored entries to the lexical index, as live traffic does for the rows it stores."""
+    if lexical_index is None:
+        return
+    for entry_id, query in zip(ids, queries):
+        lexical_index.add(entry_id, [query], query)
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    importer = commands.add_parser("import", help="embed and insert queries from a file")
+    importer.add_argument("path", help="JSONL, CSV or text file ('-' for stdin)")
+    importer.add_argument("--format", choices=("jsonl", "csv", "text"), help="default: from the file extension")
+    importer.add_argument("--field", default="query", help="JSON key or CSV column of the query")
+    importer.add_argument("--normalize", action="store_true", help="store the QUERY_TRANSFORMER form of each query")
+    importer.add_argument("--batch-size", type=int, default=256)
+    importer.add_argument("--concurrency", type=int, default=4)
+    importer.add_argument("--insert-size", type=int, default=4096)
+    importer.add_argument("--dedupe-threshold", type=float, default=settings.SIMILARITY_THRESHOLD)
+    
+    exporter = commands.add_parser("export", help="write the collection to a snapshot directory")
+    exporter.add_argument("directory")
+    exporter.add_argument("--batch-size", type=int, default=1000)
+    
+    restorer = commands.add_parser("restore", help="load a snapshot without re-embedding")
+    restorer.add_argument("directory")
+    restorer.add_argument("--batch-size", type=int, default=1000)
+    restorer.add_argument("--force", action="store_true", help="ignore model and dimension mismatches")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    container = Container()
+    storage = container.storage
+    lexical_index = container.lexical_index
+    if lexical_index is not None and lexical_index.path is None:
+        # Only a shared log outlives this process
+        lexical_index = None
+    started = time.monotonic()
+    try:
+        if args.command == "import":
+            result = import_queries(
+                read_queries(args.path, field=args.field, input_format=args.format),
+                embedding_provider=container.embedding_provider,
+                storage=storage,
+                query_transformer=container.query_transformer if args.normalize else None,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                insert_size=args.insert_size,
+                dedupe_threshold=args.dedupe_threshold,
+                lexical_index=lexical_index
+            )
+        elif args.command == "export":
+            result = {"rows": export_snapshot(storage, args.directory, settings.EMBEDDING_MODEL, args.batch_size)}
+        else:
+            result = restore_snapshot(
+                storage, args.directory, settings.EMBEDDING_MODEL, args.batch_size, args.force, lexical_index
+            )
+    finally:
+        close = getattr(storage, "close", None)
+        if callable(close):
+            close()
+    logger.info(f"{args.command} finished in {time.monotonic() - started:.1f}s")
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
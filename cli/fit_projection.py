@@ -0,0 +1,97 @@
+"""Fit a PCA projection for reduced-dimension embeddings.
+
+Embeds a sample of real queries at the model's full dimension and saves the
+leading principal components, for use with EMBEDDING_REDUCTION=pca. By default
+the sample is every query stored in CHROMA_COLLECTION_NAME; the queries are
+re-embedded because the stored vectors may already be reduced.
+
+Usage:
+    python -m cli.fit_projection --dimensions 256
+    python -m cli.fit_projection --dimensions 128 --queries queries.txt --output ./cache/pca128.npz
+"""
+import argparse
+import logging
+from typing import List
+import numpy as np
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+from core.settings import settings
+from providers.base import EmbeddingProvider
+from providers.caching_provider import CachingEmbeddingProvider
+from providers.ollama_provider import OllamaEmbeddingProvider
+from providers.reduced_dimension_provider import fit_projection, save_projection
+
+logger = logging.getLogger(__name__)
+
+
+def embed_all(provider: EmbeddingProvider, texts: List[str], batch_size: int = 64) -> np.ndarray:
+    """
+    Embed texts in batches.
+    
+    Args:
+        provider: Full-dimension embedding provider
+        texts: Texts to embed
+        batch_size: Texts per create_batch() call
+    
+    Returns:
+        Matrix with one embedding per row
+    """
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(provider.create_batch(texts[start:start + batch_size]))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def stored_queries(persist_directory: str, collection_name: str, batch_size: int = 1000) -> List[str]:
+    """Return every query text stored in a Chroma collection."""
+    client = chromadb.PersistentClient(
+        path=persist_directory,
+        settings=ChromaSettings(anonymized_telemetry=False)
+    )
+    collection = client.get_collection(name=collection_name)
+    queries = []
+    offset = 0
+    while True:
+        page = collection.get(limit=batch_size, offset=offset, include=["documents"])
+        if not page["ids"]:
+            return queries
+        queries.extend(page["documents"])
+        offset += len(page["ids"])
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dimensions", type=int, default=settings.EMBEDDING_DIMENSIONS or 256)
+    parser.add_argument("--output", default=settings.EMBEDDING_PROJECTION_PATH)
+    parser.add_argument("--queries", help="file with one sample query per line (default: stored queries)")
+    parser.add_argument("--persist-dir", default=settings.CHROMA_PERSIST_DIR)
+    parser.add_argument("--collection", default=settings.CHROMA_COLLECTION_NAME)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = stored_queries(args.persist_dir, args.collection)
+    
+    provider = CachingEmbeddingProvider(
+        provider=OllamaEmbeddingProvider(model=settings.EMBEDDING_MODEL),
+        model=settings.EMBEDDING_MODEL,
+        cache_path=settings.EMBEDDING_CACHE_PATH or None
+    )
+    embeddings = embed_all(provider, texts)
+    mean, components = fit_projection(embeddings, args.dimensions)
+    save_projection(args.output, mean, components)
+    
+    singular = np.linalg.svd(embeddings - mean, compute_uv=False)
+    explained = float((singular[:args.dimensions] ** 2).sum() / (singular ** 2).sum())
+    logger.info(
+        f"Saved {args.dimensions}x{embeddings.shape[1]} projection fitted on {len(texts)} queries "
+        f"to {args.output} ({explained:.1%} of variance kept)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Run the shared index server that VECTOR_STORE=remote workers query.
+
+Opens the INDEX_SERVER_BACKEND store (with its eviction, write-behind and
+HNSW settings) once and serves it on INDEX_SERVER_SOCKET until SIGTERM or
+SIGINT, then flushes pending writes. Rows it evicts are deleted from the
+shared lexical index log (LEXICAL_INDEX_PATH). run.sh starts it through gunicorn's
+on_starting hook; run it by hand when INDEX_SERVER_AUTOSTART is off.
+
+Usage:
+    VECTOR_STORE=remote python -m cli.index_server
+    python -m cli.index_server --backend numpy --socket /run/queryembeddings/index.sock
+"""
+import argparse
+import logging
+import signal
+import threading
+from core.container import Container
+from core.settings import settings
+from storage.index_server import IndexServer
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=("chroma", "numpy"), default=settings.INDEX_SERVER_BACKEND)
+    parser.add_argument("--socket", default=settings.INDEX_SERVER_SOCKET)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    container = Container()
+    store = container.create_local_storage(args.backend)
+    container.log_lexical_evictions(store)
+    server = IndexServer(store, args.socket)
+    
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever, so it cannot run on the serving thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        logger.info(f"Index server stopped after {server.requests_served} requests")
+
+
+if __name__ == "__main__":
+    main()
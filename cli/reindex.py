@@ -0,0 +1,115 @@
+"""Rebuild a Chroma collection with the configured (cosine) HNSW settings.
+
+Streams every row of an existing collection into a new collection created
+with the current CHROMA_HNSW_* settings, in bulk pages, so the index can be
+switched to cosine distance or re-tuned on real data.
+
+Usage:
+    python -m cli.reindex                       # rebuild CHROMA_COLLECTION_NAME in place
+    python -m cli.reindex --target experiment   # copy into a new collection and keep the source
+"""
+import argparse
+import logging
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+from core.settings import settings
+from core.container import chroma_configuration
+
+logger = logging.getLogger(__name__)
+
+
+def reindex(
+    client,
+    source_name: str,
+    target_name: str,
+    configuration: dict,
+    batch_size: int = 1000
+) -> int:
+    """
+    Copy all rows of one collection into a newly created collection.
+    
+    Args:
+        client: Chroma client holding both collections
+        source_name: Collection to read from
+        target_name: Collection to create and fill (must not exist)
+        configuration: Configuration for the new collection
+        batch_size: Number of rows read and inserted per page
+        
+    Returns:
+        Number of rows copied
+    """
+    source = client.get_collection(name=source_name)
+    target = client.create_collection(name=target_name, configuration=configuration)
+    
+    copied = 0
+    offset = 0
+    while True:
+        page = source.get(
+            limit=batch_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if not page["ids"]:
+            break
+        target.add(
+            ids=page["ids"],
+            embeddings=page["embeddings"],
+            documents=page["documents"],
+            metadatas=page["metadatas"]
+        )
+        copied += len(page["ids"])
+        offset += len(page["ids"])
+        logger.info(f"Copied {copied} rows")
+    
+    return copied
+
+
+def reindex_in_place(client, name: str, configuration: dict, batch_size: int = 1000) -> int:
+    """
+    Rebuild a collection under its own name.
+    
+    Rows are copied into a temporary collection, the original is dropped and
+    the copy is renamed, so the service must be stopped while this runs.
+    
+    Args:
+        client: Chroma client holding the collection
+        name: Collection to rebuild
+        configuration: Configuration for the rebuilt collection
+        batch_size: Number of rows read and inserted per page
+        
+    Returns:
+        Number of rows copied
+    """
+    tmp_name = f"{name}-reindex"
+    copied = reindex(client, name, tmp_name, configuration, batch_size)
+    client.delete_collection(name=name)
+    client.get_collection(name=tmp_name).modify(name=name)
+    return copied
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--persist-dir", default=settings.CHROMA_PERSIST_DIR)
+    parser.add_argument("--source", default=settings.CHROMA_COLLECTION_NAME)
+    parser.add_argument("--target", help="copy into this new collection instead of rebuilding in place")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    client = chromadb.PersistentClient(
+        path=args.persist_dir,
+        settings=ChromaSettings(anonymized_telemetry=False)
+    )
+    configuration = chroma_configuration()
+    
+    if args.target:
+        copied = reindex(client, args.source, args.target, configuration, args.batch_size)
+        logger.info(f"Copied {copied} rows from {args.source} into {args.target}")
+    else:
+        copied = reindex_in_place(client, args.source, configuration, args.batch_size)
+        logger.info(f"Rebuilt {args.source} with {copied} rows")
+
+
+if __name__ == "__main__":
+    main()
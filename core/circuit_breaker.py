@@ -0,0 +1,212 @@
+"""Circuit breaker tracking rolling latency and error rate of a dependency."""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because its circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+    
+    The outcomes of the last ``window_size`` calls are kept; a call fails if it
+    raises, times out, or takes longer than ``slow_call_ms``. Once at least
+    ``min_calls`` outcomes are recorded and the failure rate reaches
+    ``failure_rate_threshold``, the circuit opens and refuses calls for
+    ``open_seconds``. After that a single probe call is let through (half-open):
+    its success closes the circuit, its failure opens it again.
+    
+    The window's median latency is exposed so callers can skip a dependency
+    that is closed but currently too slow for the time they have left.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 50,
+        min_calls: int = 10,
+        failure_rate_threshold: float = 0.5,
+        slow_call_ms: float = 0,
+        open_seconds: float = 30.0
+    ):
+        """
+        Initialize circuit breaker.
+        
+        Args:
+            name: Dependency name used in logs and errors
+            window_size: Number of recent calls the rates are computed over
+            min_calls: Calls needed in the window before the circuit can open
+            failure_rate_threshold: Failure rate (0-1) that opens the circuit
+            slow_call_ms: Calls slower than this count as failures (0 disables)
+            open_seconds: Time the circuit stays open before a probe is allowed
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_ms / 1000
+        self.open_seconds = open_seconds
+        self._window = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.opened = 0
+    
+    @property
+    def state(self) -> str:
+        """Current state ("closed", "open" or "half_open")."""
+        with self._lock:
+            self._expire_open()
+            return self._state
+    
+    def _expire_open(self) -> None:
+        """Move an open circuit to half-open once its open period has elapsed."""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+    
+    def allow_request(self) -> bool:
+        """
+        Decide whether a call may go through, reserving the probe when half-open.
+        
+        Every allowed call must be followed by record_success, record_failure
+        or, if it was never made, release.
+        
+        Returns:
+            True if the call may be made
+        """
+        with self._lock:
+            self._expire_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+    
+    def record_success(self, latency: float) -> None:
+        """
+        Record a completed call (a call slower than slow_call_ms counts as a failure).
+        
+        Args:
+            latency: Call duration in seconds
+        """
+        self._record(latency, not (self.slow_call_seconds and latency > self.slow_call_seconds))
+    
+    def record_failure(self, latency: float) -> None:
+        """
+        Record a call that raised or timed out.
+        
+        Args:
+            latency: Time spent before the failure, in seconds
+        """
+        self._record(latency, False)
+    
+    def release(self) -> None:
+        """Give back an allowed call that was never made, without recording an outcome."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+    
+    def _record(self, latency: float, ok: bool) -> None:
+        """Add an outcome to the window and update the state."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    logger.info(f"Circuit {self.name} closed after a successful probe")
+                    self._state = CLOSED
+                    self._window.clear()
+                else:
+                    self._open()
+            self._window.append((latency, ok))
+            if self._state == CLOSED and len(self._window) >= self.min_calls:
+                failures = sum(1 for _, outcome_ok in self._window if not outcome_ok)
+                if failures / len(self._window) >= self.failure_rate_threshold:
+                    self._open()
+    
+    def _open(self) -> None:
+        """Open the circuit (caller holds the lock)."""
+        logger.warning(f"Circuit {self.name} opened for {self.open_seconds:.0f}s")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+    
+    def expected_latency(self) -> Optional[float]:
+        """
+        Median latency of the calls in the window, in seconds.
+        
+        Returns:
+            Median latency, or None until min_calls outcomes are recorded
+        """
+        with self._lock:
+            if len(self._window) < self.min_calls:
+                return None
+            latencies = sorted(latency for latency, _ in self._window)
+        return latencies[len(latencies) // 2]
+    
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Call func through the breaker, recording its latency and outcome.
+        
+        Raises:
+            CircuitOpenError: If the circuit refuses the call
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            self.record_failure(time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+    
+    async def acall(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """
+        Await func through the breaker, recording its latency and outcome.
+        
+        Raises:
+            CircuitOpenError: If the circuit refuses the call
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException:
+            self.record_failure(time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+    
+    def stats(self) -> Dict:
+        """Return state, window rates and counters."""
+        with self._lock:
+            self._expire_open()
+            failures = sum(1 for _, ok in self._window if not ok)
+            latencies = sorted(latency for latency, _ in self._window)
+            return {
+                "state": self._state,
+                "calls": len(self._window),
+                "failure_rate": failures / len(self._window) if self._window else 0.0,
+                "median_latency_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
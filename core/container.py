@@ -1,25 +1,162 @@
 """Dependency injection container."""
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+from core.circuit_breaker import CircuitBreaker
+from core.metrics import ServiceMetrics
+from core.ollama_pool import OllamaPool, parse_keep_alive
+from core.profiler import SamplingProfiler
 from core.settings import settings
 from providers.base import EmbeddingProvider
 from providers.ollama_provider import OllamaEmbeddingProvider
+from providers.caching_provider import CachingEmbeddingProvider
+from providers.batching_provider import BatchingEmbeddingProvider
+from providers.reduced_dimension_provider import ReducedDimensionEmbeddingProvider
 from storage.base import VectorStore
-from storage.chroma_store import ChromaStore
+from storage.chroma_store import ChromaStore, hnsw_configuration
+from storage.eviction import CacheEvictor, EvictionSignal
+from storage.numpy_store import NumpyStore
+from storage.remote_store import RemoteStore
 from transformer.base import QueryTransformer
 from transformer.ollama_transformer import OllamaQueryTransformer
+from transformer.caching_transformer import CachingQueryTransformer
+from transformer.rule_transformer import RuleBasedQueryTransformer, load_aliases
+from transformer.tiered_transformer import TieredQueryTransformer
 from services.semantic_service import SemanticService
+from services.query_cache import QueryCache
+from services.lexical_index import LexicalIndex
 
 logger = logging.getLogger(__name__)
 
 
+def chroma_configuration() -> dict:
+    """Build the Chroma collection configuration from settings."""
+    return hnsw_configuration(
+        max_neighbors=settings.CHROMA_HNSW_M,
+        ef_construction=settings.CHROMA_HNSW_CONSTRUCTION_EF,
+        ef_search=settings.CHROMA_HNSW_SEARCH_EF,
+        sync_threshold=settings.CHROMA_HNSW_SYNC_THRESHOLD,
+        batch_size=settings.CHROMA_HNSW_BATCH_SIZE
+    )
+
+
 class Container:
-    """Dependency injection container for wiring up services."""
+    """
+    Dependency injection container for wiring up services.
+    
+    Components are built on first access, once even when several threads ask
+    at the same time. ``start`` builds, pings and warms them up in the
+    background (independent ones in parallel), so a worker can answer
+    liveness probes at once and report readiness when the models are loaded.
+    """
     
     def __init__(self):
         self._embedding_provider = None
         self._storage = None
+        self._evictor = None
+        self._eviction_signal = None
         self._query_transformer = None
+        self._lexical_index = None
         self._semantic_service = None
+        self._metrics = None
+        self._profiler = None
+        self._locks = {
+            name: threading.Lock()
+            for name in (
+                "embedding_provider", "storage", "query_transformer", "lexical_index", "semantic_service", "metrics"
+            )
+        }
+        # Ollama components behind the wrappers, whose models initialize() loads
+        self._ollama_embedding = None
+        self._ollama_transformer = None
+        self._init_lock = threading.Lock()
+        self._init_thread = None
+        self._ready = threading.Event()
+        self._components: Dict[str, str] = {}
+    
+    def _get(self, name: str, create: Callable):
+        """Return a component, building it at most once at a time."""
+        component = getattr(self, f"_{name}")
+        if component is None:
+            with self._locks[name]:
+                component = getattr(self, f"_{name}")
+                if component is None:
+                    component = create()
+                    setattr(self, f"_{name}", component)
+        return component
+    
+    def start(self) -> None:
+        """Initialize in a background thread, retrying until ready (returns immediately)."""
+        with self._init_lock:
+            if self._init_thread is None:
+                self._init_thread = threading.Thread(
+                    target=self._initialize_until_ready,
+                    name="container-init",
+                    daemon=True
+                )
+                self._init_thread.start()
+    
+    @property
+    def ready(self) -> bool:
+        """Whether every component is built, reachable and has its model loaded."""
+        return self._ready.is_set()
+    
+    def readiness(self) -> Dict:
+        """Return the readiness flag and the state of each component."""
+        return {"ready": self.ready, "components": dict(self._components)}
+    
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        """Block until initialization has succeeded; returns False on timeout."""
+        return self._ready.wait(timeout)
+    
+    def initialize(self) -> None:
+        """
+        Build, ping and warm up all components.
+        
+        Storage, embedding provider and transformer are set up in parallel
+        (the tiered transformer waits for the two it uses).
+        
+        Raises:
+            Exception: The first component failure
+        """
+        names = ("storage", "embedding_provider", "query_transformer")
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="init") as executor:
+            futures = {name: executor.submit(self._prepare, name) for name in names}
+        errors = []
+        for name, future in futures.items():
+            error = future.exception()
+            self._components[name] = "ready" if error is None else f"failed: {error}"
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise errors[0]
+        _ = self.semantic_service
+        self._ready.set()
+        logger.info(f"Service ready in {time.monotonic() - started:.2f}s")
+    
+    def _prepare(self, name: str) -> None:
+        """Build a component and load the Ollama model behind it (if any, and warm-up is enabled)."""
+        getattr(self, name)
+        ollama_component = {
+            "embedding_provider": self._ollama_embedding,
+            "query_transformer": self._ollama_transformer
+        }.get(name)
+        if settings.OLLAMA_WARM_UP and ollama_component is not None:
+            ollama_component.warm_up()
+    
+    def _initialize_until_ready(self) -> None:
+        """Background initialization loop."""
+        while True:
+            try:
+                self.initialize()
+                return
+            except Exception as e:
+                logger.error(f"Initialization failed, retrying in {settings.INIT_RETRY_SECONDS:g}s: {e}")
+                time.sleep(settings.INIT_RETRY_SECONDS)
     
     def _ping_service(self, service, service_name: str) -> None:
         """Helper method to ping a service and log the result."""
@@ -33,46 +170,340 @@ class Container:
     @property
     def embedding_provider(self) -> EmbeddingProvider:
         """Get or create embedding provider."""
-        if self._embedding_provider is None:
-            self._embedding_provider = OllamaEmbeddingProvider(
-                model=settings.EMBEDDING_MODEL
+        return self._get("embedding_provider", self._create_embedding_provider)
+    
+    def _create_embedding_provider(self) -> EmbeddingProvider:
+        """Build and ping the embedding provider chain."""
+        provider = OllamaEmbeddingProvider(
+            model=settings.EMBEDDING_MODEL,
+            timeout=settings.OLLAMA_TIMEOUT_SECONDS or None,
+            pool=self._create_ollama_pool(),
+            keep_alive=parse_keep_alive(settings.OLLAMA_KEEP_ALIVE)
+        )
+        self._ollama_embedding = provider
+        if settings.EMBEDDING_BATCH_MAX_SIZE > 0:
+            provider = BatchingEmbeddingProvider(
+                provider=provider,
+                max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+                # A request may queue behind one full batch call before its own
+                timeout=2 * settings.OLLAMA_TIMEOUT_SECONDS or None
+            )
+        if settings.EMBEDDING_CACHE_SIZE > 0:
+            provider = CachingEmbeddingProvider(
+                provider=provider,
+                model=settings.EMBEDDING_MODEL,
+                cache_path=settings.EMBEDDING_CACHE_PATH or None,
+                memory_size=settings.EMBEDDING_CACHE_SIZE
+            )
+        if settings.EMBEDDING_DIMENSIONS > 0:
+            # Outside the cache, so cached vectors stay full-dimension
+            provider = ReducedDimensionEmbeddingProvider(
+                provider=provider,
+                dimensions=settings.EMBEDDING_DIMENSIONS,
+                method=settings.EMBEDDING_REDUCTION,
+                projection_path=settings.EMBEDDING_PROJECTION_PATH
             )
-            self._ping_service(self._embedding_provider, "Embedding provider")
-        return self._embedding_provider
+        self._ping_service(provider, "Embedding provider")
+        return provider
     
     @property
     def storage(self) -> VectorStore:
         """Get or create storage instance."""
-        if self._storage is None:
-            self._storage = ChromaStore(
+        return self._get("storage", self._create_storage)
+    
+    def _create_storage(self) -> VectorStore:
+        """Build and ping the vector store (a client of the index server in remote mode)."""
+        if settings.VECTOR_STORE != "remote":
+            return self.create_local_storage(settings.VECTOR_STORE)
+        storage = RemoteStore(
+            socket_path=settings.INDEX_SERVER_SOCKET,
+            timeout=settings.INDEX_SERVER_TIMEOUT_SECONDS or None
+        )
+        self._ping_service(storage, "Index server")
+        self._check_dimension(storage)
+        return storage
+    
+    def create_local_storage(self, backend: str) -> VectorStore:
+        """
+        Build, ping and start eviction for an in-process store.
+        
+        Used for the workers' own store, and by the index server for the
+        store it shares.
+        
+        Args:
+            backend: "chroma" or "numpy"
+        
+        Returns:
+            The opened store
+        """
+        if backend == "numpy":
+            storage = NumpyStore(
                 collection_name=settings.CHROMA_COLLECTION_NAME,
-                persist_directory=settings.CHROMA_PERSIST_DIR
+                persist_directory=settings.NUMPY_STORE_DIR,
+                quantization=settings.NUMPY_STORE_QUANTIZATION,
+                rerank_candidates=settings.NUMPY_STORE_RERANK_CANDIDATES
+            )
+        elif backend == "chroma":
+            storage = ChromaStore(
+                collection_name=settings.CHROMA_COLLECTION_NAME,
+                persist_directory=settings.CHROMA_PERSIST_DIR,
+                configuration=chroma_configuration(),
+                write_behind=settings.CHROMA_WRITE_BEHIND,
+                write_behind_batch_size=settings.CHROMA_WRITE_BEHIND_BATCH_SIZE,
+                write_behind_flush_ms=settings.CHROMA_WRITE_BEHIND_FLUSH_MS,
+                write_behind_max_pending=settings.CHROMA_WRITE_BEHIND_MAX_PENDING,
+                max_entries=settings.CHROMA_MAX_ENTRIES,
+                max_age_seconds=settings.CHROMA_MAX_AGE_SECONDS
+            )
+            if settings.CHROMA_MAX_ENTRIES > 0 or settings.CHROMA_MAX_AGE_SECONDS > 0:
+                self._evictor = CacheEvictor(
+                    store=storage,
+                    interval_seconds=settings.CHROMA_EVICTION_INTERVAL_SECONDS,
+                    compact_interval_seconds=settings.CHROMA_COMPACTION_INTERVAL_SECONDS,
+                    # Workers sharing the directory elect one evictor
+                    lock_path=os.path.join(settings.CHROMA_PERSIST_DIR, "evictor.lock")
+                )
+                # Listeners fire in the evicting process only; tell the others
+                storage.add_eviction_listener(self._get_eviction_signal("chroma").notify)
+        else:
+            raise ValueError(f"Unknown vector store backend: {backend}")
+        self._ping_service(storage, "Database")
+        self._check_dimension(storage)
+        if self._evictor is not None:
+            self._evictor.start()
+        return storage
+    
+    @staticmethod
+    def _check_dimension(storage: VectorStore) -> None:
+        """Refuse to serve a collection built with a different embedding dimension."""
+        if settings.EMBEDDING_DIMENSIONS <= 0:
+            return
+        dimension = storage.dimension
+        if dimension is not None and dimension != settings.EMBEDDING_DIMENSIONS:
+            raise ValueError(
+                f"Collection {settings.CHROMA_COLLECTION_NAME} holds {dimension}-dim embeddings "
+                f"but EMBEDDING_DIMENSIONS is {settings.EMBEDDING_DIMENSIONS}; "
+                "point CHROMA_COLLECTION_NAME at a new collection"
             )
-            self._ping_service(self._storage, "Database")
-        return self._storage
     
     @property
     def query_transformer(self) -> QueryTransformer:
         """Get or create query transformer."""
-        if self._query_transformer is None:
-            self._query_transformer = OllamaQueryTransformer(
-                model=settings.TRANSFORMER_MODEL
+        return self._get("query_transformer", self._create_query_transformer)
+    
+    def _create_query_transformer(self) -> QueryTransformer:
+        """Build and ping the query transformer chain."""
+        if settings.QUERY_TRANSFORMER not in ("llm", "rules", "tiered"):
+            raise ValueError(f"Unknown QUERY_TRANSFORMER: {settings.QUERY_TRANSFORMER}")
+        if settings.QUERY_TRANSFORMER == "rules":
+            transformer = RuleBasedQueryTransformer(aliases=self._load_aliases())
+        else:
+            transformer = OllamaQueryTransformer(
+                model=settings.TRANSFORMER_MODEL,
+                timeout=settings.OLLAMA_TIMEOUT_SECONDS or None,
+                pool=self._create_ollama_pool(),
+                keep_alive=parse_keep_alive(settings.OLLAMA_KEEP_ALIVE)
             )
-            self._ping_service(self._query_transformer, "Query transformer")
-        return self._query_transformer
+            self._ollama_transformer = transformer
+            if settings.TRANSFORM_CACHE_SIZE > 0:
+                transformer = CachingQueryTransformer(
+                    transformer=transformer,
+                    cache_path=settings.TRANSFORM_CACHE_PATH or None,
+                    memory_size=settings.TRANSFORM_CACHE_SIZE,
+                    ttl_seconds=settings.TRANSFORM_CACHE_TTL_SECONDS
+                )
+            if settings.QUERY_TRANSFORMER == "tiered":
+                transformer = TieredQueryTransformer(
+                    fast=RuleBasedQueryTransformer(aliases=self._load_aliases()),
+                    fallback=transformer,
+                    embedding_provider=self.embedding_provider,
+                    storage=self.storage,
+                    similarity_threshold=settings.SIMILARITY_THRESHOLD
+                )
+        self._ping_service(transformer, "Query transformer")
+        return transformer
     
     @property
     def semantic_service(self) -> SemanticService:
         """Get or create semantic service."""
-        if self._semantic_service is None:
-            self._semantic_service = SemanticService(
-                embedding_provider=self.embedding_provider,
-                storage=self.storage,
-                query_transformer=self.query_transformer,
-                similarity_threshold=settings.SIMILARITY_THRESHOLD,
-                high_confidence_threshold=settings.HIGH_CONFIDENCE_THRESHOLD
+        return self._get("semantic_service", self._create_semantic_service)
+    
+    def _create_semantic_service(self) -> SemanticService:
+        """Wire the semantic service over the other components."""
+        return SemanticService(
+            embedding_provider=self.embedding_provider,
+            storage=self.storage,
+            query_transformer=self.query_transformer,
+            similarity_threshold=settings.SIMILARITY_THRESHOLD,
+            high_confidence_threshold=settings.HIGH_CONFIDENCE_THRESHOLD,
+            query_cache=self._create_query_cache(),
+            storage_executor=ThreadPoolExecutor(
+                max_workers=settings.STORAGE_THREADS,
+                thread_name_prefix="storage"
+            ),
+            speculative_transform=settings.SPECULATIVE_TRANSFORM,
+            speculative_threads=settings.SPECULATIVE_TRANSFORM_THREADS,
+            lexical_index=self.lexical_index,
+            latency_budget_ms=settings.LATENCY_BUDGET_MS,
+            transformer_breaker=self._create_circuit_breaker("transformer"),
+            embedding_breaker=self._create_circuit_breaker("embedding"),
+            alias_limit=settings.ALIAS_MAX_PER_ENTRY,
+            metrics=self.metrics
+        )
+    
+    @property
+    def metrics(self) -> ServiceMetrics | None:
+        """Get or create the Prometheus metrics, or None if disabled."""
+        if not settings.METRICS_ENABLED:
+            return None
+        return self._get("metrics", ServiceMetrics)
+    
+    @property
+    def profiler(self) -> SamplingProfiler:
+        """Get or create the request sampling profiler (idle until a session is started)."""
+        if self._profiler is None:
+            self._profiler = SamplingProfiler(
+                directory=settings.PROFILE_DIR,
+                interval_ms=settings.PROFILE_INTERVAL_MS
+            )
+        return self._profiler
+    
+    @staticmethod
+    def _load_aliases() -> dict:
+        """Load the rule-based normalizer's alias table, if one is configured."""
+        if not settings.TRANSFORM_ALIASES_PATH:
+            return {}
+        try:
+            return load_aliases(settings.TRANSFORM_ALIASES_PATH)
+        except FileNotFoundError:
+            logger.warning(f"Alias table {settings.TRANSFORM_ALIASES_PATH} not found, using no aliases")
+            return {}
+    
+    @property
+    def lexical_index(self) -> LexicalIndex | None:
+        """Get or create the lexical near-duplicate index, or None if disabled."""
+        if not settings.LEXICAL_INDEX:
+            return None
+        return self._get("lexical_index", self._create_lexical_index)
+    
+    def _create_lexical_index(self) -> LexicalIndex | None:
+        """Create the lexical near-duplicate index, or None if disabled."""
+        if not settings.LEXICAL_INDEX:
+            return None
+        lexical_index = LexicalIndex(
+            path=settings.LEXICAL_INDEX_PATH or None,
+            threshold=settings.LEXICAL_JACCARD_THRESHOLD
+        )
+        # Evicted rows take their lexical variants with them
+        add_eviction_listener = getattr(self.storage, "add_eviction_listener", None)
+        if callable(add_eviction_listener):
+            add_eviction_listener(lexical_index.delete)
+            self._compact_lexical_log(lexical_index)
+        elif isinstance(self.storage, RemoteStore) and lexical_index.path is None:
+            logger.warning(
+                "LEXICAL_INDEX_PATH is empty: the index server cannot delete evicted rows' "
+                "variants from this worker's in-memory lexical index"
+            )
+        return lexical_index
+    
+    def log_lexical_evictions(self, storage: VectorStore) -> None:
+        """
+        Delete the lexical variants of rows the index server's store evicts.
+        
+        RemoteStore clients never hear of evictions, so the owner of the
+        shared store appends the deletes to the lexical log that every worker
+        tails.
+        
+        Args:
+            storage: Store served by the index server
+        """
+        add_eviction_listener = getattr(storage, "add_eviction_listener", None)
+        if not settings.LEXICAL_INDEX or not settings.LEXICAL_INDEX_PATH or not callable(add_eviction_listener):
+            return
+        lexical_index = LexicalIndex(
+            path=settings.LEXICAL_INDEX_PATH,
+            threshold=settings.LEXICAL_JACCARD_THRESHOLD
+        )
+        add_eviction_listener(lexical_index.delete)
+        self._compact_lexical_log(lexical_index)
+    
+    def _compact_lexical_log(self, lexical_index: LexicalIndex) -> None:
+        """Have the store's eviction owner also compact the lexical log, which evictions grow."""
+        if self._evictor is not None and lexical_index.path is not None:
+            self._evictor.add_compaction_task(lexical_index.compact)
+    
+    def _create_query_cache(self) -> QueryCache | None:
+        """Create the exact-match query cache, or None if disabled."""
+        if settings.QUERY_CACHE_SIZE <= 0:
+            return None
+        query_cache = QueryCache(
+            max_size=settings.QUERY_CACHE_SIZE,
+            ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS
+        )
+        # Inserts leave cached results valid; evictions may delete the rows
+        # they route to. The evicting process hears of them from its store,
+        # the other workers (and RemoteStore clients) from the shared signal.
+        add_eviction_listener = getattr(self.storage, "add_eviction_listener", None)
+        if callable(add_eviction_listener):
+            add_eviction_listener(lambda ids: query_cache.invalidate())
+        backend = settings.INDEX_SERVER_BACKEND if settings.VECTOR_STORE == "remote" else settings.VECTOR_STORE
+        signal = self._get_eviction_signal(backend)
+        if signal is not None:
+            signal.watch(query_cache.invalidate, settings.QUERY_CACHE_EVICTION_POLL_SECONDS)
+        return query_cache
+    
+    def _get_eviction_signal(self, backend: str) -> EvictionSignal | None:
+        """
+        Return the signal shared by every process of an evicting store.
+        
+        Args:
+            backend: Backend of the store that evicts (the index server's in remote mode)
+        
+        Returns:
+            The signal, or None if that store never evicts
+        """
+        evicts = settings.CHROMA_MAX_ENTRIES > 0 or settings.CHROMA_MAX_AGE_SECONDS > 0
+        if backend != "chroma" or not evicts:
+            return None
+        if self._eviction_signal is None:
+            self._eviction_signal = EvictionSignal(
+                os.path.join(settings.CHROMA_PERSIST_DIR, "evictions.signal")
             )
-        return self._semantic_service
+        return self._eviction_signal
+    
+    @staticmethod
+    def _create_ollama_pool() -> OllamaPool | None:
+        """
+        Create a pool over OLLAMA_HOSTS, or None to use the default host.
+        
+        Embeddings and transforms get separate pools, so long chat calls never
+        take the concurrency slots of embedding calls.
+        """
+        hosts = [host.strip() for host in settings.OLLAMA_HOSTS.split(",") if host.strip()]
+        if not hosts:
+            return None
+        return OllamaPool(
+            hosts=hosts,
+            timeout=settings.OLLAMA_TIMEOUT_SECONDS or None,
+            max_concurrency=settings.OLLAMA_MAX_CONCURRENCY,
+            eject_after_failures=settings.OLLAMA_EJECT_AFTER_FAILURES,
+            health_check_seconds=settings.OLLAMA_HEALTH_CHECK_SECONDS
+        )
+    
+    @staticmethod
+    def _create_circuit_breaker(name: str) -> CircuitBreaker | None:
+        """Create a circuit breaker from settings, or None if disabled."""
+        if not settings.CIRCUIT_BREAKER:
+            return None
+        return CircuitBreaker(
+            name=name,
+            window_size=settings.CIRCUIT_BREAKER_WINDOW,
+            min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+            failure_rate_threshold=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+            slow_call_ms=settings.CIRCUIT_BREAKER_SLOW_CALL_MS,
+            open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS
+        )
 
 
 # Global container instance
@@ -0,0 +1,136 @@
+"""Prometheus metrics of the query pipeline.
+
+Under gunicorn each worker is a separate process, so metrics are written to
+per-process files in PROMETHEUS_MULTIPROC_DIR (set by run.sh before the
+workers start) and /metrics aggregates them with a MultiProcessCollector.
+Without that variable the process-local registry is served.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import CONTENT_TYPE_LATEST, multiprocess
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("raw_embed", "first_tier_find", "transform", "normalized_embed", "second_tier_find", "put")
+
+# From sub-millisecond index lookups to multi-second LLM calls
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class ServiceMetrics:
+    """Stage latency histograms, result counters and load gauges of SemanticService."""
+    
+    def __init__(self, registry: CollectorRegistry = REGISTRY, namespace: str = "semantic_router"):
+        """
+        Initialize metrics.
+        
+        Args:
+            registry: Registry the metrics are registered in (a fresh one per test)
+            namespace: Prefix of the metric names
+        """
+        self.registry = registry
+        self.stage_seconds = Histogram(
+            "stage_seconds",
+            "Duration of completed pipeline stages",
+            ["stage"],
+            namespace=namespace,
+            buckets=STAGE_BUCKETS,
+            registry=registry
+        )
+        self.queries = Counter(
+            "queries",
+            "Routed queries by path (high_confidence, cached, stored, ...)",
+            ["path"],
+            namespace=namespace,
+            registry=registry
+        )
+        self.in_flight = Gauge(
+            "in_flight_requests",
+            "Queries currently being routed",
+            namespace=namespace,
+            multiprocess_mode="livesum",
+            registry=registry
+        )
+        self.collection_entries = Gauge(
+            "collection_entries",
+            "Rows in the vector store, as of the last scrape",
+            namespace=namespace,
+            multiprocess_mode="livemostrecent",
+            registry=registry
+        )
+        # Every worker of a remote store reports the same server, so take the max
+        self.write_behind_dropped = Gauge(
+            "write_behind_dropped_rows",
+            "Rows the vector store's write-behind buffer dropped after failed flushes, as of the last scrape",
+            namespace=namespace,
+            multiprocess_mode="livemax",
+            registry=registry
+        )
+        # Resolve label children once, so the hot path skips the label lookup
+        self._stages = {stage: self.stage_seconds.labels(stage) for stage in STAGES}
+        self._paths = {}
+    
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record the duration of a completed stage."""
+        self._stages[stage].observe(seconds)
+    
+    @contextmanager
+    def time(self, stage: str):
+        """Record the duration of the with-block, unless it raises."""
+        start = time.perf_counter()
+        yield
+        self._stages[stage].observe(time.perf_counter() - start)
+    
+    def count_query(self, path: str) -> None:
+        """Count a routed query by its path."""
+        counter = self._paths.get(path)
+        if counter is None:
+            counter = self._paths[path] = self.queries.labels(path)
+        counter.inc()
+    
+    def render(self, storage=None) -> Tuple[bytes, str]:
+        """
+        Render the metrics in the Prometheus text format.
+        
+        Args:
+            storage: Vector store whose row count (count()) and write-behind
+                losses (stats()) are published, if it has them
+        
+        Returns:
+            (response body, content type)
+        """
+        count = getattr(storage, "count", None)
+        if callable(count):
+            try:
+                self.collection_entries.set(count())
+            except Exception as e:
+                logger.warning(f"Could not count vector store rows: {e}")
+        stats = getattr(storage, "stats", None)
+        if callable(stats):
+            try:
+                write_behind = (stats() or {}).get("write_behind")
+            except Exception as e:
+                logger.warning(f"Could not read vector store stats: {e}")
+            else:
+                if write_behind:
+                    self.write_behind_dropped.set(write_behind["dropped"])
+        return generate_latest(_scrape_registry(self.registry)), CONTENT_TYPE_LATEST
+
+
+def _scrape_registry(registry: CollectorRegistry) -> CollectorRegistry:
+    """Registry to serve: all workers' files in multiprocess mode, else the local one."""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return registry
+    aggregate = CollectorRegistry()
+    multiprocess.MultiProcessCollector(aggregate)
+    return aggregate
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a dead worker's live gauges (gunicorn child_exit hook)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,367 @@
+"""Load-balanced pool of Ollama backends."""
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+import httpx
+import ollama
+
+logger = logging.getLogger(__name__)
+
+
+def parse_keep_alive(value: str) -> Optional[Union[float, str]]:
+    """
+    Convert a keep_alive setting to the form the Ollama API expects.
+    
+    Args:
+        value: Seconds ("-1" keeps the model loaded indefinitely), a duration
+            such as "30m", or an empty string for the server default
+    
+    Returns:
+        Seconds as a number, the duration string, or None
+    """
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def check_model(client, model: str) -> None:
+    """
+    Check that a model is pulled, by listing models instead of running one.
+    
+    Args:
+        client: ollama.Client or OllamaPool
+        model: Model name; a name without a tag means ":latest"
+    
+    Raises:
+        LookupError: If the server does not have the model
+    """
+    def with_tag(name: str) -> str:
+        return name if ":" in name else f"{name}:latest"
+    
+    available = {with_tag(entry.model) for entry in client.list().models if entry.model}
+    if with_tag(model) not in available:
+        raise LookupError(f"Ollama model {model} is not pulled (have: {', '.join(sorted(available)) or 'none'})")
+
+
+class _Backend:
+    """One Ollama host with its clients and routing counters."""
+    
+    def __init__(self, host: str, timeout: Optional[float], max_concurrency: int):
+        self.host = host
+        self.timeout = timeout
+        # Keep one pooled keep-alive connection per allowed in-flight request
+        self.limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_concurrency
+        )
+        self.client = ollama.Client(host=host, timeout=timeout, limits=self.limits)
+        self._async_client = None
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.healthy = True
+    
+    @property
+    def async_client(self) -> ollama.AsyncClient:
+        """Lazily created async client (bound to the event loop that first uses it)."""
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient(host=self.host, timeout=self.timeout, limits=self.limits)
+        return self._async_client
+
+
+class OllamaPool:
+    """
+    Client-side load balancer over several Ollama hosts.
+    
+    Each request goes to the healthy backend with the fewest in-flight requests
+    (ties go to the one that has served fewer requests), and waits while every
+    backend is at ``max_concurrency``. A backend failing ``eject_after_failures``
+    calls in a row is ejected; a background health check re-admits it once it
+    answers again. Failed calls are retried once on each other backend, so a
+    dead host costs latency but not errors.
+    
+    The pool exposes the ``chat``/``embed``/``embeddings``/``list`` methods of
+    ``ollama.Client`` and can be passed wherever a client is expected;
+    ``async_client`` is the asyncio counterpart. ``for_each`` sends a request
+    to every backend, e.g. to load a model everywhere.
+    """
+    
+    def __init__(
+        self,
+        hosts: Sequence[str],
+        timeout: Optional[float] = None,
+        max_concurrency: int = 4,
+        eject_after_failures: int = 3,
+        health_check_seconds: float = 10.0
+    ):
+        """
+        Initialize pool and start the health checker.
+        
+        Args:
+            hosts: Ollama base URLs (e.g. "http://10.0.0.5:11434")
+            timeout: Request timeout in seconds (None waits indefinitely)
+            max_concurrency: Maximum in-flight requests per backend
+            eject_after_failures: Consecutive failures that eject a backend
+            health_check_seconds: Interval of health checks of ejected backends (0 disables)
+        
+        Raises:
+            ValueError: If no hosts are given
+        """
+        if not hosts:
+            raise ValueError("OllamaPool needs at least one host")
+        self.max_concurrency = max_concurrency
+        self.eject_after_failures = eject_after_failures
+        self.backends = [_Backend(host, timeout, max_concurrency) for host in hosts]
+        self._condition = threading.Condition()
+        # Futures of coroutines waiting for a slot, with the loop each belongs to
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.async_client = _AsyncPoolClient(self)
+        
+        self._stop = threading.Event()
+        self._health_thread = None
+        if health_check_seconds > 0:
+            self._health_thread = threading.Thread(
+                target=self._run_health_checks,
+                args=(health_check_seconds,),
+                name="ollama-health-check",
+                daemon=True
+            )
+            self._health_thread.start()
+    
+    def _pick(self, exclude: Set[str]) -> Optional[_Backend]:
+        """Least-outstanding backend with a free slot (caller holds the lock)."""
+        candidates = [backend for backend in self.backends if backend.host not in exclude]
+        # With every backend ejected, keep trying them rather than failing outright
+        healthy = [backend for backend in candidates if backend.healthy] or candidates
+        available = [backend for backend in healthy if backend.outstanding < self.max_concurrency]
+        if not available:
+            return None
+        return min(available, key=lambda backend: (backend.outstanding, backend.requests))
+    
+    def _acquire(self, exclude: Set[str], blocking: bool = True) -> Optional[_Backend]:
+        """Reserve a slot on the best backend, waiting for one if all are busy."""
+        with self._condition:
+            while True:
+                backend = self._pick(exclude)
+                if backend is not None:
+                    backend.outstanding += 1
+                    return backend
+                if not blocking:
+                    return None
+                self._condition.wait()
+    
+    async def _aacquire(self, exclude: Set[str]) -> _Backend:
+        """Reserve a slot on the best backend, awaiting a released slot if all are busy."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                backend = self._pick(exclude)
+                if backend is not None:
+                    backend.outstanding += 1
+                    return backend
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._condition:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+    
+    def _notify(self) -> None:
+        """Wake sync and async waiters after a slot or backend freed up (caller holds the lock)."""
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+    
+    def _release(self, backend: _Backend, failed: bool) -> None:
+        """Free a slot and update the backend's failure counters."""
+        with self._condition:
+            backend.outstanding -= 1
+            backend.requests += 1
+            if failed:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.healthy and backend.consecutive_failures >= self.eject_after_failures:
+                    backend.healthy = False
+                    logger.warning(f"Ejected Ollama backend {backend.host} after "
+                                   f"{backend.consecutive_failures} consecutive failures")
+            else:
+                backend.consecutive_failures = 0
+            self._notify()
+    
+    @staticmethod
+    def _is_backend_failure(error: Exception) -> bool:
+        """Whether an error says something about the backend (not the request)."""
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code >= 500
+        return isinstance(error, (ConnectionError, httpx.TransportError))
+    
+    def call(self, method: str, **kwargs) -> Any:
+        """
+        Call an ollama.Client method on the best backend.
+        
+        Args:
+            method: Client method name (e.g. "embed")
+            **kwargs: Method arguments
+        
+        Returns:
+            The method's response
+        
+        Raises:
+            Exception: The last backend's error if every attempt failed
+        """
+        tried: Set[str] = set()
+        while True:
+            backend = self._acquire(tried)
+            try:
+                response = getattr(backend.client, method)(**kwargs)
+            except Exception as e:
+                failed = self._is_backend_failure(e)
+                self._release(backend, failed)
+                tried.add(backend.host)
+                if failed and len(tried) < len(self.backends):
+                    logger.warning(f"Ollama backend {backend.host} failed ({e}), retrying on another")
+                    continue
+                raise
+            self._release(backend, False)
+            return response
+    
+    async def acall(self, method: str, **kwargs) -> Any:
+        """Async version of call, using each backend's ollama.AsyncClient."""
+        tried: Set[str] = set()
+        while True:
+            backend = self._acquire(tried, blocking=False) or await self._aacquire(tried)
+            try:
+                response = await getattr(backend.async_client, method)(**kwargs)
+            except Exception as e:
+                failed = self._is_backend_failure(e)
+                self._release(backend, failed)
+                tried.add(backend.host)
+                if failed and len(tried) < len(self.backends):
+                    logger.warning(f"Ollama backend {backend.host} failed ({e}), retrying on another")
+                    continue
+                raise
+            except BaseException:
+                self._release(backend, False)
+                raise
+            self._release(backend, False)
+            return response
+    
+    def chat(self, **kwargs) -> Any:
+        """Route ollama.Client.chat."""
+        return self.call("chat", **kwargs)
+    
+    def embed(self, **kwargs) -> Any:
+        """Route ollama.Client.embed."""
+        return self.call("embed", **kwargs)
+    
+    def embeddings(self, **kwargs) -> Any:
+        """Route ollama.Client.embeddings."""
+        return self.call("embeddings", **kwargs)
+    
+    def list(self) -> Any:
+        """Route ollama.Client.list."""
+        return self.call("list")
+    
+    def for_each(self, method: str, **kwargs) -> List[Any]:
+        """
+        Call an ollama.Client method on every healthy backend (outside the concurrency slots).
+        
+        Args:
+            method: Client method name
+            **kwargs: Method arguments
+        
+        Returns:
+            Responses of the backends that answered
+        
+        Raises:
+            Exception: The last error if no backend answered
+        """
+        responses = []
+        error = None
+        for backend in [backend for backend in self.backends if backend.healthy]:
+            try:
+                responses.append(getattr(backend.client, method)(**kwargs))
+            except Exception as e:
+                logger.warning(f"Ollama backend {backend.host} failed {method}: {e}")
+                error = e
+        if not responses and error is not None:
+            raise error
+        return responses
+    
+    def check_health(self) -> None:
+        """Probe ejected backends and re-admit those that answer."""
+        for backend in [backend for backend in self.backends if not backend.healthy]:
+            try:
+                backend.client.ps()
+            except Exception as e:
+                logger.debug(f"Ollama backend {backend.host} still unhealthy: {e}")
+                continue
+            with self._condition:
+                backend.healthy = True
+                backend.consecutive_failures = 0
+                self._notify()
+            logger.info(f"Re-admitted Ollama backend {backend.host}")
+    
+    def _run_health_checks(self, interval: float) -> None:
+        """Health-check loop run by the background thread."""
+        while not self._stop.wait(interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.error(f"Ollama health check failed: {e}")
+    
+    def close(self) -> None:
+        """Stop the health checker and close the sync clients."""
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+        for backend in self.backends:
+            backend.client.close()
+    
+    def stats(self) -> List[Dict]:
+        """Return routing counters per backend."""
+        with self._condition:
+            return [
+                {
+                    "host": backend.host,
+                    "healthy": backend.healthy,
+                    "outstanding": backend.outstanding,
+                    "requests": backend.requests,
+                    "failures": backend.failures
+                }
+                for backend in self.backends
+            ]
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    """Resolve a slot waiter on its own loop (it may have been cancelled meanwhile)."""
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _AsyncPoolClient:
+    """ollama.AsyncClient-like view of a pool."""
+    
+    def __init__(self, pool: OllamaPool):
+        self._pool = pool
+    
+    async def chat(self, **kwargs) -> Any:
+        """Route ollama.AsyncClient.chat."""
+        return await self._pool.acall("chat", **kwargs)
+    
+    async def embed(self, **kwargs) -> Any:
+        """Route ollama.AsyncClient.embed."""
+        return await self._pool.acall("embed", **kwargs)
+    
+    async def embeddings(self, **kwargs) -> Any:
+        """Route ollama.AsyncClient.embeddings."""
+        return await self._pool.acall("embeddings", **kwargs)
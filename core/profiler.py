@@ -0,0 +1,201 @@
+"""On-demand sampling profiler for a fraction of live requests.
+
+A profiling session is started by writing a control file (rate and end
+time) into the profile directory, so every gunicorn worker picks it up
+within a second without a restart. While a session is active, a sampled
+request registers its thread and a background thread snapshots the stacks
+of registered threads every few milliseconds with sys._current_frames().
+Unsampled requests pay one random() call, and nothing runs outside a
+session. When the session ends, each process writes its aggregated stacks
+in the collapsed format ("frame;frame;frame count" per line). That format is
+read by flamegraph.pl, speedscope and inferno.
+
+On the async path all requests share the event loop thread, so while any
+sampled request is in flight the samples include whatever coroutine the
+loop is running.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTROL_FILE = "control.json"
+
+
+class SamplingProfiler:
+    """Stack sampler for a configurable fraction of requests, shared across processes via a control file."""
+    
+    def __init__(self, directory: str = "./profiles", interval_ms: float = 5.0, refresh_seconds: float = 1.0):
+        """
+        Initialize profiler.
+        
+        Args:
+            directory: Where the control file and stack dumps live
+            interval_ms: Time between stack samples
+            refresh_seconds: How often the control file is re-read
+        """
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.refresh_seconds = refresh_seconds
+        self.sample_rate = 0.0
+        self.until = 0.0
+        self.last_dump: Optional[str] = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._sampled_requests = 0
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._next_refresh = 0.0
+    
+    @property
+    def active(self) -> bool:
+        """Whether a session is running in this process."""
+        return self.sample_rate > 0 and time.time() < self.until
+    
+    def configure(self, sample_rate: float, duration_seconds: float) -> Dict:
+        """
+        Start (or, with sample_rate 0, stop) a session in every process sharing the directory.
+        
+        Args:
+            sample_rate: Fraction of requests to sample (0-1)
+            duration_seconds: Session length
+        
+        Returns:
+            Status of this process after applying the new session
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, CONTROL_FILE)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"sample_rate": sample_rate, "until": time.time() + duration_seconds}, f)
+        os.replace(temp_path, path)
+        self._next_refresh = 0.0
+        self._refresh()
+        return self.status()
+    
+    @contextmanager
+    def request(self):
+        """Sample the with-block's thread if a session is active and the request is drawn."""
+        self._refresh()
+        if not self.active or random.random() >= self.sample_rate:
+            yield
+            return
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+            self._sampled_requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._threads[thread_id] == 1:
+                    del self._threads[thread_id]
+                else:
+                    self._threads[thread_id] -= 1
+    
+    def dump(self) -> Optional[str]:
+        """
+        Write this process's aggregated stacks and reset them.
+        
+        Returns:
+            Path of the collapsed-stack file, or None if there were no samples
+        """
+        with self._lock:
+            stacks, self._stacks = self._stacks, Counter()
+            self._samples = 0
+        if not stacks:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"stacks-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.last_dump = path
+        logger.info(f"Wrote {len(stacks)} sampled stacks to {path}")
+        return path
+    
+    def status(self) -> Dict:
+        """Return this process's session state and the dumps in the directory."""
+        with self._lock:
+            samples, sampled_requests = self._samples, self._sampled_requests
+        return {
+            "pid": os.getpid(),
+            "active": self.active,
+            "sample_rate": self.sample_rate,
+            "remaining_seconds": max(0.0, round(self.until - time.time(), 1)) if self.active else 0.0,
+            "samples": samples,
+            "sampled_requests": sampled_requests,
+            "last_dump": self.last_dump,
+            "dumps": self.list_dumps()
+        }
+    
+    def list_dumps(self) -> List[str]:
+        """Stack files written by any process into the directory."""
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.startswith("stacks-"))
+        except FileNotFoundError:
+            return []
+    
+    def _refresh(self) -> None:
+        """Re-read the control file (at most once per refresh interval)."""
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        self._next_refresh = now + self.refresh_seconds
+        try:
+            with open(os.path.join(self.directory, CONTROL_FILE), encoding="utf-8") as f:
+                control = json.load(f)
+            self.sample_rate = float(control["sample_rate"])
+            self.until = float(control["until"])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable profiler control file: {e}")
+            return
+        if self.active:
+            self._start_sampler()
+    
+    def _start_sampler(self) -> None:
+        """Start the sampling thread unless it is running."""
+        with self._lock:
+            if self._sampler is not None and self._sampler.is_alive():
+                return
+            self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._sampler.start()
+        logger.info(f"Profiling {self.sample_rate:.1%} of requests")
+    
+    def _run(self) -> None:
+        """Sample registered threads until the session ends, then dump."""
+        own_id = threading.get_ident()
+        while self.active:
+            time.sleep(self.interval)
+            self._refresh()
+            with self._lock:
+                thread_ids = [thread_id for thread_id in self._threads if thread_id != own_id]
+            if not thread_ids:
+                continue
+            frames = sys._current_frames()
+            collapsed = [_collapse(frames[thread_id]) for thread_id in thread_ids if thread_id in frames]
+            with self._lock:
+                self._stacks.update(collapsed)
+                self._samples += len(collapsed)
+        self.dump()
+
+
+def _collapse(frame) -> str:
+    """Render a frame's stack root-first as "file:function;..."."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
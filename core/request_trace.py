@@ -0,0 +1,86 @@
+"""Per-request timing and similarity trace for Server-Timing and debug responses.
+
+The trace of the current request lives in a context variable, so the
+service records into it without the trace being threaded through every
+call. Work the async path hands to the storage pool runs in a copy of the
+caller's context and records into the same trace. A debug trace also
+asks the service for the nearest row of a tier that missed, so misses show
+how far off they were. Requests collapsed onto another request's pipeline
+run (single flight) do not see that run's stages.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+_current: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Stage durations and top similarities of one request."""
+    
+    def __init__(self, debug: bool = False):
+        """
+        Initialize trace.
+        
+        Args:
+            debug: Whether the request asked for a debug block (misses then
+                cost one extra unthresholded lookup to report the nearest similarity)
+        """
+        self.debug = debug
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.similarities: Dict[str, Optional[float]] = {}
+    
+    def add_stage(self, stage: str, seconds: float) -> None:
+        """Add a stage duration (repeated stages, e.g. entry and alias puts, are summed)."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+    
+    def add_similarity(self, tier: str, similarity: Optional[float]) -> None:
+        """
+        Record the best similarity a tier's lookup returned.
+        
+        Debug traces record the nearest row's similarity for misses as well.
+        
+        Args:
+            tier: Lookup tier ("first_tier" or "second_tier")
+            similarity: Best similarity, or None for no match above threshold
+        """
+        self.similarities[tier] = similarity
+    
+    def total(self) -> float:
+        """Seconds since the trace started."""
+        return time.perf_counter() - self.started
+    
+    def server_timing(self) -> str:
+        """Format the stages as a Server-Timing header value (durations in ms)."""
+        metrics = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        metrics.append(f"total;dur={self.total() * 1000:.2f}")
+        return ", ".join(metrics)
+    
+    def to_dict(self) -> Dict:
+        """Debug block with stage durations in ms and per-tier similarities."""
+        return {
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()},
+            "total_ms": round(self.total() * 1000, 3),
+            "similarities": {
+                tier: None if similarity is None else round(similarity, 4)
+                for tier, similarity in self.similarities.items()
+            }
+        }
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Trace of the request being handled, or None if it is not traced."""
+    return _current.get()
+
+
+@contextmanager
+def trace_request(debug: bool = False):
+    """Trace the with-block as one request and yield its RequestTrace (see RequestTrace.__init__)."""
+    trace = RequestTrace(debug=debug)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
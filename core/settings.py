@@ -10,14 +10,153 @@ class Settings:
     
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "embeddinggemma:300m")
     
+    # Micro-batching of concurrent embedding calls (size 0 disables it)
+    EMBEDDING_BATCH_MAX_SIZE: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "2"))
+    
+    # Embedding memoization: in-memory LRU plus a SQLite file shared by all workers
+    # (empty path keeps the memory tier only, size 0 disables caching)
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+    
+    # Reduced-dimension embeddings: output dimension (0 keeps the model's full size)
+    # and "truncate" (Matryoshka prefix) or "pca" (projection from cli.fit_projection)
+    EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
+    EMBEDDING_REDUCTION: str = os.getenv("EMBEDDING_REDUCTION", "truncate")
+    EMBEDDING_PROJECTION_PATH: str = os.getenv("EMBEDDING_PROJECTION_PATH", "./cache/projection.npz")
+    
     TRANSFORMER_MODEL: str = os.getenv("TRANSFORMER_MODEL", "llama3.1:latest")
     
+    # Normalization memoization keyed by model and prompt version
+    # (empty path keeps the memory tier only, size 0 disables caching)
+    TRANSFORM_CACHE_PATH: str = os.getenv("TRANSFORM_CACHE_PATH", "./cache/transforms.sqlite3")
+    TRANSFORM_CACHE_SIZE: int = int(os.getenv("TRANSFORM_CACHE_SIZE", "4096"))
+    TRANSFORM_CACHE_TTL_SECONDS: float = float(os.getenv("TRANSFORM_CACHE_TTL_SECONDS", "604800"))
+    
+    # Query normalizer: "llm" (Ollama), "rules" (deterministic, CPU only) or "tiered"
+    # (rules first, LLM only when the rule output misses the cache)
+    QUERY_TRANSFORMER: str = os.getenv("QUERY_TRANSFORMER", "llm")
+    # JSON object mapping phrases to canonical phrases for the rule-based normalizer
+    TRANSFORM_ALIASES_PATH: str = os.getenv("TRANSFORM_ALIASES_PATH", "./transformer/aliases.json")
+    
+    # Vector store backend: "chroma" (HNSW via ChromaDB), "numpy" (brute-force float32
+    # matrix) or "remote" (one index server process shared by all workers)
+    VECTOR_STORE: str = os.getenv("VECTOR_STORE", "chroma")
+    
+    # Shared index server (VECTOR_STORE=remote): the owner process holds an
+    # INDEX_SERVER_BACKEND ("chroma" or "numpy") store and serves it on a Unix socket;
+    # gunicorn starts it before the workers unless AUTOSTART is off
+    INDEX_SERVER_SOCKET: str = os.getenv("INDEX_SERVER_SOCKET", "/tmp/queryembeddings-index.sock")
+    INDEX_SERVER_BACKEND: str = os.getenv("INDEX_SERVER_BACKEND", "chroma")
+    INDEX_SERVER_TIMEOUT_SECONDS: float = float(os.getenv("INDEX_SERVER_TIMEOUT_SECONDS", "10"))
+    INDEX_SERVER_AUTOSTART: bool = os.getenv("INDEX_SERVER_AUTOSTART", "true").lower() in ("1", "true", "yes")
+    
     CHROMA_COLLECTION_NAME: str = os.getenv("CHROMA_COLLECTION_NAME", "query_embeddings")
     CHROMA_PERSIST_DIR: str = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
     
+    # HNSW index parameters for new Chroma collections (cosine space); existing
+    # collections keep theirs until rebuilt with `python -m cli.reindex`
+    CHROMA_HNSW_M: int = int(os.getenv("CHROMA_HNSW_M", "16"))
+    CHROMA_HNSW_CONSTRUCTION_EF: int = int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "100"))
+    CHROMA_HNSW_SEARCH_EF: int = int(os.getenv("CHROMA_HNSW_SEARCH_EF", "100"))
+    CHROMA_HNSW_SYNC_THRESHOLD: int = int(os.getenv("CHROMA_HNSW_SYNC_THRESHOLD", "1000"))
+    CHROMA_HNSW_BATCH_SIZE: int = int(os.getenv("CHROMA_HNSW_BATCH_SIZE", "100"))
+    
+    # Write-behind inserts: put() returns immediately, rows are added in background batches
+    CHROMA_WRITE_BEHIND: bool = os.getenv("CHROMA_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+    CHROMA_WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("CHROMA_WRITE_BEHIND_BATCH_SIZE", "256"))
+    CHROMA_WRITE_BEHIND_FLUSH_MS: float = float(os.getenv("CHROMA_WRITE_BEHIND_FLUSH_MS", "50"))
+    CHROMA_WRITE_BEHIND_MAX_PENDING: int = int(os.getenv("CHROMA_WRITE_BEHIND_MAX_PENDING", "10000"))
+    
+    # Eviction: bound the collection by size (least hit rows first) and age (0 disables)
+    CHROMA_MAX_ENTRIES: int = int(os.getenv("CHROMA_MAX_ENTRIES", "0"))
+    CHROMA_MAX_AGE_SECONDS: float = float(os.getenv("CHROMA_MAX_AGE_SECONDS", "0"))
+    CHROMA_EVICTION_INTERVAL_SECONDS: float = float(os.getenv("CHROMA_EVICTION_INTERVAL_SECONDS", "60"))
+    CHROMA_COMPACTION_INTERVAL_SECONDS: float = float(os.getenv("CHROMA_COMPACTION_INTERVAL_SECONDS", "3600"))
+    
+    NUMPY_STORE_DIR: str = os.getenv("NUMPY_STORE_DIR", "./numpy_store")
+    # Compact mode: "int8" or "binary" codes prefilter candidates, which are
+    # rescored with exact float cosine ("none" scans the float matrix)
+    NUMPY_STORE_QUANTIZATION: str = os.getenv("NUMPY_STORE_QUANTIZATION", "none")
+    NUMPY_STORE_RERANK_CANDIDATES: int = int(os.getenv("NUMPY_STORE_RERANK_CANDIDATES", "256"))
+    
     SIMILARITY_THRESHOLD: float = float(os.getenv("SIMILARITY_THRESHOLD", "0.85"))
     
     HIGH_CONFIDENCE_THRESHOLD: float = float(os.getenv("HIGH_CONFIDENCE_THRESHOLD", "0.97"))
+    
+    # Raw phrasings stored as alias rows of each canonical entry, so repeated
+    # wordings hit the first tier (0 stores the normalized query only)
+    ALIAS_MAX_PER_ENTRY: int = int(os.getenv("ALIAS_MAX_PER_ENTRY", "4"))
+    
+    # Maximum number of queries accepted by POST /query/batch
+    MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "64"))
+    
+    # Start the LLM transform in parallel with the first-tier lookup (costs wasted
+    # LLM calls on high-confidence hits in exchange for lower miss latency)
+    SPECULATIVE_TRANSFORM: bool = os.getenv("SPECULATIVE_TRANSFORM", "false").lower() in ("1", "true", "yes")
+    SPECULATIVE_TRANSFORM_THREADS: int = int(os.getenv("SPECULATIVE_TRANSFORM_THREADS", "8"))
+    
+    # Per-request latency budget: the LLM stage is skipped when its median latency
+    # exceeds the time left, and abandoned at the deadline (0 disables the budget)
+    LATENCY_BUDGET_MS: float = float(os.getenv("LATENCY_BUDGET_MS", "0"))
+    # Timeout of every Ollama request, in seconds (0 waits indefinitely)
+    OLLAMA_TIMEOUT_SECONDS: float = float(os.getenv("OLLAMA_TIMEOUT_SECONDS", "30"))
+    # How long Ollama keeps a model loaded after each request: seconds ("-1" pins it),
+    # a duration such as "30m", or empty for the server's OLLAMA_KEEP_ALIVE
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "-1")
+    # Load both models on every host during startup, before /readyz reports ready
+    OLLAMA_WARM_UP: bool = os.getenv("OLLAMA_WARM_UP", "true").lower() in ("1", "true", "yes")
+    # Delay between startup attempts while a dependency is unavailable
+    INIT_RETRY_SECONDS: float = float(os.getenv("INIT_RETRY_SECONDS", "5"))
+    
+    # Comma-separated Ollama base URLs to load-balance over (empty uses OLLAMA_HOST
+    # or localhost); each gets at most MAX_CONCURRENCY in-flight requests per pool
+    OLLAMA_HOSTS: str = os.getenv("OLLAMA_HOSTS", "")
+    OLLAMA_MAX_CONCURRENCY: int = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+    OLLAMA_EJECT_AFTER_FAILURES: int = int(os.getenv("OLLAMA_EJECT_AFTER_FAILURES", "3"))
+    OLLAMA_HEALTH_CHECK_SECONDS: float = float(os.getenv("OLLAMA_HEALTH_CHECK_SECONDS", "10"))
+    
+    # Circuit breakers around the transformer and embedding provider: open when the
+    # failure rate (errors, timeouts and calls slower than SLOW_CALL_MS) over the last
+    # WINDOW calls reaches FAILURE_RATE, and let a probe through after OPEN_SECONDS
+    CIRCUIT_BREAKER: bool = os.getenv("CIRCUIT_BREAKER", "true").lower() in ("1", "true", "yes")
+    CIRCUIT_BREAKER_WINDOW: int = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "50"))
+    CIRCUIT_BREAKER_MIN_CALLS: int = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "10"))
+    CIRCUIT_BREAKER_FAILURE_RATE: float = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+    CIRCUIT_BREAKER_SLOW_CALL_MS: float = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_MS", "5000"))
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30"))
+    
+    # Thread pool size for blocking vector-store calls on the async (ASGI) path
+    STORAGE_THREADS: int = int(os.getenv("STORAGE_THREADS", "8"))
+    
+    # Lexical near-duplicate tier: MinHash LSH over query words, checked before any
+    # model call; matches need at least this Jaccard similarity of their word sets
+    LEXICAL_INDEX: bool = os.getenv("LEXICAL_INDEX", "false").lower() in ("1", "true", "yes")
+    LEXICAL_INDEX_PATH: str = os.getenv("LEXICAL_INDEX_PATH", "./cache/lexical_index.jsonl")
+    LEXICAL_JACCARD_THRESHOLD: float = float(os.getenv("LEXICAL_JACCARD_THRESHOLD", "0.8"))
+    
+    # Prometheus metrics served on /metrics (multiprocess under gunicorn when
+    # PROMETHEUS_MULTIPROC_DIR is set, as run.sh does)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    
+    # Add a Server-Timing header with per-stage durations to every /query response
+    # (any request can ask for it, plus a debug block, with ?debug=1)
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+    
+    # Bearer token of the /admin endpoints (empty disables them)
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    # Sampling profiler started from POST /admin/profile: control file and stack dumps
+    # are kept in PROFILE_DIR, shared by all workers
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "./profiles")
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "3600"))
+    
+    # Exact-match result cache in front of the semantic pipeline (size 0 disables it)
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    QUERY_CACHE_TTL_SECONDS: float = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "300"))
+    # How often workers check CHROMA_PERSIST_DIR/evictions.signal, which the
+    # evicting process replaces, to drop results routed to evicted rows
+    QUERY_CACHE_EVICTION_POLL_SECONDS: float = float(os.getenv("QUERY_CACHE_EVICTION_POLL_SECONDS", "1"))
 
 
 settings = Settings()
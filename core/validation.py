@@ -0,0 +1,56 @@
+"""Request payload validation shared by the WSGI and ASGI entrypoints."""
+import hmac
+from core.settings import settings
+
+
+def validate_query(data: dict | None) -> str:
+    """Validate and extract query from request data."""
+    if not data or "query" not in data:
+        raise ValueError("Missing 'query' field")
+    
+    query_text = data["query"]
+    if not isinstance(query_text, str) or not query_text.strip():
+        raise ValueError("Query must be a non-empty string")
+    
+    return query_text
+
+
+def validate_queries(data: dict | None) -> list[str]:
+    """Validate and extract a list of queries from request data."""
+    if not data or "queries" not in data:
+        raise ValueError("Missing 'queries' field")
+    
+    queries = data["queries"]
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("'queries' must be a non-empty list")
+    if len(queries) > settings.MAX_BATCH_SIZE:
+        raise ValueError(f"Batch size exceeds limit of {settings.MAX_BATCH_SIZE}")
+    if not all(isinstance(q, str) and q.strip() for q in queries):
+        raise ValueError("Each query must be a non-empty string")
+    
+    return queries
+
+
+def validate_profile_request(data: dict | None) -> tuple[float, float]:
+    """Validate and extract (sample_rate, duration_seconds) of a profiling session."""
+    if not data or "sample_rate" not in data:
+        raise ValueError("Missing 'sample_rate' field")
+    
+    sample_rate = data["sample_rate"]
+    duration = data.get("duration_seconds", 60)
+    if isinstance(sample_rate, bool) or not isinstance(sample_rate, (int, float)) or not 0 <= sample_rate <= 1:
+        raise ValueError("'sample_rate' must be a number between 0 and 1")
+    if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration <= 0:
+        raise ValueError("'duration_seconds' must be a positive number")
+    if duration > settings.PROFILE_MAX_SECONDS:
+        raise ValueError(f"'duration_seconds' exceeds limit of {settings.PROFILE_MAX_SECONDS:g}")
+    
+    return float(sample_rate), float(duration)
+
+
+def is_admin(authorization: str | None) -> bool:
+    """Check an Authorization header against ADMIN_TOKEN (always False when no token is set)."""
+    if not settings.ADMIN_TOKEN or not authorization:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), settings.ADMIN_TOKEN)
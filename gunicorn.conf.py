@@ -0,0 +1,34 @@
+"""Gunicorn settings shared by run.sh (loaded automatically from the working directory)."""
+import logging
+import subprocess
+import sys
+from core.metrics import mark_process_dead
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared index server process owned by the gunicorn master (VECTOR_STORE=remote)
+_index_server = None
+
+
+def on_starting(server):
+    """Start the shared index server before the workers, which connect to it as it comes up."""
+    global _index_server
+    if settings.VECTOR_STORE == "remote" and settings.INDEX_SERVER_AUTOSTART:
+        _index_server = subprocess.Popen([sys.executable, "-m", "cli.index_server"])
+        logger.info(f"Started index server (pid {_index_server.pid})")
+
+
+def on_exit(server):
+    """Stop the index server after the workers, letting it flush pending writes."""
+    if _index_server is not None and _index_server.poll() is None:
+        _index_server.terminate()
+        try:
+            _index_server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            _index_server.kill()
+
+
+def child_exit(server, worker):
+    """Drop the exited worker's live metric gauges."""
+    mark_process_dead(worker.pid)
@@ -1,4 +1,5 @@
 """Abstract base class for embedding provider implementations."""
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List
 
@@ -22,6 +23,57 @@ class EmbeddingProvider(ABC):
         """
         pass
     
+    def create_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embedding vectors for several texts.
+        
+        Backends that can embed a list in one request should override this;
+        the default embeds the texts one by one.
+        
+        Args:
+            texts: Input texts to embed
+            
+        Returns:
+            Embedding vectors in the same order as the texts
+            
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return [self.create(text) for text in texts]
+    
+    async def acreate(self, text: str) -> List[float]:
+        """
+        Asynchronously create embedding vector for given text.
+        
+        Backends with a native async client should override this; the default
+        runs create() in a worker thread.
+        
+        Args:
+            text: Input text to embed
+            
+        Returns:
+            List of floats representing the embedding vector
+            
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return await asyncio.to_thread(self.create, text)
+    
+    async def acreate_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Asynchronously create embedding vectors for several texts.
+        
+        Args:
+            texts: Input texts to embed
+            
+        Returns:
+            Embedding vectors in the same order as the texts
+            
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return await asyncio.to_thread(self.create_batch, texts)
+    
     @abstractmethod
     def ping(self) -> bool:
         """
@@ -0,0 +1,237 @@
+"""Micro-batching embedding provider."""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from providers.base import EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BatchingEmbeddingProvider(EmbeddingProvider):
+    """
+    Embedding provider decorator that merges concurrent create() calls into batches.
+    
+    Callers enqueue their text and block on a future. A background scheduler
+    takes the first waiting request, collects more for at most ``max_wait_ms``
+    (measured from when that first request arrived) or until ``max_batch_size``
+    texts are queued, then issues one create_batch() call on the wrapped
+    provider and fans the vectors back out. An isolated request therefore
+    waits at most one window before its embedding call starts.
+    """
+    
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        max_concurrent_batches: int = 4,
+        timeout: Optional[float] = 60.0
+    ):
+        """
+        Initialize micro-batching provider.
+        
+        Args:
+            provider: Wrapped embedding provider (should implement create_batch natively)
+            max_batch_size: Maximum number of texts per batched call
+            max_wait_ms: Maximum time the first request of a batch waits for company
+            max_concurrent_batches: Number of batched calls allowed in flight at once
+            timeout: Seconds a caller waits for its vector, queueing included
+                (None waits indefinitely)
+        """
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self.provider = provider
+        self.model = getattr(provider, "model", None)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_concurrent_batches = max_concurrent_batches
+        self.timeout = timeout
+        self.batches = 0
+        self.items = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._scheduler = None
+        self._dispatcher = None
+    
+    def _ensure_started(self) -> None:
+        """Start the scheduler thread on first use (after any gunicorn fork)."""
+        if self._scheduler is not None:
+            return
+        with self._start_lock:
+            if self._scheduler is None:
+                self._dispatcher = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent_batches,
+                    thread_name_prefix="embedding-batch"
+                )
+                scheduler = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                scheduler.start()
+                self._scheduler = scheduler
+    
+    def _submit(self, text: str) -> Future:
+        """Enqueue a text and return the future its vector will be delivered to."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future, time.monotonic()))
+        return future
+    
+    def _run(self) -> None:
+        """Scheduler loop: collect requests into batches and dispatch them."""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = item[2] + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._submit_batch(batch)
+                    return
+                batch.append(item)
+            
+            self._submit_batch(batch)
+    
+    def _submit_batch(self, batch: List[tuple]) -> None:
+        """Count a collected batch and hand it to the dispatch pool."""
+        self.batches += 1
+        self.items += len(batch)
+        self._dispatcher.submit(self._dispatch, batch)
+    
+    def _dispatch(self, batch: List[tuple]) -> None:
+        """Embed one batch with the wrapped provider and resolve the waiting futures."""
+        futures_by_text: Dict[str, List[Future]] = {}
+        for text, future, _ in batch:
+            futures_by_text.setdefault(text, []).append(future)
+        texts = list(futures_by_text)
+        
+        try:
+            embeddings = self.provider.create_batch(texts)
+            if len(embeddings) != len(texts):
+                # Vectors cannot be matched to texts; fail every caller rather than guess
+                raise ValueError(f"Embedding provider returned {len(embeddings)} vectors for {len(texts)} texts")
+        except Exception as e:
+            for futures in futures_by_text.values():
+                for future in futures:
+                    _resolve(future, error=e)
+            return
+        
+        for text, embedding in zip(texts, embeddings):
+            for future in futures_by_text[text]:
+                _resolve(future, embedding)
+    
+    def create(self, text: str) -> List[float]:
+        """
+        Create embedding vector for given text as part of the next batch.
+        
+        Args:
+            text: Input text to embed
+        
+        Returns:
+            List of floats representing the embedding vector
+        
+        Raises:
+            TimeoutError: If the vector does not arrive within the timeout
+            Exception: If embedding generation fails
+        """
+        return self._submit(text).result(timeout=self.timeout)
+    
+    def create_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embedding vectors for an already batched request.
+        
+        Explicit batches skip the scheduler and go straight to the wrapped provider.
+        
+        Args:
+            texts: Input texts to embed
+        
+        Returns:
+            Embedding vectors in the same order as the texts
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return self.provider.create_batch(texts)
+    
+    async def acreate(self, text: str) -> List[float]:
+        """
+        Asynchronously create embedding vector as part of the next batch.
+        
+        Args:
+            text: Input text to embed
+        
+        Returns:
+            List of floats representing the embedding vector
+        
+        Raises:
+            TimeoutError: If the vector does not arrive within the timeout
+            Exception: If embedding generation fails
+        """
+        return await asyncio.wait_for(asyncio.wrap_future(self._submit(text)), self.timeout)
+    
+    async def acreate_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Asynchronously create embedding vectors for an already batched request.
+        
+        Args:
+            texts: Input texts to embed
+        
+        Returns:
+            Embedding vectors in the same order as the texts
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return await self.provider.acreate_batch(texts)
+    
+    def ping(self) -> bool:
+        """
+        Check if the wrapped embedding service is accessible and healthy.
+        
+        Returns:
+            True if the service is accessible, False otherwise
+        
+        Raises:
+            Exception: If the service connection fails
+        """
+        return self.provider.ping()
+    
+    def close(self) -> None:
+        """Stop the scheduler after the queued requests have been dispatched."""
+        if self._scheduler is not None:
+            self._queue.put(_STOP)
+            self._scheduler.join()
+            self._dispatcher.shutdown(wait=True)
+    
+    def stats(self) -> Dict:
+        """Return batch counters."""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+def _resolve(future: Future, result=None, error: Optional[Exception] = None) -> None:
+    """Deliver a batch outcome, unless the caller has already given up on the future."""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
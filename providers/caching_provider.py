@@ -0,0 +1,287 @@
+"""Caching embedding provider with in-memory LRU and persistent SQLite tiers."""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from core.lru_cache import LRUCache
+from providers.base import EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+
+class CachingEmbeddingProvider(EmbeddingProvider):
+    """
+    Embedding provider decorator that memoizes vectors by (model, text hash).
+    
+    Lookups go through an in-process LRU first, then a SQLite database shared by
+    every worker on the host, and only then the wrapped provider. Keys always
+    include the model name, so switching EMBEDDING_MODEL never serves vectors
+    computed by another model.
+    """
+    
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        model: str,
+        cache_path: Optional[str] = None,
+        memory_size: int = 4096
+    ):
+        """
+        Initialize caching embedding provider.
+        
+        Args:
+            provider: Wrapped embedding provider
+            model: Name of the model the wrapped provider embeds with
+            cache_path: SQLite file for the persistent tier (None keeps memory only)
+            memory_size: Number of vectors kept in the in-memory LRU tier
+        """
+        self.provider = provider
+        self.model = model
+        self.cache_path = cache_path
+        self._memory = LRUCache(max_size=memory_size)
+        self._disk_hits = 0
+        self._lock = threading.Lock()
+        self._conn = self._open(cache_path) if cache_path else None
+    
+    @staticmethod
+    def _open(cache_path: str) -> sqlite3.Connection:
+        """Open (and create if needed) the shared SQLite cache."""
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+        # WAL lets gunicorn workers read concurrently while one of them writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, "
+            "text_hash TEXT NOT NULL, "
+            "vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        conn.commit()
+        return conn
+    
+    @staticmethod
+    def _hash(text: str) -> str:
+        """Hash text into a fixed-size cache key."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def _load(self, text_hash: str) -> Optional[List[float]]:
+        """Read a vector from the persistent tier."""
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM embeddings WHERE model = ? AND text_hash = ?",
+                (self.model, text_hash)
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+    
+    def _save(self, text_hash: str, embedding: List[float]) -> None:
+        """Write a vector to the persistent tier."""
+        self._save_many([(text_hash, embedding)])
+    
+    def _save_many(self, rows: List[tuple]) -> None:
+        """Write (text_hash, vector) pairs to the persistent tier in one transaction."""
+        if self._conn is None or not rows:
+            return
+        params = [
+            (self.model, text_hash, np.asarray(embedding, dtype=np.float32).tobytes())
+            for text_hash, embedding in rows
+        ]
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    params
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            # The cache is an optimization; a failed write must not fail the request
+            logger.warning(f"Failed to persist cached embedding: {e}")
+    
+    def _lookup(self, text_hash: str) -> Optional[List[float]]:
+        """Look a vector up in the memory tier, then the persistent tier."""
+        key = (self.model, text_hash)
+        embedding = self._memory.get(key)
+        if embedding is not None:
+            return embedding
+        
+        embedding = self._load(text_hash)
+        if embedding is not None:
+            self._disk_hits += 1
+            self._memory.set(key, embedding)
+        return embedding
+    
+    def _split(self, texts: List[str], persistent: bool = True) -> tuple:
+        """
+        Resolve cached vectors; returns (embeddings with None gaps, missing text -> indices).
+        
+        With persistent=False only the memory tier is consulted (see _load_missing).
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            embedding = self._memory.get((self.model, self._hash(text)))
+            if embedding is None:
+                missing.setdefault(text, []).append(i)
+            else:
+                embeddings[i] = embedding
+        if persistent and missing:
+            missing = self._load_missing(embeddings, missing)
+        return embeddings, missing
+    
+    def _load_missing(self, embeddings: list, missing: Dict[str, List[int]]) -> Dict[str, List[int]]:
+        """Fill gaps from the persistent tier; returns the texts that are still missing."""
+        still_missing: Dict[str, List[int]] = {}
+        for text, indices in missing.items():
+            embedding = self._lookup(self._hash(text))
+            if embedding is None:
+                still_missing[text] = indices
+                continue
+            for i in indices:
+                embeddings[i] = embedding
+        return still_missing
+    
+    def _fill(self, embeddings: list, missing: Dict[str, List[int]], created: List[List[float]]) -> List[tuple]:
+        """Place newly created vectors, cache them in memory and return rows to persist."""
+        rows = []
+        for text, embedding in zip(missing, created):
+            text_hash = self._hash(text)
+            self._memory.set((self.model, text_hash), embedding)
+            rows.append((text_hash, embedding))
+            for i in missing[text]:
+                embeddings[i] = embedding
+        return rows
+    
+    def create(self, text: str) -> List[float]:
+        """
+        Create embedding vector for given text, serving cached vectors when possible.
+        
+        Args:
+            text: Input text to embed
+        
+        Returns:
+            List of floats representing the embedding vector
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        text_hash = self._hash(text)
+        embedding = self._lookup(text_hash)
+        if embedding is not None:
+            return embedding
+        
+        embedding = self.provider.create(text)
+        self._memory.set((self.model, text_hash), embedding)
+        self._save(text_hash, embedding)
+        return embedding
+    
+    def create_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embedding vectors for several texts, embedding only cache misses.
+        
+        Misses are sent to the wrapped provider in a single batch and written
+        to the persistent tier in one transaction.
+        
+        Args:
+            texts: Input texts to embed
+        
+        Returns:
+            Embedding vectors in the same order as the texts
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        embeddings, missing = self._split(texts)
+        if missing:
+            created = self.provider.create_batch(list(missing))
+            self._save_many(self._fill(embeddings, missing, created))
+        return embeddings
+    
+    async def acreate(self, text: str) -> List[float]:
+        """
+        Asynchronously create embedding vector, serving cached vectors when possible.
+        
+        A miss goes to the wrapped provider's acreate (not acreate_batch), so a
+        BatchingEmbeddingProvider below still merges concurrent misses.
+        
+        Args:
+            text: Input text to embed
+        
+        Returns:
+            List of floats representing the embedding vector
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        embeddings, missing = self._split([text], persistent=False)
+        if missing and self._conn is not None:
+            # SQLite reads may wait on another worker's write lock; keep them off the event loop
+            missing = await asyncio.to_thread(self._load_missing, embeddings, missing)
+        if not missing:
+            return embeddings[0]
+        
+        embedding = await self.provider.acreate(text)
+        text_hash = self._hash(text)
+        self._memory.set((self.model, text_hash), embedding)
+        await asyncio.to_thread(self._save, text_hash, embedding)
+        return embedding
+    
+    async def acreate_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Asynchronously create embedding vectors, embedding only cache misses.
+        
+        Args:
+            texts: Input texts to embed
+        
+        Returns:
+            Embedding vectors in the same order as the texts
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        embeddings, missing = self._split(texts, persistent=False)
+        if missing and self._conn is not None:
+            # SQLite reads may wait on another worker's write lock; keep them off the event loop
+            missing = await asyncio.to_thread(self._load_missing, embeddings, missing)
+        if missing:
+            created = await self.provider.acreate_batch(list(missing))
+            rows = self._fill(embeddings, missing, created)
+            # SQLite writes may wait on another worker's lock; keep them off the event loop
+            await asyncio.to_thread(self._save_many, rows)
+        return embeddings
+    
+    def ping(self) -> bool:
+        """
+        Check if the wrapped embedding service is accessible and healthy.
+        
+        Returns:
+            True if the service is accessible, False otherwise
+        
+        Raises:
+            Exception: If the service connection fails
+        """
+        return self.provider.ping()
+    
+    def stats(self) -> Dict:
+        """Return hit counters for both cache tiers."""
+        memory = self._memory.stats()
+        cache_stats = {
+            "memory_hits": memory["hits"],
+            "disk_hits": self._disk_hits,
+            "misses": memory["misses"] - self._disk_hits,
+            "memory_size": memory["size"],
+        }
+        provider_stats = getattr(self.provider, "stats", None)
+        if callable(provider_stats):
+            cache_stats["provider"] = provider_stats()
+        return cache_stats
@@ -1,7 +1,8 @@
 """Ollama embedding provider."""
 import ollama
-from typing import List
+from typing import List, Optional, Union
 import logging
+from core.ollama_pool import OllamaPool, check_model
 from providers.base import EmbeddingProvider
 
 logger = logging.getLogger(__name__)
@@ -10,14 +11,35 @@ logger = logging.getLogger(__name__)
 class OllamaEmbeddingProvider(EmbeddingProvider):
     """Provider for generating embeddings using Ollama API."""
     
-    def __init__(self, model: str):
+    def __init__(
+        self,
+        model: str,
+        timeout: Optional[float] = None,
+        pool: Optional[OllamaPool] = None,
+        keep_alive: Optional[Union[float, str]] = None
+    ):
         """
         Initialize Ollama embedding provider.
         
         Args:
             model: The embedding model to use (e.g., 'embeddinggemma:300m')
+            timeout: Seconds before an Ollama request is abandoned (None waits indefinitely)
+            pool: Load-balanced backends to use instead of the default host
+            keep_alive: How long Ollama keeps the model loaded after each request
+                (negative pins it, None uses the server default)
         """
         self.model = model
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.client = pool if pool is not None else ollama.Client(timeout=timeout)
+        self._async_client = pool.async_client if pool is not None else None
+    
+    @property
+    def async_client(self) -> ollama.AsyncClient:
+        """Lazily created async client (bound to the event loop that first uses it)."""
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient(timeout=self.timeout)
+        return self._async_client
     
     def create(self, text: str) -> List[float]:
         """
@@ -25,40 +47,118 @@ class OllamaEmbeddingProvider(EmbeddingProvider):
         
         Args:
             text: Input text to embed
-            
+        
+        Returns:
+            List of floats representing the embedding vector
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return self.create_batch([text])[0]
+    
+    def create_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embedding vectors for several texts in one Ollama request.
+        
+        Single and batched calls both go through the /api/embed endpoint so
+        they always return identically scaled vectors.
+        
+        Args:
+            texts: Input texts to embed
+        
+        Returns:
+            Embedding vectors in the same order as the texts
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        if not texts:
+            return []
+        try:
+            response = self.client.embed(model=self.model, input=texts, keep_alive=self.keep_alive)
+            return self._parse_embeddings(response, len(texts))
+        except Exception as e:
+            logger.error(f"Failed to create embedding: {e}")
+            raise
+    
+    async def acreate(self, text: str) -> List[float]:
+        """
+        Create embedding vector for given text with the async Ollama client.
+        
+        Args:
+            text: Input text to embed
+        
         Returns:
             List of floats representing the embedding vector
-            
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return (await self.acreate_batch([text]))[0]
+    
+    async def acreate_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embedding vectors for several texts with the async Ollama client.
+        
+        Args:
+            texts: Input texts to embed
+        
+        Returns:
+            Embedding vectors in the same order as the texts
+        
         Raises:
             Exception: If embedding generation fails
         """
+        if not texts:
+            return []
         try:
-            response = ollama.embeddings(model=self.model, prompt=text)
-            embedding = response.get("embedding", [])
-            if not embedding:
-                raise ValueError("Ollama returned empty embedding")
-            return embedding
+            response = await self.async_client.embed(model=self.model, input=texts, keep_alive=self.keep_alive)
+            return self._parse_embeddings(response, len(texts))
         except Exception as e:
             logger.error(f"Failed to create embedding: {e}")
             raise
     
+    @staticmethod
+    def _parse_embeddings(response, count: int) -> List[List[float]]:
+        """Validate an /api/embed response and return its vectors."""
+        embeddings = response.get("embeddings", [])
+        if len(embeddings) != count or not all(embeddings):
+            raise ValueError("Ollama returned empty embedding")
+        return [list(embedding) for embedding in embeddings]
+    
     def ping(self) -> bool:
         """
-        Check if Ollama is accessible and healthy.
+        Check that Ollama is reachable and has the model pulled.
+        
+        Only lists the server's models, so it neither loads the model nor
+        generates anything.
         
         Returns:
             True if Ollama is accessible, False otherwise
-            
+        
         Raises:
             Exception: If the service connection fails
         """
         try:
-            response = ollama.embeddings(model=self.model, prompt="ping")
-            if not response.get("embedding"):
-                raise Exception("Ollama returned empty embedding")
+            check_model(self.client, self.model)
             logger.info("Ollama ping successful")
             return True
         except Exception as e:
             logger.error(f"Ollama ping failed: {e}")
             raise
+    
+    def warm_up(self) -> None:
+        """
+        Load the model on every Ollama host with this provider's keep_alive.
+        
+        Raises:
+            Exception: If no host could load the model
+        """
+        request = {"model": self.model, "input": "warm up", "keep_alive": self.keep_alive}
+        for_each = getattr(self.client, "for_each", None)
+        if callable(for_each):
+            for_each("embed", **request)
+        else:
+            self.client.embed(**request)
+        logger.info(f"Embedding model {self.model} loaded")
 
@@ -0,0 +1,209 @@
+"""Embedding provider that reduces vectors to a smaller output dimension."""
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from providers.base import EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+REDUCTION_METHODS = ("truncate", "pca")
+
+
+def fit_projection(embeddings: np.ndarray, dimensions: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fit a PCA projection onto the leading principal components.
+    
+    Args:
+        embeddings: Full-dimension sample vectors, one per row
+        dimensions: Number of components to keep
+    
+    Returns:
+        Tuple of (mean, components) with shapes (full,) and (dimensions, full)
+    
+    Raises:
+        ValueError: If the sample is too small for the requested dimension
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2 or dimensions > min(embeddings.shape):
+        raise ValueError(
+            f"Need at least {dimensions} sample vectors of dimension >= {dimensions}, "
+            f"got shape {embeddings.shape}"
+        )
+    mean = embeddings.mean(axis=0)
+    _, _, components = np.linalg.svd(embeddings - mean, full_matrices=False)
+    return mean, components[:dimensions].astype(np.float32)
+
+
+def save_projection(path: str, mean: np.ndarray, components: np.ndarray) -> None:
+    """Write a fitted projection to an .npz file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez(path, mean=mean, components=components)
+
+
+def load_projection(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Read a projection written by save_projection()."""
+    with np.load(path) as data:
+        return data["mean"].astype(np.float32), data["components"].astype(np.float32)
+
+
+class ReducedDimensionEmbeddingProvider(EmbeddingProvider):
+    """
+    Embedding provider decorator that shrinks vectors before they are stored.
+    
+    ``truncate`` keeps the leading coordinates, which is how Matryoshka-trained
+    models such as embeddinggemma are meant to be shortened. ``pca`` projects
+    onto components fitted on real query embeddings (see cli.fit_projection),
+    which also works for models without nested representations. Either way the
+    result is L2-normalized so cosine similarities stay comparable.
+    
+    Wrap it around the caching provider: the caches then keep full vectors
+    and changing the output dimension does not invalidate them.
+    """
+    
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        dimensions: int,
+        method: str = "truncate",
+        projection_path: Optional[str] = None
+    ):
+        """
+        Initialize reduced-dimension provider.
+        
+        Args:
+            provider: Wrapped full-dimension embedding provider
+            dimensions: Output dimension
+            method: "truncate" (prefix + renormalize) or "pca" (fitted projection)
+            projection_path: .npz file with the PCA projection (required for "pca")
+        
+        Raises:
+            ValueError: If the method is unknown or the projection does not match
+        """
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"Unknown reduction method: {method}")
+        if dimensions <= 0:
+            raise ValueError("dimensions must be positive")
+        self.provider = provider
+        self.model = getattr(provider, "model", None)
+        self.dimensions = dimensions
+        self.method = method
+        self._mean = None
+        self._components = None
+        if method == "pca":
+            if not projection_path:
+                raise ValueError("PCA reduction requires a projection_path")
+            self._mean, self._components = load_projection(projection_path)
+            if self._components.shape[0] != dimensions:
+                raise ValueError(
+                    f"Projection {projection_path} has {self._components.shape[0]} components, "
+                    f"expected {dimensions}"
+                )
+            logger.info(f"Loaded PCA projection {self._components.shape} from {projection_path}")
+    
+    def reduce(self, embeddings: List[List[float]]) -> List[List[float]]:
+        """
+        Reduce full-dimension vectors to the output dimension.
+        
+        Args:
+            embeddings: Full-dimension embedding vectors
+        
+        Returns:
+            Reduced, L2-normalized vectors in the same order
+        """
+        if not embeddings:
+            return []
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self.method == "pca":
+            vectors = (vectors - self._mean) @ self._components.T
+        else:
+            if vectors.shape[1] < self.dimensions:
+                raise ValueError(
+                    f"Cannot truncate {vectors.shape[1]}-dim embeddings to {self.dimensions}"
+                )
+            vectors = vectors[:, :self.dimensions]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).tolist()
+    
+    def create(self, text: str) -> List[float]:
+        """
+        Create a reduced embedding vector for given text.
+        
+        Args:
+            text: Input text to embed
+        
+        Returns:
+            List of floats of length ``dimensions``
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return self.reduce([self.provider.create(text)])[0]
+    
+    def create_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create reduced embedding vectors for several texts.
+        
+        Args:
+            texts: Input texts to embed
+        
+        Returns:
+            Reduced vectors in the same order as the texts
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return self.reduce(self.provider.create_batch(texts))
+    
+    async def acreate(self, text: str) -> List[float]:
+        """
+        Asynchronously create a reduced embedding vector.
+        
+        Args:
+            text: Input text to embed
+        
+        Returns:
+            List of floats of length ``dimensions``
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return self.reduce([await self.provider.acreate(text)])[0]
+    
+    async def acreate_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Asynchronously create reduced embedding vectors for several texts.
+        
+        Args:
+            texts: Input texts to embed
+        
+        Returns:
+            Reduced vectors in the same order as the texts
+        
+        Raises:
+            Exception: If embedding generation fails
+        """
+        return self.reduce(await self.provider.acreate_batch(texts))
+    
+    def ping(self) -> bool:
+        """
+        Check if the wrapped embedding service is accessible and healthy.
+        
+        Returns:
+            True if the service is accessible, False otherwise
+        
+        Raises:
+            Exception: If the service connection fails
+        """
+        return self.provider.ping()
+    
+    def stats(self) -> Dict:
+        """Return the wrapped provider's counters plus the output dimension."""
+        provider_stats = getattr(self.provider, "stats", None)
+        reduced_stats = dict(provider_stats()) if callable(provider_stats) else {}
+        reduced_stats["dimensions"] = self.dimensions
+        reduced_stats["reduction"] = self.method
+        return reduced_stats
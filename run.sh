@@ -1,6 +1,11 @@
 #!/bin/bash
-# Run Flask app with auto-reload using gunicorn
-# This runs as a daemon with auto-reload on file changes
+# Run the Flask app with gunicorn
+# Workers start serving /livez at once and report /readyz when the models are
+# loaded; for auto-reload during development use `python3 app.py` instead
 
 cd "$(dirname "$0")"
-gunicorn --bind 0.0.0.0:8000 --workers 2 --reload --log-level info app:app
+# Workers write metrics to per-process files here; stale files from an earlier
+# run would be summed into /metrics, so start from an empty directory
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/queryembeddings-metrics}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+gunicorn --config gunicorn.conf.py --bind 0.0.0.0:8000 --workers 2 --log-level info app:app
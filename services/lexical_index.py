@@ -0,0 +1,322 @@
+"""Lexical near-duplicate index (MinHash LSH over query tokens)."""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from services.query_cache import canonicalize_query
+
+logger = logging.getLogger(__name__)
+
+_PRIME = 4294967311  # smallest prime above 2**32
+_POSSESSIVE = re.compile(r"['’]s\b")
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """
+    Reduce a query to the set of its words.
+    
+    Casing, punctuation, possessives and word order do not change the result,
+    so "Jokic's stats tonight?" and "tonight jokic stats" share one token set.
+    
+    Args:
+        text: Raw query text
+    
+    Returns:
+        Set of lowercase word tokens
+    """
+    return frozenset(_TOKEN.findall(_POSSESSIVE.sub("", canonicalize_query(text))))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Exact Jaccard similarity of two token sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class LexicalIndex:
+    """
+    MinHash LSH index mapping query variants to the query they were routed to.
+    
+    Each entry is the token set of a query text plus the cached query it
+    resolves to, grouped under the ID of the vector-store row it belongs to so
+    that evicting the row deletes its variants. Lookups hash the query into
+    ``bands`` LSH buckets, and candidates sharing a bucket are confirmed with
+    their exact Jaccard similarity, so a match never relies on the MinHash
+    estimate alone.
+    
+    Entries are persisted to an append-only JSONL log. Every instance tails
+    the log before a lookup, so gunicorn workers pick up each other's inserts
+    and deletes. Appends hold an exclusive lock on a ``.lock`` sidecar file,
+    and compact() rewrites the log under the same lock with only the live
+    entries; instances notice the new file by its inode and replay it.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        seed: int = 1
+    ):
+        """
+        Initialize lexical index and replay the log, if any.
+        
+        Args:
+            path: JSONL log file (None keeps the index in memory only)
+            threshold: Minimum Jaccard similarity of token sets for a match
+            num_perm: Number of MinHash permutations
+            bands: Number of LSH bands (num_perm must be divisible by it)
+            seed: Seed of the permutation coefficients (must stay fixed for a log)
+        
+        Raises:
+            ValueError: If num_perm is not divisible by bands
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self._rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[str, FrozenSet[str], str]] = {}
+        self._keys: Dict[int, List[int]] = {}
+        self._by_id: Dict[str, List[int]] = {}
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(bands)]
+        self._next_key = 0
+        self._offset = 0
+        self._inode = None
+        self._log_records = 0
+        self.hits = 0
+        self.misses = 0
+        
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                self._refresh()
+            logger.info(f"Loaded lexical index with {len(self._entries)} entries from {path}")
+    
+    def signature(self, tokens: Iterable[str]) -> np.ndarray:
+        """Compute the MinHash signature of a token set."""
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+             for token in tokens],
+            dtype=np.uint64
+        )
+        # a < 2**32 and hash < 2**32, so a * hash fits in uint64 before the modulo
+        permuted = (np.outer(hashes, self._a) % _PRIME + self._b) % _PRIME
+        return permuted.min(axis=0)
+    
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        """Hash each band of a signature into a bucket key."""
+        return [
+            hash(signature[band * self._rows:(band + 1) * self._rows].tobytes())
+            for band in range(self.bands)
+        ]
+    
+    def find(self, text: str) -> Optional[str]:
+        """
+        Return the cached query for a lexical near-duplicate of text.
+        
+        Args:
+            text: Raw query text
+        
+        Returns:
+            Cached query of the most similar entry at or above the threshold, or None
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        band_keys = self._band_keys(self.signature(tokens))
+        
+        with self._lock:
+            self._refresh()
+            candidates: Set[int] = set()
+            for band, key in enumerate(band_keys):
+                candidates.update(self._buckets[band].get(key, ()))
+            
+            best_query, best_score = None, self.threshold
+            for key in candidates:
+                _, entry_tokens, query = self._entries[key]
+                score = jaccard(tokens, entry_tokens)
+                if score >= best_score:
+                    best_query, best_score = query, score
+            
+            if best_query is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return best_query
+    
+    def add(self, entry_id: str, texts: Iterable[str], query: str) -> None:
+        """
+        Index query variants that resolve to a stored entry.
+        
+        Args:
+            entry_id: ID of the vector-store row the variants belong to
+            texts: Query texts (raw and/or normalized) to index
+            query: Cached query the variants resolve to
+        """
+        records = []
+        with self._lock:
+            self._refresh()
+            known = {self._entries[key][1] for key in self._by_id.get(entry_id, ())}
+            for text in texts:
+                tokens = tokenize(text)
+                if tokens and tokens not in known:
+                    known.add(tokens)
+                    records.append({"op": "add", "id": entry_id, "tokens": sorted(tokens), "query": query})
+            if records:
+                self._append(records)
+    
+    def delete(self, entry_ids: Iterable[str]) -> None:
+        """
+        Remove all variants of evicted vector-store rows.
+        
+        Args:
+            entry_ids: IDs of the deleted rows
+        """
+        with self._lock:
+            self._refresh()
+            records = [{"op": "delete", "id": entry_id} for entry_id in entry_ids if entry_id in self._by_id]
+            if records:
+                self._append(records)
+    
+    def compact(self) -> int:
+        """
+        Rewrite the log with only the live entries, dropping deletes and the adds they cancel.
+        
+        Only one process should call this periodically (the container runs it
+        from the store's eviction owner).
+        
+        Returns:
+            Number of log records removed
+        """
+        if not self.path:
+            return 0
+        with self._lock, self._log_lock():
+            self._refresh()
+            removed = self._log_records - len(self._entries)
+            if removed <= 0:
+                return 0
+            data = b"".join(
+                json.dumps({"op": "add", "id": entry_id, "tokens": sorted(tokens), "query": query}).encode("utf-8")
+                + b"\n"
+                for entry_id, tokens, query in self._entries.values()
+            )
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as log:
+                log.write(data)
+                log.flush()
+                os.fsync(log.fileno())
+            os.replace(temp_path, self.path)
+            self._refresh()
+        logger.info(f"Compacted lexical index log {self.path}: removed {removed} records")
+        return removed
+    
+    @contextmanager
+    def _log_lock(self):
+        """Hold the exclusive lock that serializes log appends and compaction across processes."""
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Closing the file releases the lock
+            yield
+    
+    def _append(self, records: List[Dict]) -> None:
+        """Write records to the log (if any) and apply them locally."""
+        if self.path:
+            data = b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records)
+            # Without the lock an append could land in a log that compaction is replacing
+            with self._log_lock(), open(self.path, "ab") as log:
+                log.write(data)
+            # Our own lines are picked up like any other worker's
+            self._refresh()
+        else:
+            for record in records:
+                self._apply(record)
+    
+    def _refresh(self) -> None:
+        """Apply log records appended since the last refresh (by any process)."""
+        if not self.path:
+            return
+        try:
+            log = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with log:
+            stat = os.fstat(log.fileno())
+            if stat.st_ino != self._inode:
+                # A compacted log replaced the one we were tailing: replay it from the start
+                self._reset()
+                self._inode = stat.st_ino
+            if stat.st_size == self._offset:
+                return
+            log.seek(self._offset)
+            for line in log:
+                if not line.endswith(b"\n"):
+                    # Partially written line from a concurrent writer
+                    break
+                self._apply(json.loads(line))
+                self._offset += len(line)
+                self._log_records += 1
+    
+    def _reset(self) -> None:
+        """Forget every entry and the log position."""
+        self._entries.clear()
+        self._keys.clear()
+        self._by_id.clear()
+        for bucket in self._buckets:
+            bucket.clear()
+        self._offset = 0
+        self._log_records = 0
+    
+    def _apply(self, record: Dict) -> None:
+        """Apply one add or delete record to the in-memory index."""
+        entry_id = record["id"]
+        if record["op"] == "delete":
+            for key in self._by_id.pop(entry_id, ()):
+                self._entries.pop(key)
+                for band, band_key in enumerate(self._keys.pop(key)):
+                    bucket = self._buckets[band][band_key]
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band][band_key]
+            return
+        
+        tokens = frozenset(record["tokens"])
+        key = self._next_key
+        self._next_key += 1
+        band_keys = self._band_keys(self.signature(tokens))
+        self._entries[key] = (entry_id, tokens, record["query"])
+        self._keys[key] = band_keys
+        self._by_id.setdefault(entry_id, []).append(key)
+        for band, band_key in enumerate(band_keys):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+    
+    def stats(self) -> Dict:
+        """Return entry and hit counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,81 @@
+"""Exact-match result cache in front of the semantic pipeline."""
+import re
+import threading
+from typing import Dict, Optional
+from core.lru_cache import LRUCache
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def canonicalize_query(text: str) -> str:
+    """
+    Lightly canonicalize query text for exact-match lookups.
+    
+    Collapses runs of whitespace, trims the ends and case-folds, so
+    "Jokic stats  tonight" and "jokic stats tonight" share a key.
+    
+    Args:
+        text: Raw user query
+    
+    Returns:
+        Canonical cache key
+    """
+    return _WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+
+class QueryCache:
+    """Bounded cache of canonical query text -> routed query string."""
+    
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = 300.0):
+        """
+        Initialize query cache.
+        
+        Args:
+            max_size: Maximum number of cached queries
+            ttl_seconds: Lifetime of a cached result in seconds (None disables expiry)
+        """
+        self._cache = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def generation(self) -> int:
+        """Counter bumped on every invalidation."""
+        return self._generation
+    
+    def get(self, text: str) -> Optional[str]:
+        """
+        Look up the routed query for raw user text.
+        
+        Args:
+            text: Raw user query
+        
+        Returns:
+            Cached routed query, or None on miss
+        """
+        return self._cache.get(canonicalize_query(text))
+    
+    def set(self, text: str, result: str, generation: Optional[int] = None) -> None:
+        """
+        Cache the routed query for raw user text.
+        
+        Args:
+            text: Raw user query
+            result: Routed query returned by the service
+            generation: Generation observed before the result was computed; the
+                result is dropped if the cache was invalidated in the meantime
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._cache.set(canonicalize_query(text), result)
+    
+    def invalidate(self) -> None:
+        """Drop all cached results, e.g. after rows they route to were evicted."""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+    
+    def stats(self) -> Dict:
+        """Return size and hit/miss counters."""
+        return {**self._cache.stats(), "generation": self._generation}
@@ -1,12 +1,51 @@
 """Semantic service - core orchestrator for query processing."""
+import asyncio
+import contextvars
+import functools
 import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from core.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from core.lru_cache import LRUCache
+from core.metrics import ServiceMetrics
+from core.request_trace import current_trace
 from providers.base import EmbeddingProvider
 from storage.base import VectorStore
 from transformer.base import QueryTransformer
+from services.lexical_index import LexicalIndex
+from services.query_cache import QueryCache, canonicalize_query
+from services.single_flight import AsyncSingleFlight, SingleFlight
 from core.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Canonical entries whose alias counts are remembered between reservations
+_ALIAS_COUNTS_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class QueryResult:
+    """
+    Routed query plus the pipeline path that produced it.
+    
+    Paths: "query_cache", "lexical", "high_confidence" (raw embedding match),
+    "alias" (raw embedding matched a stored phrasing of an entry), "cached"
+    (normalized match), "stored" (new entry), "raw_hit" / "raw_miss"
+    (LLM skipped, decided on the raw embedding at the similarity threshold)
+    and "passthrough" (embedding unavailable, text returned as is).
+    
+    ``degraded`` names why a stage was skipped: "transformer_open",
+    "over_budget", "transformer_timeout", "transformer_error" or
+    "embedding_open" (None when the full pipeline ran).
+    """
+    query: str
+    path: str
+    degraded: Optional[str] = None
+
 
 class SemanticService:
     """Main service orchestrating embedding generation, caching, and query processing."""
@@ -17,7 +56,17 @@ class SemanticService:
         storage: VectorStore,
         query_transformer: QueryTransformer,
         similarity_threshold: float = 0.85,
-        high_confidence_threshold: float = 0.97
+        high_confidence_threshold: float = 0.97,
+        query_cache: Optional[QueryCache] = None,
+        storage_executor: Optional[ThreadPoolExecutor] = None,
+        speculative_transform: bool = False,
+        speculative_threads: int = 8,
+        lexical_index: Optional[LexicalIndex] = None,
+        latency_budget_ms: float = 0,
+        transformer_breaker: Optional[CircuitBreaker] = None,
+        embedding_breaker: Optional[CircuitBreaker] = None,
+        alias_limit: int = 0,
+        metrics: Optional[ServiceMetrics] = None
     ):
         """
         Initialize semantic service.
@@ -28,70 +77,1001 @@ class SemanticService:
             query_transformer: Transformer to normalize queries
             similarity_threshold: Minimum similarity threshold for cache hits
             high_confidence_threshold: Threshold for exact match detection (skip transformer)
+            query_cache: Optional exact-match result cache checked before any model call
+            storage_executor: Thread pool used by the async path for blocking storage calls
+                (None uses the event loop's default executor)
+            speculative_transform: Start the LLM transform in parallel with the first-tier
+                lookup and discard it on a high-confidence hit
+            speculative_threads: Thread pool size for speculative, time-limited and
+                batched transforms on the sync path
+            lexical_index: Optional MinHash index of query variants checked before any
+                model call (entries are added whenever a query is stored or matched)
+            latency_budget_ms: Per-request time budget; the LLM stage is skipped when its
+                typical latency exceeds what is left and abandoned when it runs out
+                (0 disables the budget)
+            transformer_breaker: Circuit breaker around the query transformer; while it
+                is open the LLM stage is skipped
+            embedding_breaker: Circuit breaker around the embedding provider; while it
+                is open queries pass through unrouted
+            alias_limit: Maximum number of raw phrasings stored as alias rows of each
+                canonical entry, so repeats resolve in the first tier (0 disables aliases)
+            metrics: Optional Prometheus stage histograms, path counters and in-flight gauge
         """
         self.embedding_provider = embedding_provider
         self.storage = storage
         self.query_transformer = query_transformer
         self.similarity_threshold = similarity_threshold
         self.high_confidence_threshold = high_confidence_threshold
+        self.query_cache = query_cache
+        self.storage_executor = storage_executor
+        self.lexical_index = lexical_index
+        # Concurrent identical queries share one pipeline run, and concurrent
+        # misses with the same normalized query share one lookup-and-insert
+        self._query_flights = SingleFlight()
+        self._store_flights = SingleFlight()
+        self._async_query_flights = AsyncSingleFlight()
+        self._async_store_flights = AsyncSingleFlight()
+        self.speculative_transform = speculative_transform
+        self.latency_budget_ms = latency_budget_ms
+        self.transformer_breaker = transformer_breaker
+        self.embedding_breaker = embedding_breaker
+        # Speculative, time-limited and batched transforms run in this pool
+        # (threads are only started once it is used)
+        self._transform_executor = ThreadPoolExecutor(
+            max_workers=speculative_threads,
+            thread_name_prefix="transform"
+        )
+        self._speculation = {"started": 0, "used": 0, "cancelled": 0, "wasted": 0}
+        self._counters_lock = threading.Lock()
+        self._degraded = {"transformer_open": 0, "over_budget": 0, "transformer_timeout": 0,
+                          "transformer_error": 0, "embedding_open": 0}
+        self.alias_limit = alias_limit
+        # Alias rows per canonical entry ID as last seen in the store plus this
+        # process's reservations since (bounded; the store is the source of truth)
+        self._alias_counts = LRUCache(max_size=_ALIAS_COUNTS_SIZE)
+        self._tiers = {"first_tier_hits": 0, "alias_hits": 0, "second_tier_hits": 0, "misses": 0}
+        self.metrics = metrics
     
     def process_query(self, text: str) -> str:
         """
         Process a user query through the semantic cache.
         
+        Args:
+            text: User query text
+        
+        Returns:
+            Query string (cached query or normalized query)
+        """
+        return self.route_query(text).query
+    
+    async def aprocess_query(self, text: str) -> str:
+        """
+        Asynchronously process a user query through the semantic cache.
+        
+        Args:
+            text: User query text
+        
+        Returns:
+            Query string (cached query or normalized query)
+        """
+        return (await self.aroute_query(text)).query
+    
+    def route_query(self, text: str) -> QueryResult:
+        """
+        Process a user query and report the path it took.
+        
         Flow:
+        0. Return the result cached for the same (canonicalized) text, if any,
+           or for a lexical near-duplicate of it (no model calls)
         1. Check DB with original query first
         2. If similarity >= high_confidence_threshold: return cached query (skip transformer)
         3. Otherwise: transform query and check DB again
         
+        When the transformer's circuit is open, or the latency budget does not
+        leave room for it, step 3 is replaced by a decision on the original
+        embedding at similarity_threshold. Degraded results are not put in the
+        query cache, so the query is routed properly once the LLM recovers.
+        
         Args:
             text: User query text
+        
+        Returns:
+            Routed query with its path and degradation reason
+        """
+        logger.info(f"Processing query: {text[:50]}...")
+        deadline = self._deadline()
+        
+        with self._in_flight():
+            if self.query_cache is None:
+                result = self._process_coalesced(text, deadline)
+                self._count_tier(result.path)
+                return result
             
+            cached_result = self.query_cache.get(text)
+            if cached_result is not None:
+                logger.info("Found exact-match result in query cache")
+                self._count_tier("query_cache")
+                return QueryResult(cached_result, "query_cache")
+            
+            generation = self.query_cache.generation
+            result = self._process_coalesced(text, deadline)
+            self._count_tier(result.path)
+            if result.degraded is None:
+                self.query_cache.set(text, result.query, generation=generation)
+            return result
+    
+    async def aroute_query(self, text: str) -> QueryResult:
+        """
+        Asynchronously process a user query and report the path it took.
+        
+        Same flow as route_query, but model calls go through the async
+        provider/transformer methods and blocking storage calls run in the
+        storage thread pool, so one event loop can serve many queries at once.
+        
+        Args:
+            text: User query text
+        
         Returns:
-            Query string (cached query or normalized query)
+            Routed query with its path and degradation reason
         """
         logger.info(f"Processing query: {text[:50]}...")
+        deadline = self._deadline()
+        
+        with self._in_flight():
+            if self.query_cache is None:
+                result = await self._aprocess_coalesced(text, deadline)
+                self._count_tier(result.path)
+                return result
+            
+            cached_result = self.query_cache.get(text)
+            if cached_result is not None:
+                logger.info("Found exact-match result in query cache")
+                self._count_tier("query_cache")
+                return QueryResult(cached_result, "query_cache")
+            
+            generation = self.query_cache.generation
+            result = await self._aprocess_coalesced(text, deadline)
+            self._count_tier(result.path)
+            if result.degraded is None:
+                self.query_cache.set(text, result.query, generation=generation)
+            return result
+    
+    def process_queries(self, texts: List[str]) -> List[str]:
+        """
+        Process several user queries with batched model and storage calls.
+        
+        Follows the same flow as process_query, but embeds all texts in one
+        provider call, looks them up with one find_batch per tier, transforms
+        only the texts without a high-confidence match (in parallel, under the
+        same breakers and latency budget) and stores each miss through the
+        same single flight as process_query, so concurrent requests never
+        insert one query twice. Identical texts in a batch are processed once,
+        and misses that normalize to the same query are stored once. Texts whose LLM
+        stage was skipped are decided on their raw embedding and not cached.
+        
+        Args:
+            texts: User query texts
+        
+        Returns:
+            Query strings (cached or normalized), in input order
+        """
+        logger.info(f"Processing batch of {len(texts)} queries")
+        results: List[Optional[str]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        
+        deadline = self._deadline()
+        
+        with self._in_flight():
+            generation = self.query_cache.generation if self.query_cache else None
+            for i, text in enumerate(texts):
+                cached_result = self.query_cache.get(text) if self.query_cache else None
+                if cached_result is not None:
+                    results[i] = cached_result
+                    self._count_tier("query_cache")
+                else:
+                    pending.setdefault(text, []).append(i)
+            
+            if pending:
+                routed = self._process_uncached_batch(list(pending), deadline)
+                for text, indices in pending.items():
+                    result = routed[text]
+                    self._count_tier(result.path)
+                    for i in indices:
+                        results[i] = result.query
+                    if self.query_cache is not None and result.degraded is None:
+                        self.query_cache.set(text, result.query, generation=generation)
+        
+        return results
+    
+    def _process_uncached_batch(self, texts: List[str], deadline: Optional[float] = None) -> Dict[str, QueryResult]:
+        """Run the batched pipeline for distinct texts; returns text -> routed result."""
+        results: Dict[str, QueryResult] = {}
+        for text in texts:
+            lexical_match = self._find_lexical(text)
+            if lexical_match is not None:
+                results[text] = QueryResult(lexical_match, "lexical")
+        texts = [text for text in texts if text not in results]
+        if not texts:
+            return results
+        
+        # Step 1: Check DB with all original queries first
+        try:
+            with self._timed("raw_embed"):
+                original_embeddings = self._embed_batch(texts)
+        except CircuitOpenError:
+            results.update({text: QueryResult(text, "passthrough", self._count_embedding_open()) for text in texts})
+            return results
+        with self._timed("first_tier_find"):
+            matches = self.storage.find_batch(
+                embeddings=original_embeddings,
+                threshold=self.high_confidence_threshold,
+                top_k=1
+            )
+        original_by_text = dict(zip(texts, original_embeddings))
+        for text, similar_items in zip(texts, matches):
+            if similar_items:
+                results[text] = QueryResult(similar_items[0]["query"], self._first_tier_path(similar_items[0]))
+                self._remember_lexical(similar_items[0], text)
+        logger.info(f"Found {len(results)}/{len(texts)} high-confidence cached queries")
+        
+        # Step 2: Transform the remaining queries and check again
+        remaining = [text for text in texts if text not in results]
+        if not remaining:
+            return results
+        outcomes = self._transform_batch(remaining, deadline)
+        skipped = [text for text in remaining if outcomes[text][1] is not None]
+        if skipped:
+            with self._timed("second_tier_find"):
+                raw_matches = self.storage.find_batch(
+                    embeddings=[original_by_text[text] for text in skipped],
+                    threshold=self.similarity_threshold,
+                    top_k=1
+                )
+            for text, similar_items in zip(skipped, raw_matches):
+                results[text] = self._raw_result(text, similar_items, outcomes[text][1])
+        remaining = [text for text in remaining if outcomes[text][1] is None]
+        if not remaining:
+            return results
+        normalized = {text: outcomes[text][0] for text in remaining}
+        normalized_queries = list(dict.fromkeys(normalized.values()))
+        try:
+            with self._timed("normalized_embed"):
+                normalized_embeddings = self._embed_batch(normalized_queries)
+        except CircuitOpenError:
+            results.update({
+                text: QueryResult(normalized[text], "passthrough", self._count_embedding_open()) for text in remaining
+            })
+            return results
+        with self._timed("second_tier_find"):
+            matches = self.storage.find_batch(
+                embeddings=normalized_embeddings,
+                threshold=self.similarity_threshold,
+                top_k=1
+            )
+        routed = {}
+        canonical: Dict[str, Dict] = {}
+        for query, similar_items in zip(normalized_queries, matches):
+            if similar_items:
+                routed[query] = similar_items[0]["query"]
+                canonical[query] = similar_items[0]
+                self._remember_lexical(
+                    similar_items[0], *(text for text in remaining if normalized[text] == query)
+                )
+        
+        # Step 3: Store every normalized query that is still a miss. Each goes through
+        # the store flight of process_query, which checks the store again, so a
+        # concurrent request missing on the same query inserts it once between them
+        for query, embedding in zip(normalized_queries, normalized_embeddings):
+            if query in routed:
+                continue
+            path, canonical[query] = self._store_flights.do(
+                query, lambda query=query, embedding=embedding: self._match_or_store(query, embedding)
+            )
+            variants = [text for text in remaining if normalized[text] == query]
+            if path == "cached":
+                routed[query] = canonical[query]["query"]
+                self._remember_lexical(canonical[query], *variants)
+            else:
+                self._remember_lexical(canonical[query], query, *variants)
+        
+        aliases = []
+        for text in remaining:
+            query = normalized[text]
+            results[text] = QueryResult(routed.get(query, query), "cached" if query in routed else "stored")
+            alias_metadata = self._reserve_alias(text, canonical[query])
+            if alias_metadata is not None:
+                aliases.append((results[text].query, original_by_text[text], alias_metadata))
+        if aliases:
+            with self._timed("put"):
+                self.storage.put_batch(
+                    queries=[query for query, _, _ in aliases],
+                    embeddings=[embedding for _, embedding, _ in aliases],
+                    metadatas=[metadata for _, _, metadata in aliases]
+                )
+        return results
+    
+    def stats(self) -> Dict:
+        """Return service-level cache counters."""
+        return {
+            "query_cache": self.query_cache.stats() if self.query_cache else None,
+            "lexical_index": self.lexical_index.stats() if self.lexical_index else None,
+            "embedding_cache": self._component_stats(self.embedding_provider),
+            "transform_cache": self._component_stats(self.query_transformer),
+            "storage": self._component_stats(self.storage),
+            "single_flight": {
+                "query": self._merge_flight_stats(self._query_flights, self._async_query_flights),
+                "store": self._merge_flight_stats(self._store_flights, self._async_store_flights)
+            },
+            "speculative_transform": dict(self._speculation) if self.speculative_transform else None,
+            "degraded": dict(self._degraded),
+            "tiers": self._tier_stats(),
+            "circuit_breakers": {
+                "transformer": self._component_stats(self.transformer_breaker),
+                "embedding": self._component_stats(self.embedding_breaker)
+            }
+        }
+    
+    def _tier_stats(self) -> Dict:
+        """Return vector-store tier counters and hit rates (over queries that reached the store)."""
+        with self._counters_lock:
+            tiers = dict(self._tiers)
+        first_tier = tiers["first_tier_hits"] + tiers["alias_hits"]
+        lookups = first_tier + tiers["second_tier_hits"] + tiers["misses"]
+        tiers["first_tier_hit_rate"] = first_tier / lookups if lookups else 0.0
+        tiers["second_tier_hit_rate"] = tiers["second_tier_hits"] / lookups if lookups else 0.0
+        return tiers
+    
+    def _count_tier(self, path: str) -> None:
+        """Count a routed result by path (tier counters only move for vector-store decisions)."""
+        if self.metrics is not None:
+            self.metrics.count_query(path)
+        counter = {
+            "high_confidence": "first_tier_hits",
+            "alias": "alias_hits",
+            "cached": "second_tier_hits",
+            "stored": "misses"
+        }.get(path)
+        if counter is not None:
+            with self._counters_lock:
+                self._tiers[counter] += 1
+    
+    @staticmethod
+    def _first_tier_path(similar_item: Dict) -> str:
+        """Path of a first-tier match: "alias" for alias rows, "high_confidence" otherwise."""
+        return "alias" if (similar_item.get("metadata") or {}).get("alias_of") else "high_confidence"
+    
+    @contextmanager
+    def _timed(self, stage: str):
+        """Record a pipeline stage's duration in the metrics and the request trace, unless it raises."""
+        trace = current_trace()
+        if self.metrics is None and trace is None:
+            yield
+            return
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.observe(stage, elapsed)
+        if trace is not None:
+            trace.add_stage(stage, elapsed)
+    
+    def _trace_similarity(self, tier: str, similar_items: List[Dict], embedding: list) -> None:
+        """
+        Record the best similarity a tier's lookup returned in the request trace.
+        
+        On a miss, a debug trace gets the nearest row's similarity from one
+        extra top_k=1 lookup without a threshold, which does not count as a hit.
+        
+        Args:
+            tier: Trace key of the lookup
+            similar_items: Results of the tier's thresholded lookup
+            embedding: Vector the tier looked up
+        """
+        trace = current_trace()
+        if trace is None:
+            return
+        if not similar_items and trace.debug:
+            similar_items = self.storage.find(embedding=embedding, threshold=-1.0, top_k=1, record_hits=False)
+        trace.add_similarity(tier, similar_items[0]["similarity"] if similar_items else None)
+    
+    async def _atrace_similarity(self, tier: str, similar_items: List[Dict], embedding: list) -> None:
+        """Async version of _trace_similarity (the debug lookup runs in the storage pool)."""
+        trace = current_trace()
+        if trace is not None and trace.debug and not similar_items:
+            await self._run_storage(self._trace_similarity, tier, similar_items, embedding)
+        else:
+            self._trace_similarity(tier, similar_items, embedding)
+    
+    def _in_flight(self):
+        """Context manager counting a request in the in-flight gauge, if metrics are enabled."""
+        return self.metrics.in_flight.track_inprogress() if self.metrics is not None else nullcontext()
+    
+    def _reserve_alias(self, text: str, canonical: Dict) -> Optional[Dict]:
+        """
+        Claim an alias slot of a canonical entry for a raw phrasing.
+        
+        Args:
+            text: Raw user query
+            canonical: Stored entry (id, query, optional metadata) the text routes to
+        
+        Returns:
+            Metadata of the alias row to store, or None if aliases are disabled,
+            the phrasing is the canonical query itself or the entry is at its limit
+        """
+        if self.alias_limit <= 0 or canonicalize_query(text) == canonicalize_query(canonical["query"]):
+            return None
+        # Matching an alias row still credits the entry it points to
+        canonical_id = (canonical.get("metadata") or {}).get("alias_of") or canonical["id"]
+        # Counts only grow, so an entry known to be full needs no store lookup
+        if (self._alias_counts.get(canonical_id) or 0) >= self.alias_limit:
+            return None
+        # Other workers store aliases too; the store's count covers them
+        stored = self.storage.count_aliases(canonical_id)
+        with self._counters_lock:
+            count = max(stored or 0, self._alias_counts.get(canonical_id) or 0)
+            if count >= self.alias_limit:
+                self._alias_counts.set(canonical_id, count)
+                return None
+            self._alias_counts.set(canonical_id, count + 1)
+        return {"alias_of": canonical_id}
+    
+    def _store_alias(self, text: str, original_embedding: list, canonical: Dict) -> None:
+        """Store the raw phrasing's embedding as an alias row pointing to a canonical entry."""
+        alias_metadata = self._reserve_alias(text, canonical)
+        if alias_metadata is not None:
+            with self._timed("put"):
+                self.storage.put(query=canonical["query"], embedding=original_embedding, metadata=alias_metadata)
+            logger.debug(f"Stored alias of {alias_metadata['alias_of']} for: {text[:50]}")
+    
+    @staticmethod
+    def _merge_flight_stats(*flights) -> Dict[str, int]:
+        """Sum execution/collapsed counters of the sync and async coalescers."""
+        return {
+            "executions": sum(f.executions for f in flights),
+            "collapsed": sum(f.collapsed for f in flights)
+        }
+    
+    @staticmethod
+    def _component_stats(component) -> Optional[Dict]:
+        """Return counters from components that expose a stats() method."""
+        component_stats = getattr(component, "stats", None)
+        return component_stats() if callable(component_stats) else None
+    
+    def _store(self, query: str, embedding: list) -> str:
+        """
+        Store a new cache entry.
+        
+        Results cached earlier still route to live entries, so the query cache
+        is not flushed; rows removed by eviction invalidate it instead.
+        
+        Args:
+            query: Normalized query to store
+            embedding: Embedding of the normalized query
+        
+        Returns:
+            Generated embedding ID
+        """
+        with self._timed("put"):
+            return self.storage.put(query=query, embedding=embedding)
+    
+    def _find_lexical(self, text: str) -> Optional[str]:
+        """Return the cached query of a lexical near-duplicate, if the index has one."""
+        if self.lexical_index is None:
+            return None
+        lexical_match = self.lexical_index.find(text)
+        if lexical_match is not None:
+            logger.info("Found lexical near-duplicate in lexical index")
+        return lexical_match
+    
+    def _remember_lexical(self, similar_item: Dict, *texts: str) -> None:
+        """Index texts that matched a stored entry so their variants skip the models."""
+        if self.lexical_index is not None:
+            self.lexical_index.add(similar_item["id"], texts, similar_item["query"])
+    
+    def _process_coalesced(self, text: str, deadline: Optional[float] = None) -> QueryResult:
+        """Run the pipeline once for all concurrent callers with the same canonical text."""
+        return self._query_flights.do(
+            canonicalize_query(text), lambda: self._process_uncached(text, deadline)
+        )
+    
+    async def _aprocess_coalesced(self, text: str, deadline: Optional[float] = None) -> QueryResult:
+        """Async version of _process_coalesced."""
+        return await self._async_query_flights.do(
+            canonicalize_query(text), lambda: self._aprocess_uncached(text, deadline)
+        )
+    
+    async def _run_storage(self, func, *args, **kwargs):
+        """Run a blocking storage call in the storage thread pool (in the caller's context)."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.storage_executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+    
+    def _deadline(self) -> Optional[float]:
+        """Monotonic time by which a request started now should be answered."""
+        if self.latency_budget_ms <= 0:
+            return None
+        return time.monotonic() + self.latency_budget_ms / 1000
+    
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        """Seconds left until the deadline (None without a budget)."""
+        return None if deadline is None else deadline - time.monotonic()
+    
+    def _transformer_closed(self) -> bool:
+        """Whether the transformer's circuit is closed (speculation is only started then)."""
+        return self.transformer_breaker is None or self.transformer_breaker.state != OPEN
+    
+    def _skip_transform_reason(self, deadline: Optional[float]) -> Optional[str]:
+        """
+        Decide whether the LLM stage has to be skipped.
+        
+        Reserves the breaker's half-open probe when the stage may run, so the
+        caller must record the outcome with _record_transform.
+        
+        Returns:
+            Degradation reason, or None if the transformer should be called
+        """
+        breaker = self.transformer_breaker
+        if breaker is not None and breaker.state == OPEN:
+            reason = "transformer_open"
+        else:
+            remaining = self._remaining(deadline)
+            expected = breaker.expected_latency() if breaker is not None else None
+            if remaining is not None and (remaining <= 0 or (expected is not None and expected > remaining)):
+                reason = "over_budget"
+            elif breaker is not None and not breaker.allow_request():
+                reason = "transformer_open"
+            else:
+                return None
+        with self._counters_lock:
+            self._degraded[reason] += 1
+        return reason
+    
+    def _record_transform(self, start: float, ok: bool) -> None:
+        """Record a transformer call's latency and outcome with its breaker and metrics."""
+        latency = time.monotonic() - start
+        if ok and self.metrics is not None:
+            self.metrics.observe("transform", latency)
+        trace = current_trace()
+        if ok and trace is not None:
+            trace.add_stage("transform", latency)
+        if self.transformer_breaker is None:
+            return
+        if ok:
+            self.transformer_breaker.record_success(latency)
+        else:
+            self.transformer_breaker.record_failure(latency)
+    
+    def _submit_transform(self, text: str) -> Future:
+        """Run a transform in the pool; the future resolves to (normalized query, start time)."""
+        return self._transform_executor.submit(self._run_transform, text)
+    
+    def _run_transform(self, text: str) -> Tuple[str, float]:
+        """Transform a query, also returning when the call actually started (after any queueing)."""
+        start = time.monotonic()
+        return self.query_transformer.transform(text), start
+    
+    def _count_queued_timeout(self) -> str:
+        """Count a transform that was still queued in the pool at the deadline."""
+        if self.transformer_breaker is not None:
+            # The LLM never saw the call, so it says nothing about its health
+            self.transformer_breaker.release()
+        with self._counters_lock:
+            self._degraded["over_budget"] += 1
+        logger.warning("Query transform was still queued at the latency budget, skipping LLM")
+        return "over_budget"
+    
+    def _count_timeout(self) -> str:
+        """Count a transform abandoned at the deadline."""
+        with self._counters_lock:
+            self._degraded["transformer_timeout"] += 1
+        logger.warning("Query transform exceeded the latency budget, skipping LLM")
+        return "transformer_timeout"
+    
+    def _count_error(self, error: Exception) -> str:
+        """Count a transform that failed, so the query is routed on its raw embedding."""
+        with self._counters_lock:
+            self._degraded["transformer_error"] += 1
+        logger.warning(f"Query transform failed, skipping LLM: {error}")
+        return "transformer_error"
+    
+    def _count_embedding_open(self) -> str:
+        """Count a query passed through because the embedding circuit is open."""
+        with self._counters_lock:
+            self._degraded["embedding_open"] += 1
+        logger.warning("Embedding circuit is open, passing query through")
+        return "embedding_open"
+    
+    def _embed(self, text: str) -> list:
+        """Create an embedding through the embedding breaker, if any."""
+        if self.embedding_breaker is None:
+            return self.embedding_provider.create(text)
+        return self.embedding_breaker.call(self.embedding_provider.create, text)
+    
+    def _embed_batch(self, texts: List[str]) -> List[list]:
+        """Create embeddings for several texts through the embedding breaker, if any."""
+        if self.embedding_breaker is None:
+            return self.embedding_provider.create_batch(texts)
+        return self.embedding_breaker.call(self.embedding_provider.create_batch, texts)
+    
+    async def _aembed(self, text: str) -> list:
+        """Async version of _embed."""
+        if self.embedding_breaker is None:
+            return await self.embedding_provider.acreate(text)
+        return await self.embedding_breaker.acall(self.embedding_provider.acreate, text)
+    
+    def _transform_within_budget(
+        self,
+        text: str,
+        deadline: Optional[float],
+        speculation: Optional[Future]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Transform a query unless its breaker or the latency budget rules it out.
+        
+        Args:
+            text: User query text
+            deadline: Monotonic deadline of the request (None without a budget)
+            speculation: Transform already started for the text, if any
+        
+        Returns:
+            (normalized query, None), or (None, degradation reason) if the LLM was
+            skipped or failed (failures are recorded with the breaker)
+        """
+        degraded = self._skip_transform_reason(deadline)
+        if degraded is not None:
+            if speculation is not None:
+                self._discard_speculation(speculation)
+            return None, degraded
+        
+        future = speculation
+        if future is None and deadline is not None:
+            # Run in the pool so the request can give up on it at the deadline
+            future = self._submit_transform(text)
+        
+        normalized_query, degraded = self._await_transform(text, future, deadline)
+        if speculation is not None:
+            if degraded is None:
+                self._count_speculation("used")
+            else:
+                self._count_speculation("cancelled" if speculation.cancelled() else "wasted")
+        return normalized_query, degraded
+    
+    def _await_transform(
+        self,
+        text: str,
+        future: Optional[Future],
+        deadline: Optional[float]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Wait for a transform until the deadline and record its outcome with the breaker.
+        
+        Only calls that started count with the breaker: one still queued in the
+        pool at the deadline is cancelled and reported as over budget.
+        
+        Args:
+            text: User query text
+            future: Transform submitted with _submit_transform (None runs it inline)
+            deadline: Monotonic deadline of the request (None without a budget)
+        
+        Returns:
+            (normalized query, None), or (None, "over_budget" / "transformer_timeout" / "transformer_error")
+        """
+        start = time.monotonic()
+        try:
+            if future is not None:
+                normalized_query, start = future.result(timeout=self._remaining(deadline))
+            else:
+                normalized_query = self.query_transformer.transform(text)
+        except FutureTimeoutError:
+            if future.cancel():
+                return None, self._count_queued_timeout()
+            self._record_transform(start, ok=False)
+            return None, self._count_timeout()
+        except Exception as e:
+            self._record_transform(start, ok=False)
+            return None, self._count_error(e)
+        except BaseException:
+            self._record_transform(start, ok=False)
+            raise
+        
+        self._record_transform(start, ok=True)
+        return normalized_query, None
+    
+    def _transform_batch(
+        self,
+        texts: List[str],
+        deadline: Optional[float]
+    ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """
+        Transform several queries in parallel, each under the breaker and the latency budget.
+        
+        Skips are decided before anything is submitted, so an open breaker
+        lets at most its half-open probe through.
+        
+        Returns:
+            Text -> (normalized query, None) or (None, degradation reason)
+        """
+        outcomes: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        submitted = {}
+        for text in texts:
+            degraded = self._skip_transform_reason(deadline)
+            if degraded is not None:
+                outcomes[text] = (None, degraded)
+            else:
+                submitted[text] = self._submit_transform(text)
+        for text, future in submitted.items():
+            outcomes[text] = self._await_transform(text, future, deadline)
+        return outcomes
+    
+    async def _atransform_within_budget(
+        self,
+        text: str,
+        deadline: Optional[float],
+        speculation: Optional[asyncio.Future]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Async version of _transform_within_budget."""
+        degraded = self._skip_transform_reason(deadline)
+        if degraded is not None:
+            if speculation is not None:
+                speculation.cancel()
+                self._count_speculation("wasted")
+            return None, degraded
+        
+        start = time.monotonic()
+        try:
+            normalized_query = await asyncio.wait_for(
+                speculation if speculation is not None else self.query_transformer.atransform(text),
+                timeout=self._remaining(deadline)
+            )
+        except asyncio.TimeoutError:
+            self._record_transform(start, ok=False)
+            if speculation is not None:
+                self._count_speculation("wasted")
+            return None, self._count_timeout()
+        except Exception as e:
+            self._record_transform(start, ok=False)
+            if speculation is not None:
+                self._count_speculation("wasted")
+            return None, self._count_error(e)
+        except BaseException:
+            self._record_transform(start, ok=False)
+            raise
+        
+        self._record_transform(start, ok=True)
+        if speculation is not None:
+            self._count_speculation("used")
+        return normalized_query, None
+    
+    def _route_raw(self, text: str, original_embedding: list, degraded: str) -> QueryResult:
+        """
+        Decide on the original embedding at similarity_threshold (LLM stage skipped).
+        
+        A miss returns the raw text without storing it, so the cache only ever
+        holds LLM-normalized queries.
+        """
+        with self._timed("second_tier_find"):
+            similar_items = self.storage.find(
+                embedding=original_embedding,
+                threshold=self.similarity_threshold,
+                top_k=1
+            )
+        self._trace_similarity("raw", similar_items, original_embedding)
+        return self._raw_result(text, similar_items, degraded)
+    
+    async def _aroute_raw(self, text: str, original_embedding: list, degraded: str) -> QueryResult:
+        """Async version of _route_raw."""
+        with self._timed("second_tier_find"):
+            similar_items = await self._run_storage(
+                self.storage.find,
+                embedding=original_embedding,
+                threshold=self.similarity_threshold,
+                top_k=1
+            )
+        await self._atrace_similarity("raw", similar_items, original_embedding)
+        return self._raw_result(text, similar_items, degraded)
+    
+    @staticmethod
+    def _raw_result(text: str, similar_items: List[Dict], degraded: str) -> QueryResult:
+        """Build the result of a decision on the original embedding."""
+        if similar_items:
+            logger.info(f"Degraded ({degraded}): cached query with similarity {similar_items[0]['similarity']:.3f}")
+            return QueryResult(similar_items[0]["query"], "raw_hit", degraded)
+        logger.info(f"Degraded ({degraded}): no cached match, returning query as is")
+        return QueryResult(text, "raw_miss", degraded)
+    
+    async def _aprocess_uncached(self, text: str, deadline: Optional[float] = None) -> QueryResult:
+        """Async version of _process_uncached."""
+        if self.lexical_index is not None:
+            # Lookups may replay the shared log and wait on its locks
+            lexical_match = await self._run_storage(self._find_lexical, text)
+            if lexical_match is not None:
+                return QueryResult(lexical_match, "lexical")
+        
+        speculation = None
+        if self.speculative_transform and self._transformer_closed():
+            speculation = asyncio.ensure_future(self.query_transformer.atransform(text))
+            self._count_speculation("started")
         
-        # Step 1: Check DB with original query first
-        original_embedding = self.embedding_provider.create(text)
-        logger.debug(f"Generated embedding vector of length {len(original_embedding)}")
+        try:
+            # Step 1: Check DB with original query first
+            with self._timed("raw_embed"):
+                original_embedding = await self._aembed(text)
+            with self._timed("first_tier_find"):
+                similar_items = await self._run_storage(
+                    self.storage.find,
+                    embedding=original_embedding,
+                    threshold=self.high_confidence_threshold,
+                    top_k=1
+                )
+            await self._atrace_similarity("first_tier", similar_items, original_embedding)
+        except BaseException as e:
+            if speculation is not None:
+                speculation.cancel()
+                self._count_speculation("wasted")
+            if isinstance(e, CircuitOpenError):
+                return QueryResult(text, "passthrough", self._count_embedding_open())
+            raise
         
-        similar_items = self.storage.find(
-            embedding=original_embedding,
-            threshold=self.high_confidence_threshold,
-            top_k=1
+        if similar_items:
+            if speculation is not None:
+                # The request has already been sent to Ollama, so it counts as wasted
+                speculation.cancel()
+                self._count_speculation("wasted")
+            cached_query = similar_items[0]["query"]
+            similarity = similar_items[0]["similarity"]
+            logger.info(f"Found high-confidence cached query with similarity: {similarity:.3f}")
+            if self.lexical_index is not None:
+                await self._run_storage(self._remember_lexical, similar_items[0], text)
+            return QueryResult(cached_query, self._first_tier_path(similar_items[0]))
+        
+        # Step 2: No high-confidence match, transform query and check again
+        normalized_query, degraded = await self._atransform_within_budget(text, deadline, speculation)
+        if degraded is not None:
+            return await self._aroute_raw(text, original_embedding, degraded)
+        try:
+            with self._timed("normalized_embed"):
+                normalized_embedding = await self._aembed(normalized_query)
+        except CircuitOpenError:
+            return QueryResult(normalized_query, "passthrough", self._count_embedding_open())
+        path, canonical = await self._async_store_flights.do(
+            normalized_query,
+            lambda: self._run_storage(self._match_or_store, normalized_query, normalized_embedding)
         )
+        return await self._run_storage(self._settle, text, path, canonical, original_embedding)
+    
+    def _count_speculation(self, outcome: str) -> None:
+        """Increment a speculative-transform counter."""
+        with self._counters_lock:
+            self._speculation[outcome] += 1
+    
+    def _discard_speculation(self, speculation: Future) -> None:
+        """Cancel an unneeded speculative transform, counting it as wasted if it already ran."""
+        if speculation.cancel():
+            self._count_speculation("cancelled")
+        else:
+            self._count_speculation("wasted")
+    
+    def _process_uncached(self, text: str, deadline: Optional[float] = None) -> QueryResult:
+        """Run the embedding / lookup / transform pipeline for a query."""
+        lexical_match = self._find_lexical(text)
+        if lexical_match is not None:
+            return QueryResult(lexical_match, "lexical")
+        
+        speculation = None
+        if self.speculative_transform and self._transformer_closed():
+            # Start the LLM call now; it is only needed if the first tier misses
+            speculation = self._submit_transform(text)
+            self._count_speculation("started")
+        
+        try:
+            # Step 1: Check DB with original query first
+            with self._timed("raw_embed"):
+                original_embedding = self._embed(text)
+            logger.debug(f"Generated embedding vector of length {len(original_embedding)}")
+            
+            with self._timed("first_tier_find"):
+                similar_items = self.storage.find(
+                    embedding=original_embedding,
+                    threshold=self.high_confidence_threshold,
+                    top_k=1
+                )
+            self._trace_similarity("first_tier", similar_items, original_embedding)
+        except BaseException as e:
+            if speculation is not None:
+                self._discard_speculation(speculation)
+            if isinstance(e, CircuitOpenError):
+                return QueryResult(text, "passthrough", self._count_embedding_open())
+            raise
         
         if similar_items:
+            if speculation is not None:
+                self._discard_speculation(speculation)
             cached_query = similar_items[0]["query"]
             similarity = similar_items[0]["similarity"]
             logger.info(f"Found high-confidence cached query with similarity: {similarity:.3f}")
-            return cached_query
+            self._remember_lexical(similar_items[0], text)
+            return QueryResult(cached_query, self._first_tier_path(similar_items[0]))
         
         # Step 2: No high-confidence match, transform query and check again
         logger.debug("No high-confidence match found, transforming query")
-        normalized_query = self.query_transformer.transform(text)
+        normalized_query, degraded = self._transform_within_budget(text, deadline, speculation)
+        if degraded is not None:
+            return self._route_raw(text, original_embedding, degraded)
         logger.debug(f"Normalized query: '{normalized_query}'")
         
         # Create embedding from normalized query
-        normalized_embedding = self.embedding_provider.create(normalized_query)
+        try:
+            with self._timed("normalized_embed"):
+                normalized_embedding = self._embed(normalized_query)
+        except CircuitOpenError:
+            return QueryResult(normalized_query, "passthrough", self._count_embedding_open())
         
-        # Check DB with normalized query
-        similar_items = self.storage.find(
-            embedding=normalized_embedding,
-            threshold=self.similarity_threshold,
-            top_k=1
+        path, canonical = self._store_flights.do(
+            normalized_query, lambda: self._match_or_store(normalized_query, normalized_embedding)
         )
+        return self._settle(text, path, canonical, original_embedding)
+    
+    def _match_or_store(self, normalized_query: str, normalized_embedding: list) -> Tuple[str, Dict]:
+        """
+        Check DB with the normalized query and store it if there is no match.
+        
+        Runs inside a single flight keyed on the normalized query, so concurrent
+        misses for the same query perform one insert between them. Callers
+        sharing the flight may have phrased the query differently, so their
+        own bookkeeping is left to _settle.
+        
+        Args:
+            normalized_query: Transformer output for the query
+            normalized_embedding: Embedding of the normalized query
+        
+        Returns:
+            ("cached", matched row) on a hit, otherwise ("stored", id and query of the new row)
+        """
+        with self._timed("second_tier_find"):
+            similar_items = self.storage.find(
+                embedding=normalized_embedding,
+                threshold=self.similarity_threshold,
+                top_k=1
+            )
+        self._trace_similarity("second_tier", similar_items, normalized_embedding)
         
         if similar_items:
-            cached_query = similar_items[0]["query"]
-            similarity = similar_items[0]["similarity"]
-            logger.info(f"Found cached query with similarity: {similarity:.3f}")
-            return cached_query
+            logger.info(f"Found cached query with similarity: {similar_items[0]['similarity']:.3f}")
+            return "cached", similar_items[0]
         
         # Step 3: No match found, store normalized query
         logger.info("No cached match found, storing normalized query")
-        self.storage.put(query=normalized_query, embedding=normalized_embedding)
+        embedding_id = self._store(normalized_query, normalized_embedding)
         logger.info(f"Stored new embedding for query: {normalized_query[:50]}...")
+        return "stored", {"id": embedding_id, "query": normalized_query}
+    
+    def _settle(
+        self,
+        text: str,
+        path: str,
+        canonical: Dict,
+        original_embedding: Optional[list] = None
+    ) -> QueryResult:
+        """
+        Finish one caller's miss once the shared match-or-store step resolved.
+        
+        Args:
+            text: Raw user query
+            path: "cached" or "stored", as returned by _match_or_store
+            canonical: Entry the query routes to, as returned by _match_or_store
+            original_embedding: Embedding of the raw query, stored as an alias row of
+                the entry (when aliases are enabled)
         
-        return normalized_query
+        Returns:
+            Routed result of the caller
+        """
+        if path == "stored":
+            self._remember_lexical(canonical, text, canonical["query"])
+        else:
+            self._remember_lexical(canonical, text)
+        if original_embedding is not None:
+            self._store_alias(text, original_embedding, canonical)
+        return QueryResult(canonical["query"], path)
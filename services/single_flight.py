@@ -0,0 +1,115 @@
+"""Single-flight coalescing of concurrent identical computations."""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """In-flight computation shared by the leader and its followers."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution (threads).
+    
+    The first caller for a key runs the function; callers that arrive while it
+    is running wait for it and receive the same result or exception.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.collapsed = 0
+    
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Run func once for all concurrent callers with the same key.
+        
+        Args:
+            key: Coalescing key
+            func: Zero-argument function computing the result
+        
+        Returns:
+            Result of the (possibly shared) execution
+        
+        Raises:
+            Exception: Whatever the shared execution raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.collapsed += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def stats(self) -> Dict[str, int]:
+        """Return execution and collapsed-call counters."""
+        return {"executions": self.executions, "collapsed": self.collapsed}
+
+
+class AsyncSingleFlight:
+    """
+    Collapse concurrent coroutine calls with the same key into one task.
+    
+    The shared task is shielded, so a cancelled caller does not cancel the
+    computation the other callers are waiting on.
+    """
+    
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.collapsed = 0
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await func once for all concurrent callers with the same key.
+        
+        Args:
+            key: Coalescing key
+            func: Zero-argument coroutine function computing the result
+        
+        Returns:
+            Result of the (possibly shared) execution
+        
+        Raises:
+            Exception: Whatever the shared execution raised
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return execution and collapsed-call counters."""
+        return {"executions": self.executions, "collapsed": self.collapsed}
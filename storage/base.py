@@ -6,6 +6,11 @@ from typing import List, Dict, Optional
 class VectorStore(ABC):
     """Abstract base class for vector database implementations."""
     
+    @property
+    def dimension(self) -> Optional[int]:
+        """Dimension of the stored embeddings, or None if unknown or still empty."""
+        return None
+    
     @abstractmethod
     def ping(self) -> bool:
         """
@@ -13,7 +18,7 @@ class VectorStore(ABC):
         
         Returns:
             True if the database is accessible, False otherwise
-            
+        
         Raises:
             Exception: If the database connection fails
         """
@@ -33,7 +38,7 @@ class VectorStore(ABC):
             query: User query text
             embedding: Embedding vector
             metadata: Additional metadata dictionary
-            
+        
         Returns:
             Generated embedding ID
         """
@@ -44,7 +49,8 @@ class VectorStore(ABC):
         self,
         embedding: List[float],
         threshold: float = 0.85,
-        top_k: int = 10
+        top_k: int = 10,
+        record_hits: bool = True
     ) -> List[Dict]:
         """
         Find similar embeddings above threshold.
@@ -53,9 +59,75 @@ class VectorStore(ABC):
             embedding: Query embedding vector
             threshold: Minimum similarity threshold (0.0-1.0)
             top_k: Maximum number of results to return
-            
+            record_hits: Count returned rows as hits for eviction (False for diagnostic lookups)
+        
         Returns:
             List of dictionaries with id, distance, query, similarity, metadata
         """
         pass
-
+    
+    def put_batch(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Optional[Dict]]] = None
+    ) -> List[str]:
+        """
+        Store several embeddings at once.
+        
+        Backends with bulk inserts should override this; the default stores
+        the entries one by one.
+        
+        Args:
+            queries: User query texts
+            embeddings: Embedding vectors, one per query
+            metadatas: Optional metadata dictionaries, one per query
+        
+        Returns:
+            Generated embedding IDs in input order
+        """
+        metadatas = metadatas or [None] * len(queries)
+        return [
+            self.put(query=query, embedding=embedding, metadata=metadata)
+            for query, embedding, metadata in zip(queries, embeddings, metadatas)
+        ]
+    
+    def count_aliases(self, entry_id: str) -> Optional[int]:
+        """
+        Count the alias rows (metadata alias_of == entry_id) pointing to an entry.
+        
+        Backends that can filter on metadata should override this; the
+        default cannot tell.
+        
+        Args:
+            entry_id: ID of the canonical entry
+        
+        Returns:
+            Number of alias rows, or None if the backend cannot count them
+        """
+        return None
+    
+    def find_batch(
+        self,
+        embeddings: List[List[float]],
+        threshold: float = 0.85,
+        top_k: int = 10
+    ) -> List[List[Dict]]:
+        """
+        Find similar embeddings for several query vectors.
+        
+        Backends with batched search should override this; the default runs
+        one find() per vector.
+        
+        Args:
+            embeddings: Query embedding vectors
+            threshold: Minimum similarity threshold (0.0-1.0)
+            top_k: Maximum number of results per query vector
+        
+        Returns:
+            One result list (as returned by find) per query vector
+        """
+        return [
+            self.find(embedding=embedding, threshold=threshold, top_k=top_k)
+            for embedding in embeddings
+        ]
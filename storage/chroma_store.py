@@ -1,28 +1,119 @@
 """ChromaDB storage implementation."""
+import atexit
+import contextlib
+import os
+import sys
+import tempfile
+import time
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Optional
+from typing import IO, Callable, Dict, Iterator, List, Optional
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 from storage.base import VectorStore
+from storage.eviction import HitTracker
+from storage.write_behind import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
 
+@contextlib.contextmanager
+def _captured_stdout() -> Iterator[IO[bytes]]:
+    """
+    Redirect file descriptor 1 to a temporary file for the duration of the block.
+    
+    Chroma's Rust CLI writes straight to the process's stdout, which
+    contextlib.redirect_stdout does not catch. Other threads' stdout writes
+    during the block land in the same file.
+    """
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with tempfile.TemporaryFile(mode="w+b") as captured:
+        os.dup2(captured.fileno(), 1)
+        try:
+            yield captured
+        finally:
+            os.dup2(saved, 1)
+            os.close(saved)
+
+
+def hnsw_configuration(
+    max_neighbors: int = 16,
+    ef_construction: int = 100,
+    ef_search: int = 100,
+    sync_threshold: int = 1000,
+    batch_size: int = 100,
+    space: str = "cosine"
+) -> Dict:
+    """
+    Build a Chroma collection configuration for the HNSW index.
+    
+    Args:
+        max_neighbors: HNSW graph degree (M); higher improves recall and costs memory
+        ef_construction: Candidate list size while building the graph
+        ef_search: Candidate list size while querying; trades latency for recall
+        sync_threshold: Number of writes buffered before the index is persisted
+        batch_size: Number of writes batched into one index update (ignored by
+            Chroma versions that no longer batch HNSW updates)
+        space: Distance function; find() assumes "cosine"
+    
+    Returns:
+        Configuration dictionary for create_collection(configuration=...)
+    """
+    return {
+        "hnsw": {
+            "space": space,
+            "max_neighbors": max_neighbors,
+            "ef_construction": ef_construction,
+            "ef_search": ef_search,
+            "sync_threshold": sync_threshold,
+            "batch_size": batch_size,
+        }
+    }
+
+
 class ChromaStore(VectorStore):
     """ChromaDB storage for embeddings and metadata."""
     
-    def __init__(self, collection_name: str, persist_directory: str = "./chroma_db"):
+    def __init__(
+        self,
+        collection_name: str,
+        persist_directory: str = "./chroma_db",
+        configuration: Optional[Dict] = None,
+        write_behind: bool = False,
+        write_behind_batch_size: int = 256,
+        write_behind_flush_ms: float = 50.0,
+        write_behind_max_pending: int = 10000,
+        max_entries: int = 0,
+        max_age_seconds: float = 0
+    ):
         """
         Initialize ChromaDB client and collection.
         
         Args:
             collection_name: Name of the ChromaDB collection
             persist_directory: Directory to persist ChromaDB data
+            configuration: Collection configuration used when the collection is
+                created (defaults to hnsw_configuration(), i.e. cosine space)
+            write_behind: Return from put() immediately and insert rows in background batches
+            write_behind_batch_size: Rows per background insert
+            write_behind_flush_ms: Maximum time a row waits before being inserted
+            write_behind_max_pending: Buffered rows at which put() blocks (backpressure)
+            max_entries: Rows kept by evict(); the least hit rows go first (0 = unbounded)
+            max_age_seconds: Age after which evict() removes a row (0 = never expires)
         """
         self.collection_name = collection_name
         self.persist_directory = persist_directory
+        self.configuration = configuration or hnsw_configuration()
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.expired = 0
+        self.evicted = 0
+        self.compactions = 0
+        self._created_at_checked = False
+        self._hits = HitTracker()
+        self._eviction_listeners: List[Callable[[List[str]], None]] = []
         
         self.client = chromadb.PersistentClient(
             path=persist_directory,
@@ -33,8 +124,82 @@ class ChromaStore(VectorStore):
             self.collection = self.client.get_collection(name=collection_name)
             logger.info(f"Loaded existing collection: {collection_name}")
         except Exception:
-            self.collection = self.client.create_collection(name=collection_name)
+            self.collection = self.client.create_collection(
+                name=collection_name,
+                configuration=self.configuration
+            )
             logger.info(f"Created new collection: {collection_name}")
+        else:
+            self._check_configuration()
+        
+        self._write_buffer = None
+        if write_behind:
+            self._write_buffer = WriteBehindBuffer(
+                flush_func=self._add_rows,
+                max_batch_size=write_behind_batch_size,
+                flush_interval_ms=write_behind_flush_ms,
+                max_pending=write_behind_max_pending
+            )
+            atexit.register(self.close)
+    
+    def _check_configuration(self) -> None:
+        """Warn about a non-cosine collection and apply the configured search ef."""
+        hnsw = (self.collection.configuration or {}).get("hnsw") or {}
+        if hnsw.get("space") != "cosine":
+            logger.warning(
+                f"Collection {self.collection_name} uses '{hnsw.get('space', 'l2')}' distance; "
+                "similarities assume cosine. Rebuild it with: python -m cli.reindex"
+            )
+        
+        ef_search = self.configuration.get("hnsw", {}).get("ef_search")
+        if ef_search and hnsw.get("ef_search") != ef_search:
+            try:
+                self.collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+                logger.info(f"Set HNSW ef_search to {ef_search}")
+            except Exception as e:
+                logger.warning(f"Failed to update HNSW ef_search: {e}")
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        """Embedding dimension, or None until the first row is stored."""
+        page = self.collection.get(limit=1, include=["embeddings"])
+        if not page["ids"]:
+            return None
+        return len(page["embeddings"][0])
+    
+    def count(self) -> int:
+        """Return the number of stored rows."""
+        return self.collection.count()
+    
+    def count_aliases(self, entry_id: str) -> Optional[int]:
+        """Count alias rows of an entry, including buffered ones (see VectorStore.count_aliases)."""
+        ids = set(self.collection.get(where={"alias_of": entry_id}, include=[])["ids"])
+        if self._write_buffer is not None:
+            ids.update(
+                row["id"] for row in self._write_buffer.pending()
+                if (row["metadata"] or {}).get("alias_of") == entry_id
+            )
+        return len(ids)
+    
+    def iter_entries(self, batch_size: int = 1000, include_embeddings: bool = True) -> Iterator[Dict]:
+        """
+        Stream stored entries page by page.
+        
+        Args:
+            batch_size: Number of rows fetched per page
+            include_embeddings: Whether to fetch embedding vectors
+        
+        Yields:
+            Pages as dictionaries with ids, documents, metadatas (and embeddings)
+        """
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        offset = 0
+        while True:
+            page = self.collection.get(limit=batch_size, offset=offset, include=include)
+            if not page["ids"]:
+                return
+            yield page
+            offset += len(page["ids"])
     
     def ping(self) -> bool:
         """
@@ -42,7 +207,7 @@ class ChromaStore(VectorStore):
         
         Returns:
             True if ChromaDB is accessible, False otherwise
-            
+        
         Raises:
             Exception: If the database connection fails
         """
@@ -67,16 +232,26 @@ class ChromaStore(VectorStore):
             query: User query text
             embedding: Embedding vector
             metadata: Additional metadata dictionary
-            
+        
         Returns:
             Generated embedding ID
         """
         embedding_id = str(uuid.uuid4())
         doc_metadata = {
-            "timestamp": datetime.utcnow().isoformat(),
+            **self._entry_metadata(time.time()),
             **(metadata or {})
         }
         
+        if self._write_buffer is not None:
+            self._write_buffer.add([{
+                "id": embedding_id,
+                "embedding": embedding,
+                "document": query,
+                "metadata": doc_metadata
+            }])
+            logger.info(f"Queued embedding with ID: {embedding_id}")
+            return embedding_id
+        
         try:
             self.collection.add(
                 ids=[embedding_id],
@@ -94,7 +269,8 @@ class ChromaStore(VectorStore):
         self,
         embedding: List[float],
         threshold: float = 0.85,
-        top_k: int = 10
+        top_k: int = 10,
+        record_hits: bool = True
     ) -> List[Dict]:
         """
         Find similar embeddings above threshold.
@@ -103,7 +279,8 @@ class ChromaStore(VectorStore):
             embedding: Query embedding vector
             threshold: Minimum similarity threshold (0.0-1.0)
             top_k: Maximum number of results to return
-            
+            record_hits: Count returned rows as hits for eviction (False for diagnostic lookups)
+        
         Returns:
             List of dictionaries with id, distance, query, similarity, metadata
         """
@@ -114,28 +291,364 @@ class ChromaStore(VectorStore):
             )
             
             if not results['ids'] or not results['ids'][0]:
-                return []
-            
-            ids = results['ids'][0]
-            distances = results['distances'][0]
-            documents = results['documents'][0]
-            metadatas = results['metadatas'][0]
-            
-            similar_items = []
-            for i, (id_val, distance) in enumerate(zip(ids, distances)):
-                similarity = 1.0 - distance
-                
-                if similarity >= threshold:
-                    similar_items.append({
-                        "id": id_val,
-                        "similarity": similarity,
-                        "distance": distance,
-                        "query": documents[i] if i < len(documents) else "",
-                        "metadata": metadatas[i] if i < len(metadatas) else {}
-                    })
+                return self._merge_pending([], embedding, threshold, top_k)
             
+            similar_items = self._merge_pending(
+                self._parse_results(results, 0, threshold), embedding, threshold, top_k
+            )
+            if record_hits:
+                self._hits.record(item["id"] for item in similar_items)
             return similar_items
         except Exception as e:
             logger.error(f"Failed to find similar embeddings: {e}")
             return []
+    
+    def put_batch(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Optional[Dict]]] = None
+    ) -> List[str]:
+        """
+        Store several embeddings with a single collection.add call.
+        
+        Args:
+            queries: User query texts
+            embeddings: Embedding vectors, one per query
+            metadatas: Optional metadata dictionaries, one per query
+        
+        Returns:
+            Generated embedding IDs in input order
+        """
+        if not queries:
+            return []
+        entry_metadata = self._entry_metadata(time.time())
+        embedding_ids = [str(uuid.uuid4()) for _ in queries]
+        doc_metadatas = [
+            {**entry_metadata, **(metadata or {})}
+            for metadata in (metadatas or [None] * len(queries))
+        ]
+        
+        if self._write_buffer is not None:
+            self._write_buffer.add([
+                {"id": embedding_id, "embedding": embedding, "document": query, "metadata": doc_metadata}
+                for embedding_id, embedding, query, doc_metadata
+                in zip(embedding_ids, embeddings, queries, doc_metadatas)
+            ])
+            logger.info(f"Queued {len(embedding_ids)} embeddings")
+            return embedding_ids
+        
+        try:
+            self.collection.add(
+                ids=embedding_ids,
+                embeddings=embeddings,
+                documents=queries,
+                metadatas=doc_metadatas
+            )
+            logger.info(f"Stored {len(embedding_ids)} embeddings")
+            return embedding_ids
+        except Exception as e:
+            logger.error(f"Failed to store embeddings: {e}")
+            raise
+    
+    def find_batch(
+        self,
+        embeddings: List[List[float]],
+        threshold: float = 0.85,
+        top_k: int = 10
+    ) -> List[List[Dict]]:
+        """
+        Find similar embeddings for several vectors with a single collection.query call.
+        
+        Args:
+            embeddings: Query embedding vectors
+            threshold: Minimum similarity threshold (0.0-1.0)
+            top_k: Maximum number of results per query vector
+        
+        Returns:
+            One result list (as returned by find) per query vector
+        """
+        if not embeddings:
+            return []
+        try:
+            results = self.collection.query(
+                query_embeddings=embeddings,
+                n_results=top_k
+            )
+            
+            if not results['ids']:
+                return [
+                    self._merge_pending([], embedding, threshold, top_k)
+                    for embedding in embeddings
+                ]
+            
+            batch_items = [
+                self._merge_pending(
+                    self._parse_results(results, i, threshold), embedding, threshold, top_k
+                )
+                for i, embedding in enumerate(embeddings)
+            ]
+            self._hits.record(item["id"] for similar_items in batch_items for item in similar_items)
+            return batch_items
+        except Exception as e:
+            logger.error(f"Failed to find similar embeddings: {e}")
+            return [[] for _ in embeddings]
+    
+    def _add_rows(self, rows: List[Dict]) -> None:
+        """Insert buffered rows with one collection.add call."""
+        self.collection.add(
+            ids=[row["id"] for row in rows],
+            embeddings=[row["embedding"] for row in rows],
+            documents=[row["document"] for row in rows],
+            metadatas=[row["metadata"] for row in rows]
+        )
+        logger.info(f"Flushed {len(rows)} buffered embeddings")
+    
+    def _merge_pending(
+        self,
+        similar_items: List[Dict],
+        embedding: List[float],
+        threshold: float,
+        top_k: int
+    ) -> List[Dict]:
+        """Merge matches from not-yet-flushed rows into collection results."""
+        if self._write_buffer is None:
+            return similar_items
+        pending_items = self._write_buffer.find(embedding, threshold, top_k)
+        if not pending_items:
+            return similar_items
+        seen = {item["id"] for item in similar_items}
+        merged = similar_items + [item for item in pending_items if item["id"] not in seen]
+        merged.sort(key=lambda item: item["similarity"], reverse=True)
+        return merged[:top_k]
+    
+    @staticmethod
+    def _entry_metadata(now: float) -> Dict:
+        """Metadata every new row starts with (creation time and hit counters)."""
+        return {
+            "timestamp": datetime.utcfromtimestamp(now).isoformat(),
+            "created_at": now,
+            "hits": 0,
+            "last_hit_at": now
+        }
+    
+    def flush_hits(self) -> int:
+        """
+        Add hit counts accumulated by find() to the stored row metadata.
+        
+        Counts are read-modify-written, so concurrent flushes from several
+        processes may undercount; they only rank rows for eviction.
+        
+        Returns:
+            Number of rows updated
+        """
+        hits = self._hits.drain()
+        if not hits:
+            return 0
+        current = self.collection.get(ids=list(hits), include=["metadatas"])
+        if not current["ids"]:
+            return 0
+        metadatas = []
+        for entry_id, metadata in zip(current["ids"], current["metadatas"]):
+            count, last_hit_at = hits[entry_id]
+            metadata = metadata or {}
+            metadatas.append({
+                "hits": int(metadata.get("hits", 0)) + count,
+                "last_hit_at": max(float(metadata.get("last_hit_at", 0)), last_hit_at)
+            })
+        self.collection.update(ids=current["ids"], metadatas=metadatas)
+        return len(current["ids"])
+    
+    def evict(self, now: Optional[float] = None, batch_size: int = 1000) -> int:
+        """
+        Remove expired rows, then the least used rows above max_entries.
+        
+        Rows are ranked by hit count, then by last hit time, so rarely and
+        long-unused queries go first. Deletes are issued in bulk. The first
+        pass backfills created_at on legacy rows (see backfill_created_at).
+        
+        Args:
+            now: Current time in epoch seconds (defaults to time.time())
+            batch_size: Rows per page when scanning and deleting
+        
+        Returns:
+            Number of rows removed
+        """
+        now = time.time() if now is None else now
+        self.flush_hits()
+        removed = 0
+        
+        if self.max_age_seconds:
+            if not self._created_at_checked:
+                self.backfill_created_at(now, batch_size)
+                self._created_at_checked = True
+            cutoff = now - self.max_age_seconds
+            expired = self.collection.get(where={"created_at": {"$lt": cutoff}}, include=[])["ids"]
+            self._delete(expired, batch_size)
+            self.expired += len(expired)
+            removed += len(expired)
+        
+        if self.max_entries:
+            excess = self.collection.count() - self.max_entries
+            if excess > 0:
+                ranked = []
+                for page in self.iter_entries(batch_size=batch_size, include_embeddings=False):
+                    for entry_id, metadata in zip(page["ids"], page["metadatas"]):
+                        metadata = metadata or {}
+                        ranked.append((
+                            int(metadata.get("hits", 0)),
+                            float(metadata.get("last_hit_at", metadata.get("created_at", 0))),
+                            entry_id
+                        ))
+                ranked.sort()
+                cold = [entry_id for _, _, entry_id in ranked[:excess]]
+                self._delete(cold, batch_size)
+                self.evicted += len(cold)
+                removed += len(cold)
+        
+        if removed:
+            logger.info(f"Evicted {removed} rows from {self.collection_name}")
+        return removed
+    
+    def backfill_created_at(self, now: Optional[float] = None, batch_size: int = 1000) -> int:
+        """
+        Give rows written before created_at existed one, so the TTL filter sees them.
+        
+        The epoch time is taken from the row's legacy ISO ``timestamp``; rows
+        without a readable one start their TTL at ``now``.
+        
+        Args:
+            now: Current time in epoch seconds (defaults to time.time())
+            batch_size: Rows per page when scanning
+        
+        Returns:
+            Number of rows updated
+        """
+        now = time.time() if now is None else now
+        ids, metadatas = [], []
+        for page in self.iter_entries(batch_size=batch_size, include_embeddings=False):
+            for entry_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                if "created_at" in metadata:
+                    continue
+                try:
+                    created_at = datetime.fromisoformat(metadata["timestamp"]).replace(
+                        tzinfo=timezone.utc
+                    ).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    created_at = now
+                ids.append(entry_id)
+                metadatas.append({"created_at": created_at})
+        for start in range(0, len(ids), batch_size):
+            self.collection.update(ids=ids[start:start + batch_size], metadatas=metadatas[start:start + batch_size])
+        if ids:
+            logger.info(f"Backfilled created_at on {len(ids)} rows of {self.collection_name}")
+        return len(ids)
+    
+    def add_eviction_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """
+        Register a callback invoked with the IDs of rows removed by evict().
+        
+        Args:
+            listener: Function receiving a list of deleted row IDs
+        """
+        self._eviction_listeners.append(listener)
+    
+    def _delete(self, ids: List[str], batch_size: int) -> None:
+        """Delete rows by ID in chunks and notify eviction listeners."""
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            self.collection.delete(ids=chunk)
+            for listener in self._eviction_listeners:
+                try:
+                    listener(chunk)
+                except Exception as e:
+                    logger.error(f"Eviction listener failed: {e}")
+    
+    def compact(self, timeout: int = 30) -> None:
+        """
+        Reclaim the space left by deleted rows with Chroma's own vacuum command.
+        
+        Purges the embeddings log and VACUUMs the SQLite file, waiting up to
+        timeout seconds for its write lock. HNSW segment files are not shrunk:
+        deleted rows are only marked in the graph and their slots are reused by
+        later inserts, so index memory and disk stay at their high-water mark.
+        Run it from one process only (see CacheEvictor's lock_path).
+        
+        Args:
+            timeout: Seconds to wait for an exclusive lock on the database
+        """
+        if not os.path.exists(os.path.join(self.persist_directory, "chroma.sqlite3")):
+            return
+        import chromadb_rust_bindings
+        
+        self.flush()
+        # The CLI prints a banner and progress output meant for a terminal
+        with _captured_stdout() as captured:
+            chromadb_rust_bindings.cli(
+                ["chroma", "vacuum", "--path", self.persist_directory, "--force", "--timeout", str(timeout)]
+            )
+            captured.seek(0)
+            output = captured.read().decode("utf-8", errors="replace").strip()
+        if output:
+            logger.debug(f"Chroma vacuum output: {output}")
+        self.compactions += 1
+        logger.info(f"Compacted {self.persist_directory}")
+    
+    def flush(self) -> None:
+        """
+        Block until all buffered writes have been inserted.
+        
+        Raises:
+            RuntimeError: If the write-behind buffer dropped rows since the previous flush
+        """
+        if self._write_buffer is not None:
+            self._write_buffer.flush()
+    
+    def close(self) -> None:
+        """
+        Flush buffered writes and stop the background flusher.
+        
+        Raises:
+            RuntimeError: If the write-behind buffer dropped any rows
+        """
+        if self._write_buffer is not None:
+            self._write_buffer.close()
+    
+    def stats(self) -> Dict:
+        """Return write-behind buffer and eviction counters."""
+        return {
+            "write_behind": self._write_buffer.stats() if self._write_buffer else None,
+            "eviction": {
+                "max_entries": self.max_entries,
+                "max_age_seconds": self.max_age_seconds,
+                "pending_hits": len(self._hits),
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "compactions": self.compactions
+            }
+        }
+    
+    @staticmethod
+    def _parse_results(results: Dict, index: int, threshold: float) -> List[Dict]:
+        """Convert one row of a collection.query result into similarity items."""
+        ids = results['ids'][index]
+        distances = results['distances'][index]
+        documents = results['documents'][index]
+        metadatas = results['metadatas'][index]
+        
+        similar_items = []
+        for i, (id_val, distance) in enumerate(zip(ids, distances)):
+            similarity = 1.0 - distance
+            
+            if similarity >= threshold:
+                similar_items.append({
+                    "id": id_val,
+                    "similarity": similarity,
+                    "distance": distance,
+                    "query": documents[i] if i < len(documents) else "",
+                    "metadata": metadatas[i] if i < len(metadatas) else {}
+                })
+        
+        return similar_items
 
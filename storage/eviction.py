@@ -0,0 +1,269 @@
+"""Hit tracking and background eviction for capacity-bounded vector stores."""
+import fcntl
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HitTracker:
+    """
+    In-memory per-entry hit counters, drained in batches.
+    
+    find() only bumps a dictionary entry; the accumulated counts are written
+    back to the store by whoever drains the tracker, so a lookup never pays
+    for a metadata update.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits: Dict[str, Tuple[int, float]] = {}
+    
+    def record(self, ids: Iterable[str], now: float | None = None) -> None:
+        """
+        Count one hit for each id.
+        
+        Args:
+            ids: Entry IDs returned by a lookup
+            now: Hit time (defaults to the current time)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            for entry_id in ids:
+                hits, _ = self._hits.get(entry_id, (0, now))
+                self._hits[entry_id] = (hits + 1, now)
+    
+    def drain(self) -> Dict[str, Tuple[int, float]]:
+        """Return and reset accumulated (hits, last_hit_at) per id."""
+        with self._lock:
+            hits, self._hits = self._hits, {}
+        return hits
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._hits)
+
+
+class CacheEvictor:
+    """
+    Background thread that enforces a store's eviction policy.
+    
+    Every ``interval_seconds`` it calls ``store.evict()`` (which also persists
+    pending hit counts), and every ``compact_interval_seconds`` it calls
+    ``store.compact()`` to reclaim the space freed by deletions, followed by
+    any tasks registered with add_compaction_task().
+    
+    When several processes open the same store, ``lock_path`` elects one
+    owner with an exclusive file lock: only it evicts and compacts, the others
+    just persist their hit counts with ``store.flush_hits()``. A process
+    takes over on its next pass once the owner exits.
+    """
+    
+    def __init__(
+        self,
+        store,
+        interval_seconds: float = 60.0,
+        compact_interval_seconds: float = 3600.0,
+        lock_path: Optional[str] = None
+    ):
+        """
+        Initialize evictor.
+        
+        Args:
+            store: Store exposing evict(), compact() and flush_hits()
+            interval_seconds: Time between eviction passes
+            compact_interval_seconds: Time between compactions (0 disables)
+            lock_path: File whose lock makes this process the store's only
+                evictor (None always evicts)
+        """
+        self.store = store
+        self.interval = interval_seconds
+        self.compact_interval = compact_interval_seconds
+        self.lock_path = lock_path
+        self.runs = 0
+        self.failures = 0
+        self._compaction_tasks: List[Callable[[], object]] = []
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self) -> None:
+        """Start the eviction thread (no-op if already running)."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="cache-evictor", daemon=True)
+        self._thread.start()
+    
+    def add_compaction_task(self, task: Callable[[], object]) -> None:
+        """
+        Run a callable after each store compaction, in the owner process only.
+        
+        Args:
+            task: Callable compacting something derived from the store (e.g. a shared log)
+        """
+        self._compaction_tasks.append(task)
+    
+    def _run(self) -> None:
+        """Eviction loop."""
+        last_compaction = time.monotonic()
+        while not self._stop.wait(self.interval):
+            self.run_once()
+            if not self.owner:
+                continue
+            if self.compact_interval and time.monotonic() - last_compaction >= self.compact_interval:
+                last_compaction = time.monotonic()
+                try:
+                    self.store.compact()
+                except Exception as e:
+                    logger.error(f"Store compaction failed: {e}")
+                for task in self._compaction_tasks:
+                    try:
+                        task()
+                    except Exception as e:
+                        logger.error(f"Compaction task failed: {e}")
+    
+    def run_once(self) -> int:
+        """
+        Run one eviction pass (only persist hit counts unless this process owns the store).
+        
+        Returns:
+            Number of entries removed
+        """
+        self.runs += 1
+        try:
+            if not self._acquire_ownership():
+                self.store.flush_hits()
+                return 0
+            return self.store.evict()
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Eviction pass failed: {e}")
+            return 0
+    
+    @property
+    def owner(self) -> bool:
+        """Whether this process evicts and compacts the store."""
+        return self.lock_path is None or self._lock_file is not None
+    
+    def _acquire_ownership(self) -> bool:
+        """Take the owner lock if it is free; returns whether this process owns the store."""
+        if self.owner:
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        # Held until the process exits, so the lock follows a live owner
+        self._lock_file = lock_file
+        logger.info(f"This process now evicts and compacts the store ({self.lock_path})")
+        return True
+    
+    def stop(self) -> None:
+        """Stop the eviction thread and give up ownership."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+    
+    def stats(self) -> Dict:
+        """Return run counters and whether this process owns eviction."""
+        return {"runs": self.runs, "failures": self.failures, "owner": self.owner}
+
+
+class EvictionSignal:
+    """
+    Cross-process notice that a shared store evicted rows.
+    
+    Eviction listeners fire only in the process that deletes the rows (the
+    CacheEvictor owner or the index server). That process calls notify(),
+    which atomically replaces a small file; every other process polls the
+    file with watch() and runs its callback when the file's inode changes,
+    so caches derived from the store are dropped within one poll interval.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Initialize signal.
+        
+        Args:
+            path: File replaced on every eviction (its directory must exist
+                before notify() is called)
+        """
+        self.path = path
+        self.notifications = 0
+        self.changes = 0
+        self._seen = self._stamp()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        """Return the file's (inode, mtime), or None if it does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+    
+    def notify(self, ids: Iterable[str] = ()) -> None:
+        """
+        Tell every watching process that rows were evicted.
+        
+        Args:
+            ids: Evicted entry IDs (unused; watchers invalidate wholesale)
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f"{time.time()}\n")
+        # A new inode each time, so watchers see a change even within one mtime tick
+        os.replace(tmp_path, self.path)
+        self.notifications += 1
+    
+    def changed(self) -> bool:
+        """Return whether the file was replaced since the last call."""
+        stamp = self._stamp()
+        if stamp == self._seen:
+            return False
+        self._seen = stamp
+        self.changes += 1
+        return True
+    
+    def watch(self, callback: Callable[[], object], interval_seconds: float = 1.0) -> None:
+        """
+        Start a thread that runs ``callback`` after each eviction (no-op if already watching).
+        
+        Args:
+            callback: Called with no arguments once per observed change
+            interval_seconds: Time between checks of the file
+        """
+        if self._thread is not None:
+            return
+        
+        def run() -> None:
+            while not self._stop.wait(interval_seconds):
+                try:
+                    if self.changed():
+                        callback()
+                except Exception as e:
+                    logger.error(f"Eviction signal callback failed: {e}")
+        
+        self._thread = threading.Thread(target=run, name="eviction-signal", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the watch thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def stats(self) -> Dict:
+        """Return notification and observed-change counters."""
+        return {"notifications": self.notifications, "changes": self.changes}
@@ -0,0 +1,219 @@
+"""Unix-socket server that shares one vector store between worker processes.
+
+One owner process holds the index (Chroma or NumPy) and every gunicorn
+worker reaches it through a RemoteStore, so the HNSW graph or float matrix
+is loaded once however many workers run, there is a single writer, and a
+put is visible to all workers as soon as it returns.
+
+Wire format (little-endian), one request and one response per round trip
+on a persistent connection:
+
+    request:  op (u8), header length (u32), rows (u32), dimension (u32),
+              JSON header, rows * dimension float32 values
+    response: status (u8, 0 = ok), body length (u32), JSON body
+
+Embeddings travel as raw float32 rather than JSON numbers; results carry
+no vectors, so their bodies stay small.
+"""
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from storage.base import VectorStore
+
+logger = logging.getLogger(__name__)
+
+REQUEST_HEADER = struct.Struct("<BIII")
+RESPONSE_HEADER = struct.Struct("<BI")
+
+OP_PING = 1
+OP_PUT = 2
+OP_FIND = 3
+OP_PUT_BATCH = 4
+OP_FIND_BATCH = 5
+OP_COUNT = 6
+OP_DIMENSION = 7
+OP_STATS = 8
+OP_FLUSH = 9
+OP_COUNT_ALIASES = 10
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """
+    Read exactly size bytes.
+    
+    Raises:
+        ConnectionError: If the peer closes the connection first
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        chunk = sock.recv_into(view[received:])
+        if chunk == 0:
+            raise ConnectionError("Connection closed by peer")
+        received += chunk
+    return bytes(buffer)
+
+
+def encode_request(op: int, header: Optional[Dict] = None, vectors: Optional[List[List[float]]] = None) -> bytes:
+    """Frame a request; vectors are sent as one float32 block."""
+    body = json.dumps(header or {}).encode("utf-8")
+    if vectors:
+        block = np.asarray(vectors, dtype="<f4")
+        if block.ndim != 2:
+            raise ValueError("Embeddings must all have the same dimension")
+        rows, dimension = block.shape
+        return REQUEST_HEADER.pack(op, len(body), rows, dimension) + body + block.tobytes()
+    return REQUEST_HEADER.pack(op, len(body), 0, 0) + body
+
+
+def read_request(sock: socket.socket) -> Tuple[int, Dict, Optional[np.ndarray]]:
+    """Read one request frame: (op, header, vectors or None)."""
+    op, header_length, rows, dimension = REQUEST_HEADER.unpack(recv_exactly(sock, REQUEST_HEADER.size))
+    header = json.loads(recv_exactly(sock, header_length)) if header_length else {}
+    vectors = None
+    if rows:
+        data = recv_exactly(sock, rows * dimension * 4)
+        vectors = np.frombuffer(data, dtype="<f4").reshape(rows, dimension)
+    return op, header, vectors
+
+
+def encode_response(status: int, body: Any) -> bytes:
+    """Frame a response with a JSON body (NumPy scalars become Python numbers)."""
+    data = json.dumps(body, default=_json_default).encode("utf-8")
+    return RESPONSE_HEADER.pack(status, len(data)) + data
+
+
+def read_response(sock: socket.socket) -> Tuple[int, Any]:
+    """Read one response frame: (status, body)."""
+    status, length = RESPONSE_HEADER.unpack(recv_exactly(sock, RESPONSE_HEADER.size))
+    return status, json.loads(recv_exactly(sock, length))
+
+
+def _json_default(value):
+    """Serialize NumPy scalars that stores may return in results."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class IndexServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves a VectorStore to RemoteStore clients, one thread per connection."""
+    
+    daemon_threads = True
+    
+    def __init__(self, store: VectorStore, socket_path: str):
+        """
+        Bind the socket (replacing a stale socket file) and prepare to serve.
+        
+        Args:
+            store: Store all clients share
+            socket_path: Filesystem path of the Unix socket
+        
+        Raises:
+            OSError: If another server is already listening on socket_path
+        """
+        self.store = store
+        self.socket_path = socket_path
+        self.requests_served = 0
+        _remove_stale_socket(socket_path)
+        directory = os.path.dirname(os.path.abspath(socket_path))
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(socket_path, _Handler)
+        # Only the service's own user may talk to the index
+        os.chmod(socket_path, 0o600)
+        logger.info(f"Index server listening on {socket_path}")
+    
+    def dispatch(self, op: int, header: Dict, vectors: Optional[np.ndarray]) -> Any:
+        """
+        Run one operation against the store.
+        
+        Raises:
+            ValueError: If the operation is unknown or lacks its embeddings
+        """
+        store = self.store
+        if op == OP_PING:
+            return store.ping()
+        if op == OP_COUNT:
+            return store.count()
+        if op == OP_DIMENSION:
+            return store.dimension
+        if op == OP_STATS:
+            stats = getattr(store, "stats", None)
+            return stats() if callable(stats) else {}
+        if op == OP_COUNT_ALIASES:
+            return store.count_aliases(header["entry_id"])
+        if op == OP_FLUSH:
+            flush = getattr(store, "flush", None)
+            if callable(flush):
+                flush()
+            return None
+        if vectors is None:
+            raise ValueError(f"Operation {op} requires embeddings")
+        embeddings = vectors.tolist()
+        if op == OP_PUT:
+            return store.put(query=header["query"], embedding=embeddings[0], metadata=header.get("metadata"))
+        if op == OP_FIND:
+            return store.find(
+                embedding=embeddings[0],
+                threshold=header["threshold"],
+                top_k=header["top_k"],
+                record_hits=header.get("record_hits", True)
+            )
+        if op == OP_PUT_BATCH:
+            return store.put_batch(queries=header["queries"], embeddings=embeddings, metadatas=header.get("metadatas"))
+        if op == OP_FIND_BATCH:
+            return store.find_batch(embeddings=embeddings, threshold=header["threshold"], top_k=header["top_k"])
+        raise ValueError(f"Unknown index server operation: {op}")
+    
+    def server_close(self) -> None:
+        """Stop listening, remove the socket file and flush the store."""
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        close = getattr(self.store, "close", None)
+        if callable(close):
+            close()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Answers requests on one client connection until it closes."""
+    
+    def handle(self) -> None:
+        while True:
+            try:
+                op, header, vectors = read_request(self.request)
+            except ConnectionError:
+                return
+            try:
+                response = encode_response(STATUS_OK, self.server.dispatch(op, header, vectors))
+            except Exception as e:
+                logger.error(f"Index server operation {op} failed: {e}")
+                response = encode_response(STATUS_ERROR, {"type": type(e).__name__, "message": str(e)})
+            self.server.requests_served += 1
+            self.request.sendall(response)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Delete a socket file left by a dead server; refuse to steal a live one."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"An index server is already listening on {socket_path}")
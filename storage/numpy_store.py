@@ -0,0 +1,446 @@
+"""NumPy in-memory vector storage implementation."""
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+from storage.base import VectorStore
+from storage.quantization import QUANTIZATION_MODES, QuantizedIndex
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class NumpyStore(VectorStore):
+    """
+    Brute-force cosine store over one contiguous float32 matrix.
+    
+    Rows are L2-normalized on insert, so cosine similarity for every stored
+    vector is a single matrix-vector product. The matrix lives in a
+    memory-mapped ``.npy`` file with spare capacity for amortized appends;
+    ids, documents and metadata live in an append-only JSONL sidecar whose
+    line count is the number of committed rows. Writers serialize on a file
+    lock and readers pick up rows appended by other processes, so several
+    gunicorn workers can share one store directory.
+    
+    With ``quantization`` set to "int8" or "binary" the full scan runs over
+    compact in-memory codes instead of the float matrix, and only the best
+    ``rerank_candidates`` rows are rescored with exact float cosine. The float
+    matrix is then read only for those rows and need not stay resident.
+    """
+    
+    def __init__(
+        self,
+        collection_name: str,
+        persist_directory: str = "./numpy_store",
+        initial_capacity: int = 1024,
+        quantization: str = "none",
+        rerank_candidates: int = 256
+    ):
+        """
+        Initialize NumPy store and load any persisted rows.
+        
+        Args:
+            collection_name: Name of the collection (used for file names)
+            persist_directory: Directory holding the matrix and sidecar files
+            initial_capacity: Number of rows allocated when the matrix is created
+            quantization: "none" (exact float scan), "int8" or "binary" (code prefilter)
+            rerank_candidates: Rows rescored exactly per query in quantized modes
+        
+        Raises:
+            ValueError: If the quantization mode is unknown
+        """
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+        self.initial_capacity = initial_capacity
+        self.quantization = quantization
+        self.rerank_candidates = rerank_candidates
+        
+        os.makedirs(persist_directory, exist_ok=True)
+        self._matrix_path = os.path.join(persist_directory, f"{collection_name}.npy")
+        self._sidecar_path = os.path.join(persist_directory, f"{collection_name}.jsonl")
+        self._lock_path = os.path.join(persist_directory, f"{collection_name}.lock")
+        
+        self._matrix: Optional[np.memmap] = None
+        self._matrix_inode: Optional[int] = None
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict] = []
+        # Alias rows per canonical entry ID, maintained as rows are loaded
+        self._alias_counts: Dict[str, int] = {}
+        self._sidecar_offset = 0
+        self._index: Optional[QuantizedIndex] = None
+        self._lock = threading.RLock()
+        
+        with self._lock:
+            self._refresh()
+        logger.info(f"Loaded NumPy collection {collection_name} with {len(self._ids)} rows")
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        """Embedding dimension, or None until the first row is stored."""
+        return None if self._matrix is None else self._matrix.shape[1]
+    
+    def count(self) -> int:
+        """Return the number of stored rows."""
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
+    
+    def count_aliases(self, entry_id: str) -> Optional[int]:
+        """Count alias rows of an entry (see VectorStore.count_aliases)."""
+        with self._lock:
+            self._refresh()
+            return self._alias_counts.get(entry_id, 0)
+    
+    def iter_entries(self, batch_size: int = 1000, include_embeddings: bool = True) -> Iterator[Dict]:
+        """
+        Stream stored entries page by page (same page format as ChromaStore).
+        
+        Args:
+            batch_size: Number of rows per page
+            include_embeddings: Whether to include the (normalized) embedding vectors
+        
+        Yields:
+            Pages as dictionaries with ids, documents, metadatas (and embeddings)
+        """
+        count = self.count()
+        for start in range(0, count, batch_size):
+            end = min(start + batch_size, count)
+            with self._lock:
+                page = {
+                    "ids": self._ids[start:end],
+                    "documents": self._documents[start:end],
+                    "metadatas": self._metadatas[start:end]
+                }
+                if include_embeddings:
+                    page["embeddings"] = np.array(self._matrix[start:end])
+            yield page
+    
+    def _file_lock(self):
+        """Return a context manager holding the cross-process writer lock."""
+        return _FileLock(self._lock_path)
+    
+    def _open_matrix(self, force: bool = False) -> None:
+        """(Re)open the matrix file if another process replaced it (always, with force)."""
+        if not os.path.exists(self._matrix_path):
+            return
+        inode = os.stat(self._matrix_path).st_ino
+        if force or inode != self._matrix_inode:
+            self._matrix = np.lib.format.open_memmap(self._matrix_path, mode="r+")
+            self._matrix_inode = inode
+    
+    def _refresh(self) -> None:
+        """Load sidecar rows appended since the last refresh (by any process)."""
+        if not os.path.exists(self._sidecar_path):
+            self._open_matrix()
+            return
+        if os.path.getsize(self._sidecar_path) == self._sidecar_offset:
+            return
+        
+        # Sidecar first: writers replace a grown matrix before committing its
+        # rows, so a matrix opened after reading the lines holds all of them
+        with open(self._sidecar_path, "rb") as sidecar:
+            sidecar.seek(self._sidecar_offset)
+            for line in sidecar:
+                if not line.endswith(b"\n"):
+                    # Partially written line from a concurrent writer
+                    break
+                record = json.loads(line)
+                self._ids.append(record["id"])
+                self._documents.append(record["query"])
+                self._metadatas.append(record.get("metadata") or {})
+                alias_of = self._metadatas[-1].get("alias_of")
+                if alias_of is not None:
+                    self._alias_counts[alias_of] = self._alias_counts.get(alias_of, 0) + 1
+                self._sidecar_offset += len(line)
+        self._open_matrix()
+        if self._matrix is None or self._matrix.shape[0] < len(self._ids):
+            # Replaced again between the inode check and the open
+            self._open_matrix(force=True)
+            if self._matrix is None or self._matrix.shape[0] < len(self._ids):
+                raise RuntimeError(f"Matrix {self._matrix_path} holds fewer rows than its sidecar")
+        self._sync_index()
+    
+    def _sync_index(self, chunk_rows: int = 65536) -> None:
+        """Encode rows committed since the last refresh into the quantized index."""
+        if self.quantization == "none" or self._matrix is None:
+            return
+        if self._index is None:
+            self._index = QuantizedIndex(self.quantization, self._matrix.shape[1], self.initial_capacity)
+        count = len(self._ids)
+        for start in range(self._index.count, count, chunk_rows):
+            self._index.append(np.asarray(self._matrix[start:min(start + chunk_rows, count)]))
+    
+    def _ensure_capacity(self, rows: int, dimension: int) -> None:
+        """Grow the matrix file so it can hold at least ``rows`` rows."""
+        if self._matrix is not None:
+            if self._matrix.shape[1] != dimension:
+                raise ValueError(
+                    f"Embedding dimension {dimension} does not match store dimension {self._matrix.shape[1]}"
+                )
+            if self._matrix.shape[0] >= rows:
+                return
+        
+        capacity = max(self.initial_capacity, rows)
+        if self._matrix is not None:
+            capacity = max(capacity, self._matrix.shape[0] * 2)
+        
+        tmp_path = f"{self._matrix_path}.tmp"
+        grown = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(capacity, dimension)
+        )
+        count = len(self._ids)
+        if self._matrix is not None and count:
+            grown[:count] = self._matrix[:count]
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self._matrix_path)
+        self._open_matrix()
+        logger.info(f"Grew NumPy store matrix to {capacity} rows")
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows (zero rows stay zero)."""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def ping(self) -> bool:
+        """
+        Check if the store files are accessible.
+        
+        Returns:
+            True if the store is accessible, False otherwise
+        
+        Raises:
+            Exception: If the store cannot be read
+        """
+        try:
+            self.count()
+            logger.info("NumPy store ping successful")
+            return True
+        except Exception as e:
+            logger.error(f"NumPy store ping failed: {e}")
+            raise
+    
+    def put(
+        self,
+        query: str,
+        embedding: List[float],
+        metadata: Optional[Dict] = None
+    ) -> str:
+        """
+        Store embedding with metadata.
+        
+        Args:
+            query: User query text
+            embedding: Embedding vector
+            metadata: Additional metadata dictionary
+        
+        Returns:
+            Generated embedding ID
+        """
+        return self.put_batch([query], [embedding], [metadata])[0]
+    
+    def put_batch(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Optional[Dict]]] = None
+    ) -> List[str]:
+        """
+        Store several embeddings under one lock with a single sidecar append.
+        
+        Args:
+            queries: User query texts
+            embeddings: Embedding vectors, one per query
+            metadatas: Optional metadata dictionaries, one per query
+        
+        Returns:
+            Generated embedding IDs in input order
+        """
+        if not queries:
+            return []
+        timestamp = datetime.utcnow().isoformat()
+        embedding_ids = [str(uuid.uuid4()) for _ in queries]
+        lines = b"".join(
+            json.dumps({
+                "id": embedding_id,
+                "query": query,
+                "metadata": {"timestamp": timestamp, **(metadata or {})}
+            }).encode("utf-8") + b"\n"
+            for embedding_id, query, metadata in zip(
+                embedding_ids, queries, metadatas or [None] * len(queries)
+            )
+        )
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(queries), -1))
+        
+        try:
+            with self._lock, self._file_lock():
+                self._refresh()
+                start = len(self._ids)
+                self._ensure_capacity(start + len(queries), vectors.shape[1])
+                self._matrix[start:start + len(queries)] = vectors
+                
+                # The sidecar lines commit the rows; readers never look past them
+                with open(self._sidecar_path, "ab") as sidecar:
+                    sidecar.write(lines)
+                self._refresh()
+            logger.info(f"Stored {len(embedding_ids)} embeddings")
+            return embedding_ids
+        except Exception as e:
+            logger.error(f"Failed to store embedding: {e}")
+            raise
+    
+    def find(
+        self,
+        embedding: List[float],
+        threshold: float = 0.85,
+        top_k: int = 10,
+        record_hits: bool = True
+    ) -> List[Dict]:
+        """
+        Find similar embeddings above threshold.
+        
+        Args:
+            embedding: Query embedding vector
+            threshold: Minimum similarity threshold (0.0-1.0)
+            top_k: Maximum number of results to return
+            record_hits: Count returned rows as hits for eviction (this store keeps no hit counts)
+        
+        Returns:
+            List of dictionaries with id, distance, query, similarity, metadata
+        """
+        return self.find_batch([embedding], threshold=threshold, top_k=top_k)[0]
+    
+    def find_batch(
+        self,
+        embeddings: List[List[float]],
+        threshold: float = 0.85,
+        top_k: int = 10
+    ) -> List[List[Dict]]:
+        """
+        Find similar embeddings for several vectors with one matrix product.
+        
+        Args:
+            embeddings: Query embedding vectors
+            threshold: Minimum similarity threshold (0.0-1.0)
+            top_k: Maximum number of results per query vector
+        
+        Returns:
+            One result list (as returned by find) per query vector
+        """
+        try:
+            with self._lock:
+                self._refresh()
+                count = len(self._ids)
+                if count == 0 or top_k <= 0 or not embeddings:
+                    return [[] for _ in embeddings]
+                
+                query_vectors = self._normalize(
+                    np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+                )
+                if self._index is not None and count > self.rerank_candidates:
+                    return self._find_quantized(query_vectors, count, threshold, top_k)
+                
+                similarities = query_vectors @ self._matrix[:count].T
+                
+                k = min(top_k, count)
+                if k < count:
+                    candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+                else:
+                    candidates = np.broadcast_to(np.arange(count), (len(embeddings), count))
+                
+                return [
+                    self._collect(row_similarities, row_candidates, threshold)
+                    for row_similarities, row_candidates in zip(similarities, candidates)
+                ]
+        except Exception as e:
+            logger.error(f"Failed to find similar embeddings: {e}")
+            return [[] for _ in embeddings]
+    
+    def _find_quantized(
+        self,
+        query_vectors: np.ndarray,
+        count: int,
+        threshold: float,
+        top_k: int
+    ) -> List[List[Dict]]:
+        """Prefilter rows with the quantized index, then rescore candidates exactly."""
+        candidates = self._index.candidates(query_vectors, self.rerank_candidates, limit=count)
+        batch_items = []
+        for query_vector, row_candidates in zip(query_vectors, candidates):
+            # Sorted indices turn the memmap gather into forward reads
+            row_candidates = np.sort(row_candidates)
+            similarities = self._matrix[row_candidates] @ query_vector
+            best = np.argsort(-similarities)[:top_k]
+            batch_items.append(self._collect_ranked(row_candidates[best], similarities[best], threshold))
+        return batch_items
+    
+    def _collect(self, similarities: np.ndarray, candidates: np.ndarray, threshold: float) -> List[Dict]:
+        """Build result items for top-k candidates, best first, above threshold."""
+        candidates = candidates[np.argsort(-similarities[candidates])]
+        return self._collect_ranked(candidates, similarities[candidates], threshold)
+    
+    def _collect_ranked(self, rows: np.ndarray, similarities: np.ndarray, threshold: float) -> List[Dict]:
+        """Build result items for rows already sorted by descending similarity."""
+        similar_items = []
+        for index, similarity in zip(rows, similarities):
+            similarity = float(similarity)
+            if similarity < threshold:
+                break
+            similar_items.append({
+                "id": self._ids[index],
+                "similarity": similarity,
+                "distance": 1.0 - similarity,
+                "query": self._documents[index],
+                "metadata": self._metadatas[index]
+            })
+        return similar_items
+    
+    def stats(self) -> Dict:
+        """Return row count and memory used by the matrix and the quantized index."""
+        with self._lock:
+            count = len(self._ids)
+            return {
+                "rows": count,
+                "quantization": self.quantization,
+                "matrix_bytes": count * (self.dimension or 0) * 4,
+                "index_bytes": self._index.nbytes if self._index is not None else 0
+            }
+    
+    def close(self) -> None:
+        """Flush the memory-mapped matrix to disk."""
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+
+
+class _FileLock:
+    """Exclusive advisory lock on a file, used to serialize writers across processes."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = None
+    
+    def __enter__(self):
+        self._handle = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._handle, fcntl.LOCK_EX)
+        return self
+    
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._handle, fcntl.LOCK_UN)
+        self._handle.close()
+        self._handle = None
@@ -0,0 +1,134 @@
+"""Compact embedding codes used to prefilter candidates before exact rescoring."""
+from typing import Optional
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:  # pragma: no cover - numpy < 2.0
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    
+    def _popcount(codes: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[codes]
+
+
+def pack_signs(vectors: np.ndarray) -> np.ndarray:
+    """Encode each row as 1-bit signs packed into uint8 (d/8 bytes per row)."""
+    return np.packbits(vectors > 0, axis=-1)
+
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """Scalar-quantize L2-normalized rows (components in [-1, 1]) to int8."""
+    return np.clip(np.rint(vectors * 127.0), -127, 127).astype(np.int8)
+
+
+def hamming_distances(codes: np.ndarray, query_codes: np.ndarray) -> np.ndarray:
+    """
+    Hamming distance between every query code and every stored code.
+    
+    Args:
+        codes: Packed sign codes, shape (rows, bytes)
+        query_codes: Packed sign codes, shape (queries, bytes)
+    
+    Returns:
+        Distances with shape (queries, rows)
+    """
+    distances = np.empty((len(query_codes), len(codes)), dtype=np.uint16)
+    for i, query_code in enumerate(query_codes):
+        distances[i] = _popcount(np.bitwise_xor(codes, query_code)).sum(axis=1, dtype=np.uint16)
+    return distances
+
+
+class QuantizedIndex:
+    """
+    Growable in-memory array of int8 or binary codes, one per stored row.
+    
+    Codes are a compact stand-in for the float32 matrix: searching them picks
+    a short list of candidates, and only those rows are read back from the
+    full-precision matrix to compute exact cosine similarities. A binary code
+    takes 1/32 and an int8 code 1/4 of the memory of a float32 row.
+    """
+    
+    chunk_rows = 65536
+    # int8 codes are widened to float32 for BLAS; 4096 x 768 floats is 12 MB
+    int8_chunk_rows = 4096
+    
+    def __init__(self, mode: str, dimension: int, initial_capacity: int = 1024):
+        """
+        Initialize an empty index.
+        
+        Args:
+            mode: "int8" or "binary"
+            dimension: Embedding dimension
+            initial_capacity: Number of rows allocated up front
+        
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.mode = mode
+        self.dimension = dimension
+        width = (dimension + 7) // 8 if mode == "binary" else dimension
+        dtype = np.uint8 if mode == "binary" else np.int8
+        self._codes = np.zeros((max(initial_capacity, 1), width), dtype=dtype)
+        self.count = 0
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the codes of the stored rows."""
+        return self.count * self._codes.shape[1] * self._codes.itemsize
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode L2-normalized float rows with this index's quantizer."""
+        return pack_signs(vectors) if self.mode == "binary" else quantize_int8(vectors)
+    
+    def append(self, vectors: np.ndarray) -> None:
+        """Encode and append L2-normalized float rows."""
+        if not len(vectors):
+            return
+        needed = self.count + len(vectors)
+        if needed > len(self._codes):
+            grown = np.zeros((max(needed, len(self._codes) * 2), self._codes.shape[1]), dtype=self._codes.dtype)
+            grown[:self.count] = self._codes[:self.count]
+            self._codes = grown
+        self._codes[self.count:needed] = self.encode(vectors)
+        self.count = needed
+    
+    def candidates(self, query_vectors: np.ndarray, k: int, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Return the indices of the ``k`` most similar rows for each query.
+        
+        Args:
+            query_vectors: L2-normalized float query rows
+            k: Candidates per query (must be smaller than the row count)
+            limit: Only consider the first ``limit`` rows (defaults to all)
+        
+        Returns:
+            Candidate row indices with shape (queries, k), in no particular order
+        """
+        count = self.count if limit is None else min(limit, self.count)
+        if self.mode == "binary":
+            query_codes = pack_signs(query_vectors)
+            scores = np.empty((len(query_vectors), count), dtype=np.uint16)
+            chunk_rows = self.chunk_rows
+        else:
+            query_codes = quantize_int8(query_vectors).astype(np.float32)
+            scores = np.empty((len(query_vectors), count), dtype=np.float32)
+            chunk_rows = self.int8_chunk_rows
+            # One reused float32 buffer instead of a fresh widened copy per chunk
+            widened = np.empty((min(chunk_rows, count), self._codes.shape[1]), dtype=np.float32)
+        
+        # Score in chunks so temporaries stay small next to the codes themselves
+        for start in range(0, count, chunk_rows):
+            codes = self._codes[start:min(start + chunk_rows, count)]
+            if self.mode == "binary":
+                scores[:, start:start + len(codes)] = hamming_distances(codes, query_codes)
+            else:
+                block = widened[:len(codes)]
+                block[...] = codes
+                # Negated so that, as with Hamming distance, lower is more similar
+                np.matmul(query_codes, block.T, out=scores[:, start:start + len(codes)])
+                np.negative(scores[:, start:start + len(codes)], out=scores[:, start:start + len(codes)])
+        return np.argpartition(scores, k - 1, axis=1)[:, :k]
@@ -0,0 +1,187 @@
+"""Vector store client of the shared index server."""
+import logging
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+from storage.base import VectorStore
+from storage.index_server import (
+    OP_COUNT, OP_COUNT_ALIASES, OP_DIMENSION, OP_FIND, OP_FIND_BATCH, OP_FLUSH, OP_PING, OP_PUT, OP_PUT_BATCH,
+    OP_STATS,
+    STATUS_OK, encode_request, read_response
+)
+
+logger = logging.getLogger(__name__)
+
+# Reads are retried once on a fresh connection (e.g. after a server restart);
+# writes are not, since the first attempt may already have been applied
+_RETRIED_OPS = {OP_PING, OP_FIND, OP_FIND_BATCH, OP_COUNT, OP_COUNT_ALIASES, OP_DIMENSION, OP_STATS}
+
+
+class RemoteStore(VectorStore):
+    """
+    VectorStore backed by an IndexServer over a Unix socket.
+    
+    Each thread keeps its own persistent connection, so concurrent requests
+    of one worker never wait on each other's round trips. Eviction listeners
+    are not forwarded: the index server deletes evicted rows from the shared
+    lexical index log instead (see Container.log_lexical_evictions), so
+    workers need LEXICAL_INDEX_PATH set to drop their variants.
+    """
+    
+    def __init__(self, socket_path: str, timeout: Optional[float] = 10.0):
+        """
+        Initialize client (connections are opened on first use).
+        
+        Args:
+            socket_path: Path of the index server's Unix socket
+            timeout: Seconds to wait for a response (None waits indefinitely)
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sockets: List[socket.socket] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        """Embedding dimension of the shared store, or None while it is empty."""
+        return self._call(OP_DIMENSION)
+    
+    def count(self) -> int:
+        """Return the number of rows in the shared store."""
+        return self._call(OP_COUNT)
+    
+    def count_aliases(self, entry_id: str) -> Optional[int]:
+        """Count alias rows of an entry in the shared store (see VectorStore.count_aliases)."""
+        return self._call(OP_COUNT_ALIASES, {"entry_id": entry_id})
+    
+    def ping(self) -> bool:
+        """
+        Check that the index server and its store are healthy.
+        
+        Returns:
+            True if the store is accessible
+        
+        Raises:
+            Exception: If the server cannot be reached or its store fails
+        """
+        try:
+            result = self._call(OP_PING)
+            logger.info(f"Index server at {self.socket_path} is reachable")
+            return result
+        except Exception as e:
+            logger.error(f"Index server ping failed: {e}")
+            raise
+    
+    def put(
+        self,
+        query: str,
+        embedding: List[float],
+        metadata: Optional[Dict] = None
+    ) -> str:
+        """Store embedding with metadata in the shared store (see VectorStore.put)."""
+        return self._call(OP_PUT, {"query": query, "metadata": metadata}, [embedding])
+    
+    def find(
+        self,
+        embedding: List[float],
+        threshold: float = 0.85,
+        top_k: int = 10,
+        record_hits: bool = True
+    ) -> List[Dict]:
+        """Find similar embeddings in the shared store (see VectorStore.find)."""
+        return self._call(
+            OP_FIND, {"threshold": threshold, "top_k": top_k, "record_hits": record_hits}, [embedding]
+        )
+    
+    def put_batch(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Optional[Dict]]] = None
+    ) -> List[str]:
+        """Store several embeddings in one round trip (see VectorStore.put_batch)."""
+        if not queries:
+            return []
+        return self._call(OP_PUT_BATCH, {"queries": queries, "metadatas": metadatas}, embeddings)
+    
+    def find_batch(
+        self,
+        embeddings: List[List[float]],
+        threshold: float = 0.85,
+        top_k: int = 10
+    ) -> List[List[Dict]]:
+        """Search for several vectors in one round trip (see VectorStore.find_batch)."""
+        if not embeddings:
+            return []
+        return self._call(OP_FIND_BATCH, {"threshold": threshold, "top_k": top_k}, embeddings)
+    
+    def stats(self) -> Dict:
+        """Return the stats of the store behind the server."""
+        return self._call(OP_STATS)
+    
+    def flush(self) -> None:
+        """Block until the server's store has applied buffered writes."""
+        self._call(OP_FLUSH)
+    
+    def close(self) -> None:
+        """Close every connection opened by this client."""
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            sock.close()
+    
+    def _connection(self) -> socket.socket:
+        """Return this thread's connection, opening it if needed."""
+        sock = getattr(self._local, "socket", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.socket = sock
+            with self._lock:
+                self._sockets.append(sock)
+        return sock
+    
+    def _disconnect(self) -> None:
+        """Drop this thread's connection (its stream may hold a partial frame)."""
+        sock = getattr(self._local, "socket", None)
+        if sock is None:
+            return
+        self._local.socket = None
+        with self._lock:
+            if sock in self._sockets:
+                self._sockets.remove(sock)
+        sock.close()
+    
+    def _call(self, op: int, header: Optional[Dict] = None, vectors: Optional[List[List[float]]] = None) -> Any:
+        """
+        Send one request and return the result.
+        
+        Raises:
+            ValueError: If the server rejected the request as invalid
+            RuntimeError: If the operation failed on the server
+            OSError: If the server cannot be reached
+        """
+        request = encode_request(op, header, vectors)
+        attempts = 2 if op in _RETRIED_OPS else 1
+        for attempt in range(attempts):
+            try:
+                sock = self._connection()
+                sock.sendall(request)
+                status, body = read_response(sock)
+                break
+            except OSError:
+                self._disconnect()
+                if attempt == attempts - 1:
+                    raise
+        if status == STATUS_OK:
+            return body
+        message = f"Index server {body['type']}: {body['message']}"
+        if body["type"] in ("ValueError", "KeyError"):
+            raise ValueError(message)
+        raise RuntimeError(message)
@@ -0,0 +1,196 @@
+"""Write-behind buffer that batches vector-store inserts in the background."""
+import logging
+import threading
+from typing import Callable, Dict, List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Bounded buffer of pending rows flushed in bulk by a background thread.
+    
+    Rows stay visible to find() until the flush that wrote them has finished,
+    so callers keep read-your-writes semantics while inserts are deferred.
+    add() blocks while the buffer is full, which pushes back on writers when
+    the backing store cannot keep up. A batch that fails max_attempts flushes
+    in a row is dropped; stats() counts the lost rows and the next flush(),
+    and close(), raise instead of returning as if everything was written.
+    """
+    
+    def __init__(
+        self,
+        flush_func: Callable[[List[Dict]], None],
+        max_batch_size: int = 256,
+        flush_interval_ms: float = 50.0,
+        max_pending: int = 10000,
+        max_attempts: int = 3
+    ):
+        """
+        Initialize write-behind buffer and start its flusher thread.
+        
+        Args:
+            flush_func: Called with a list of rows (id, embedding, document, metadata) to persist
+            max_batch_size: Maximum rows written per flush; reaching it triggers a flush
+            flush_interval_ms: Maximum time a row waits before being flushed
+            max_pending: Maximum buffered rows before add() blocks
+            max_attempts: Flush attempts for a batch before it is dropped
+        """
+        self.flush_func = flush_func
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max(max_pending, max_batch_size)
+        self.max_attempts = max_attempts
+        self.flushed = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self._unreported_drops = 0
+        self._pending: List[Dict] = []
+        self._flushing = 0
+        self._attempts = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+    
+    def add(self, rows: List[Dict]) -> None:
+        """
+        Queue rows for insertion, blocking while the buffer is full.
+        
+        Args:
+            rows: Row dictionaries with id, embedding, document and metadata
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind buffer is closed")
+            while len(self._pending) + len(rows) > self.max_pending and self._pending:
+                self._cond.wait()
+            self._pending.extend(rows)
+            if len(self._pending) - self._flushing >= self.max_batch_size:
+                self._cond.notify_all()
+    
+    def pending(self) -> List[Dict]:
+        """Return a snapshot of rows not yet confirmed as written."""
+        with self._cond:
+            return list(self._pending)
+    
+    def find(self, embedding: List[float], threshold: float, top_k: int) -> List[Dict]:
+        """
+        Brute-force cosine search over pending rows.
+        
+        Args:
+            embedding: Query embedding vector
+            threshold: Minimum similarity threshold
+            top_k: Maximum number of results
+        
+        Returns:
+            Result dictionaries in the same shape as VectorStore.find
+        """
+        rows = self.pending()
+        if not rows:
+            return []
+        matrix = np.asarray([row["embedding"] for row in rows], dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        norms[norms == 0] = 1.0
+        similarities = matrix @ query / norms
+        
+        results = []
+        for index in np.argsort(-similarities)[:top_k]:
+            similarity = float(similarities[index])
+            if similarity < threshold:
+                break
+            row = rows[index]
+            results.append({
+                "id": row["id"],
+                "similarity": similarity,
+                "distance": 1.0 - similarity,
+                "query": row["document"],
+                "metadata": row["metadata"]
+            })
+        return results
+    
+    def _run(self) -> None:
+        """Flusher loop: write batches when full, on the interval, and on close."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.max_batch_size,
+                    timeout=self.flush_interval
+                )
+                if not self._pending:
+                    if self._closed:
+                        return
+                    continue
+                batch = self._pending[:self.max_batch_size]
+                self._flushing = len(batch)
+            
+            try:
+                self.flush_func(batch)
+                succeeded = True
+            except Exception as e:
+                succeeded = False
+                logger.error(f"Write-behind flush of {len(batch)} rows failed: {e}")
+            
+            with self._cond:
+                self._flushing = 0
+                if succeeded:
+                    self.flushed += len(batch)
+                    self._attempts = 0
+                    del self._pending[:len(batch)]
+                else:
+                    self.failed_flushes += 1
+                    self._attempts += 1
+                    if self._attempts >= self.max_attempts:
+                        logger.error(f"Dropping {len(batch)} rows after {self._attempts} failed flushes")
+                        self.dropped += len(batch)
+                        self._unreported_drops += len(batch)
+                        self._attempts = 0
+                        del self._pending[:len(batch)]
+                self._cond.notify_all()
+            if not succeeded and not self._closed:
+                # Back off before retrying the same batch
+                with self._cond:
+                    self._cond.wait(timeout=self.flush_interval)
+    
+    def flush(self) -> None:
+        """
+        Block until every row queued so far has been written (or dropped).
+        
+        Raises:
+            RuntimeError: If rows were dropped since the previous flush()
+        """
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending:
+                self._cond.wait(timeout=self.flush_interval)
+            lost, self._unreported_drops = self._unreported_drops, 0
+        if lost:
+            raise RuntimeError(f"Write-behind buffer dropped {lost} rows after {self.max_attempts} failed flushes")
+    
+    def close(self) -> None:
+        """
+        Flush remaining rows and stop the flusher thread.
+        
+        Raises:
+            RuntimeError: If the buffer dropped any rows during its lifetime
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self.dropped:
+            raise RuntimeError(f"Write-behind buffer dropped {self.dropped} rows in total after failed flushes")
+    
+    def stats(self) -> Dict:
+        """Return buffer counters."""
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "failed_flushes": self.failed_flushes
+            }
@@ -0,0 +1,112 @@
+"""Tests for the micro-batching embedding provider."""
+import asyncio
+import threading
+import time
+import pytest
+from providers.base import EmbeddingProvider
+from providers.batching_provider import BatchingEmbeddingProvider
+from providers.caching_provider import CachingEmbeddingProvider
+
+
+class RecordingProvider(EmbeddingProvider):
+    """Records the size of every batched call."""
+    
+    def __init__(self, fail=False, drop=0):
+        self.batch_sizes = []
+        self.fail = fail
+        self.drop = drop
+    
+    def create(self, text):
+        return self.create_batch([text])[0]
+    
+    def create_batch(self, texts):
+        self.batch_sizes.append(len(texts))
+        if self.fail:
+            raise RuntimeError("backend down")
+        return [[float(len(text))] for text in texts][self.drop:]
+    
+    def ping(self):
+        return True
+
+
+def test_concurrent_calls_share_a_batch():
+    """Test concurrent create() calls are merged into one batched request."""
+    inner = RecordingProvider()
+    provider = BatchingEmbeddingProvider(inner, max_batch_size=8, max_wait_ms=200)
+    results = {}
+    threads = [
+        threading.Thread(target=lambda i=i: results.__setitem__(i, provider.create("x" * i)))
+        for i in range(1, 9)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    provider.close()
+    
+    assert results == {i: [float(i)] for i in range(1, 9)}
+    assert inner.batch_sizes == [8]
+
+
+def test_cache_misses_are_batched_on_the_async_path(tmp_path):
+    """Test concurrent acreate() misses through the cache still share one batched request."""
+    inner = RecordingProvider()
+    batcher = BatchingEmbeddingProvider(inner, max_batch_size=32, max_wait_ms=200)
+    provider = CachingEmbeddingProvider(batcher, model="m1", cache_path=str(tmp_path / "cache.sqlite3"))
+    
+    async def run():
+        return await asyncio.gather(*(provider.acreate("x" * i) for i in range(1, 21)))
+    
+    assert asyncio.run(run()) == [[float(i)] for i in range(1, 21)]
+    assert asyncio.run(provider.acreate("x")) == [1.0]
+    batcher.close()
+    
+    assert inner.batch_sizes == [20]
+
+
+def test_isolated_request_waits_at_most_the_window():
+    """Test a lone request is dispatched once the window elapses."""
+    inner = RecordingProvider()
+    provider = BatchingEmbeddingProvider(inner, max_batch_size=8, max_wait_ms=20)
+    
+    start = time.monotonic()
+    assert provider.create("abc") == [3.0]
+    elapsed = time.monotonic() - start
+    provider.close()
+    
+    assert elapsed < 0.5
+    assert inner.batch_sizes == [1]
+
+
+def test_errors_reach_every_caller():
+    """Test a failed batch raises in the waiting callers."""
+    provider = BatchingEmbeddingProvider(RecordingProvider(fail=True), max_wait_ms=1)
+    
+    with pytest.raises(RuntimeError):
+        provider.create("abc")
+    provider.close()
+
+
+def test_short_batch_fails_every_caller():
+    """Test a provider returning too few vectors fails the batch instead of leaving callers waiting."""
+    provider = BatchingEmbeddingProvider(RecordingProvider(drop=1), max_wait_ms=50, timeout=5)
+    errors = []
+    
+    def embed(text):
+        try:
+            provider.create(text)
+        except ValueError as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=embed, args=(text,)) for text in ("a", "bb", "ccc")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    
+    assert len(errors) == 3
+    provider.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
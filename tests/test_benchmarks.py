@@ -0,0 +1,62 @@
+"""Tests for the benchmark fakes, workload and open-loop generator."""
+import asyncio
+import numpy as np
+import pytest
+from benchmarks.compare import flatten
+from benchmarks.fakes import FakeEmbeddingProvider, FakeQueryTransformer, LatencyModel
+from benchmarks.load import run_open_loop
+from benchmarks.workload import ZipfWorkload
+
+
+def test_latency_model_specs():
+    """Test each latency spec samples in range and malformed specs are rejected."""
+    assert LatencyModel("constant:20").sample() == 0.02
+    first = [LatencyModel("lognormal:100:0.5", seed=3).sample() for _ in range(2)]
+    assert first[0] == first[1] and first[0] > 0
+    assert all(0.01 <= LatencyModel("uniform:10:20").sample() <= 0.02 for _ in range(20))
+    for spec in ("gamma:1:2", "uniform:10", "constant:fast"):
+        with pytest.raises(ValueError):
+            LatencyModel(spec)
+
+
+def test_fakes_are_deterministic_and_paraphrases_normalize_alike():
+    """Test seeded fakes repeat exactly and a paraphrase normalizes like its intent."""
+    workload = ZipfWorkload(intents=50, paraphrase_rate=1.0, seed=7)
+    assert ZipfWorkload(intents=50, paraphrase_rate=1.0, seed=7).queries(100) == workload.queries(100)
+    
+    provider = FakeEmbeddingProvider(dimension=64, seed=1)
+    transformer = FakeQueryTransformer()
+    canonical = workload.intents[0]
+    paraphrase = workload.paraphrase(canonical)
+    assert provider.create(canonical) == FakeEmbeddingProvider(dimension=64, seed=1).create(canonical)
+    assert transformer.transform(paraphrase) == transformer.transform(canonical)
+    assert transformer.calls == 2
+    similarity = np.dot(provider.create(canonical), provider.create(workload.intents[1]))
+    assert similarity < 0.5
+
+
+def test_zipf_workload_is_skewed():
+    """Test the most popular intent is drawn far more often than a mid-ranked one."""
+    workload = ZipfWorkload(intents=100, exponent=1.2, paraphrase_rate=0.0)
+    queries = workload.queries(2000)
+    assert queries.count(workload.intents[0]) > 10 * max(queries.count(workload.intents[50]), 1)
+
+
+def test_open_loop_measures_from_scheduled_arrival():
+    """Test open-loop latencies include the send time and errors are reported by type."""
+    async def send(query):
+        await asyncio.sleep(0.01)
+        if query == "fail":
+            raise RuntimeError(query)
+        return "stored"
+    
+    results, wall_seconds = asyncio.run(run_open_loop(send, ["a", "b", "fail", "c"], rate=200.0))
+    assert [path for _, path in results] == ["stored", "stored", "error:RuntimeError", "stored"]
+    assert all(latency >= 0.01 for latency, _ in results)
+    assert wall_seconds >= 0.01
+
+
+def test_compare_flattens_comparable_numbers():
+    """Test flatten keys nested results by path and drops counts."""
+    results = {"throughput_rps": 10.0, "requests": 5, "sizes": [{"size": 1000, "find": {"p50_ms": 1.5, "count": 9}}]}
+    assert dict(flatten(results)) == {"throughput_rps": 10.0, "sizes[size=1000].find.p50_ms": 1.5}
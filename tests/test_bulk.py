@@ -0,0 +1,84 @@
+"""Tests for the bulk import, export and restore CLI."""
+import json
+import pytest
+from benchmarks.fakes import FakeEmbeddingProvider, FakeQueryTransformer
+from cli.bulk import export_snapshot, import_queries, read_queries, restore_snapshot
+from services.lexical_index import LexicalIndex
+from storage.numpy_store import NumpyStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NumpyStore(collection_name="source", persist_directory=str(tmp_path / "source"))
+
+
+def test_import_normalizes_and_skips_known_queries(tmp_path, store):
+    """Test repeats, paraphrases and already stored queries are not inserted."""
+    path = tmp_path / "queries.jsonl"
+    lines = [{"query": "Lakers score?"}, "lakers score", {"query": "Lakers score?"}, {"query": "jokic stats tonight"}, {}]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n")
+    provider = FakeEmbeddingProvider(dimension=64, seed=1)
+    transformer = FakeQueryTransformer()
+    
+    counts = import_queries(
+        read_queries(str(path)), provider, store, query_transformer=transformer, batch_size=2, concurrency=2
+    )
+    assert counts == {"read": 4, "repeated": 2, "existing": 0, "inserted": 2}
+    documents = [document for page in store.iter_entries() for document in page["documents"]]
+    assert documents == [transformer.transform("Lakers score?"), transformer.transform("jokic stats tonight")]
+    
+    again = import_queries(read_queries(str(path)), provider, store, query_transformer=transformer)
+    assert again["existing"] == 2 and again["inserted"] == 0
+
+
+def test_snapshot_round_trip_remaps_aliases(tmp_path, store):
+    """Test a restored snapshot keeps vectors and metadata and points aliases at the new ids."""
+    entry_id = store.put("lakers score", [1.0, 0.0, 0.0], {"hits": 3})
+    store.put("lakers score", [0.8, 0.6, 0.0], {"alias_of": entry_id})
+    store.put("weather", [0.0, 0.0, 1.0])
+    snapshot = str(tmp_path / "snapshot")
+    assert export_snapshot(store, snapshot, model="stub", batch_size=2) == 3
+    
+    target = NumpyStore(collection_name="target", persist_directory=str(tmp_path / "target"))
+    with pytest.raises(ValueError):
+        restore_snapshot(target, snapshot, model="other")
+    counts = restore_snapshot(target, snapshot, model="stub", batch_size=2)
+    assert counts == {"entries": 2, "aliases": 1, "orphaned_aliases": 0}
+    
+    alias = target.find([0.8, 0.6, 0.0], threshold=0.99)[0]
+    entry = target.find([1.0, 0.0, 0.0], threshold=0.99)[0]
+    assert alias["metadata"]["alias_of"] == entry["id"] != entry_id
+    assert entry["metadata"]["hits"] == 3
+
+
+def test_imported_and_restored_entries_reach_the_lexical_log(tmp_path, store):
+    """Test bulk rows are appended to the shared lexical log that workers tail."""
+    log_path = str(tmp_path / "lexical.log")
+    worker = LexicalIndex(path=log_path)
+    provider = FakeEmbeddingProvider(dimension=64, seed=1)
+    
+    counts = import_queries(
+        ["jokic stats tonight"], provider, store, lexical_index=LexicalIndex(path=log_path)
+    )
+    assert counts["inserted"] == 1
+    assert worker.find("tonight, Jokic's stats") == "jokic stats tonight"
+    
+    snapshot = str(tmp_path / "snapshot")
+    export_snapshot(store, snapshot, model="stub")
+    target = NumpyStore(collection_name="target", persist_directory=str(tmp_path / "target"))
+    restored_log = str(tmp_path / "restored.log")
+    restore_snapshot(target, snapshot, lexical_index=LexicalIndex(path=restored_log))
+    assert LexicalIndex(path=restored_log).find("Jokic stats tonight!") == "jokic stats tonight"
+
+
+def test_csv_input_needs_the_query_column(tmp_path):
+    """Test CSV rows are read from the named column and a missing column is an error."""
+    path = tmp_path / "queries.csv"
+    path.write_text("text,count\nlakers score,3\n")
+    assert list(read_queries(str(path), field="text")) == ["lakers score"]
+    with pytest.raises(ValueError):
+        list(read_queries(str(path)))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+"""Tests for the caching embedding provider."""
+import asyncio
+import threading
+import pytest
+from providers.base import EmbeddingProvider
+from providers.caching_provider import CachingEmbeddingProvider
+
+
+class CountingProvider(EmbeddingProvider):
+    """Returns a model-specific constant vector and counts calls."""
+    
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+    
+    def create(self, text):
+        self.calls += 1
+        return [self.value, float(len(text))]
+    
+    def ping(self):
+        return True
+
+
+def test_memory_tier_memoizes(tmp_path):
+    """Test repeated texts are embedded once."""
+    inner = CountingProvider(1.0)
+    provider = CachingEmbeddingProvider(inner, model="m1", cache_path=str(tmp_path / "cache.sqlite3"))
+    
+    assert provider.create("hello") == provider.create("hello")
+    assert inner.calls == 1
+    assert provider.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test vectors persisted by one instance are served to a new one."""
+    path = str(tmp_path / "cache.sqlite3")
+    CachingEmbeddingProvider(CountingProvider(1.0), model="m1", cache_path=path).create("hello")
+    
+    inner = CountingProvider(1.0)
+    provider = CachingEmbeddingProvider(inner, model="m1", cache_path=path)
+    
+    assert provider.create("hello") == [1.0, 5.0]
+    assert inner.calls == 0
+    assert provider.stats()["disk_hits"] == 1
+
+
+def test_async_disk_lookups_run_off_the_event_loop(tmp_path):
+    """Test acreate_batch reads the persistent tier in a worker thread."""
+    path = str(tmp_path / "cache.sqlite3")
+    CachingEmbeddingProvider(CountingProvider(1.0), model="m1", cache_path=path).create("hello")
+    
+    inner = CountingProvider(1.0)
+    provider = CachingEmbeddingProvider(inner, model="m1", cache_path=path)
+    threads = []
+    load = provider._load
+    provider._load = lambda text_hash: threads.append(threading.get_ident()) or load(text_hash)
+    
+    assert asyncio.run(provider.acreate_batch(["hello", "world", "hello"])) == [[1.0, 5.0], [1.0, 5.0], [1.0, 5.0]]
+    assert inner.calls == 1 and provider.stats()["disk_hits"] == 1
+    assert threads and threading.get_ident() not in threads
+
+
+def test_model_change_never_serves_stale_vectors(tmp_path):
+    """Test a different model name misses the cache of the previous model."""
+    path = str(tmp_path / "cache.sqlite3")
+    CachingEmbeddingProvider(CountingProvider(1.0), model="m1", cache_path=path).create("hello")
+    
+    inner = CountingProvider(2.0)
+    provider = CachingEmbeddingProvider(inner, model="m2", cache_path=path)
+    
+    assert provider.create("hello") == [2.0, 5.0]
+    assert inner.calls == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,68 @@
+"""Tests for the caching query transformer."""
+import pytest
+from transformer.base import QueryTransformer
+from transformer.caching_transformer import CachingQueryTransformer
+
+
+class CountingTransformer(QueryTransformer):
+    """Lowercases queries and counts calls."""
+    
+    def __init__(self, model="m1", prompt_version="v1"):
+        self.model = model
+        self.prompt_version = prompt_version
+        self.calls = 0
+    
+    def transform(self, query):
+        self.calls += 1
+        return query.lower()
+    
+    def ping(self):
+        return True
+
+
+def test_repeated_query_transforms_once(tmp_path):
+    """Test a repeated query only reaches the wrapped transformer once."""
+    inner = CountingTransformer()
+    transformer = CachingQueryTransformer(inner, cache_path=str(tmp_path / "t.sqlite3"))
+    
+    assert transformer.transform("Jokic Stats") == "jokic stats"
+    assert transformer.transform("Jokic Stats") == "jokic stats"
+    assert inner.calls == 1
+
+
+def test_persisted_across_instances(tmp_path):
+    """Test normalizations survive a restart."""
+    path = str(tmp_path / "t.sqlite3")
+    CachingQueryTransformer(CountingTransformer(), cache_path=path).transform("Jokic Stats")
+    
+    inner = CountingTransformer()
+    transformer = CachingQueryTransformer(inner, cache_path=path)
+    
+    assert transformer.transform("Jokic Stats") == "jokic stats"
+    assert inner.calls == 0
+
+
+def test_prompt_version_change_misses(tmp_path):
+    """Test a new prompt version does not reuse old normalizations."""
+    path = str(tmp_path / "t.sqlite3")
+    CachingQueryTransformer(CountingTransformer(), cache_path=path).transform("Jokic Stats")
+    
+    inner = CountingTransformer(prompt_version="v2")
+    CachingQueryTransformer(inner, cache_path=path).transform("Jokic Stats")
+    
+    assert inner.calls == 1
+
+
+def test_identity_result_is_cached():
+    """Test a query already in normal form reaches the wrapped transformer once."""
+    inner = CountingTransformer()
+    transformer = CachingQueryTransformer(inner)
+    
+    transformer.transform("already normal")
+    transformer.transform("already normal")
+    
+    assert inner.calls == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,68 @@
+"""Tests for the rolling-window circuit breaker."""
+import asyncio
+import time
+import pytest
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def fail():
+    raise RuntimeError("boom")
+
+
+def test_opens_at_failure_rate():
+    """Test the circuit opens once the window's failure rate reaches the threshold."""
+    breaker = CircuitBreaker("test", window_size=4, min_calls=4, failure_rate_threshold=0.5)
+    breaker.record_success(0.01)
+    breaker.record_success(0.01)
+    breaker.record_failure(0.01)
+    assert breaker.state == "closed"
+    
+    breaker.record_failure(0.01)
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "unreachable")
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_slow_calls_count_as_failures():
+    """Test successful calls above the slow-call threshold open the circuit."""
+    breaker = CircuitBreaker("test", min_calls=2, slow_call_ms=100)
+    breaker.record_success(0.5)
+    breaker.record_success(0.5)
+    
+    assert breaker.state == "open"
+
+
+def test_half_open_probe():
+    """Test one probe is let through after the open period and its outcome decides the state."""
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=0.05)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    time.sleep(0.06)
+    
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure(0.01)
+    assert breaker.state == "open"
+    
+    time.sleep(0.06)
+    assert asyncio.run(breaker.acall(asyncio.sleep, 0, "ok")) == "ok"
+    assert breaker.state == "closed"
+    assert breaker.stats()["opened"] == 2
+
+
+def test_expected_latency_is_window_median():
+    """Test the latency estimate needs min_calls outcomes and is the median."""
+    breaker = CircuitBreaker("test", min_calls=3)
+    breaker.record_success(0.1)
+    breaker.record_success(0.3)
+    assert breaker.expected_latency() is None
+    
+    breaker.record_success(0.2)
+    assert breaker.expected_latency() == 0.2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,168 @@
+"""Tests for background container startup against a stub Ollama server."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+from starlette.testclient import TestClient
+import asgi
+from core.container import Container
+from core.profiler import SamplingProfiler
+from core.settings import settings
+from providers.ollama_provider import OllamaEmbeddingProvider
+from services.semantic_service import QueryResult
+
+
+class StubOllama:
+    """Minimal Ollama HTTP server listing one model and recording embed/chat requests."""
+    
+    def __init__(self, models=("stub:latest",)):
+        self.models = list(models)
+        self.requests = []
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, *args):
+                pass
+            
+            def _reply(self, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_GET(self):
+                self._reply({"models": [{"name": name, "model": name} for name in stub.models]})
+            
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append((self.path, request))
+                if self.path == "/api/embed":
+                    self._reply({"model": request["model"], "embeddings": [[1.0, 0.0]] * len(request["input"])})
+                else:
+                    self._reply({"model": request["model"], "message": {"role": "assistant", "content": ""}, "done": True})
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.host = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    """Point the container settings at a stub Ollama and a throwaway numpy store."""
+    server = StubOllama()
+    for name, value in {
+        "OLLAMA_HOSTS": server.host,
+        "OLLAMA_HEALTH_CHECK_SECONDS": 0,
+        "OLLAMA_KEEP_ALIVE": "-1",
+        "OLLAMA_WARM_UP": True,
+        "INIT_RETRY_SECONDS": 0.05,
+        "EMBEDDING_MODEL": "stub",
+        "TRANSFORMER_MODEL": "stub",
+        "QUERY_TRANSFORMER": "llm",
+        "VECTOR_STORE": "numpy",
+        "NUMPY_STORE_DIR": str(tmp_path),
+        "EMBEDDING_CACHE_SIZE": 0,
+        "EMBEDDING_BATCH_MAX_SIZE": 0,
+        "EMBEDDING_DIMENSIONS": 0,
+        "TRANSFORM_CACHE_SIZE": 0,
+        "LEXICAL_INDEX": False,
+        "METRICS_ENABLED": False
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    yield server
+    server.close()
+
+
+def test_start_warms_up_models_in_background(stub):
+    """Test start() returns at once and readiness follows a list-only ping and pinned warm-up."""
+    stub.models = []
+    container = Container()
+    container.start()
+    
+    assert not container.wait_until_ready(timeout=0.3)
+    readiness = container.readiness()
+    assert not readiness["ready"]
+    assert readiness["components"]["storage"] == "ready"
+    assert "not pulled" in readiness["components"]["embedding_provider"]
+    assert stub.requests == []
+    
+    stub.models = ["stub:latest"]
+    assert container.wait_until_ready(timeout=5)
+    assert container.readiness()["components"] == dict.fromkeys(
+        ("storage", "embedding_provider", "query_transformer"), "ready"
+    )
+    assert sorted(path for path, _ in stub.requests) == ["/api/chat", "/api/embed"]
+    assert all(request["keep_alive"] == -1 for _, request in stub.requests)
+
+
+def test_query_routes_answer_503_until_ready(stub, monkeypatch):
+    """Test /query and /stats fail fast instead of waiting on startup, while /livez stays up."""
+    stub.models = []
+    container = Container()
+    container.start()
+    monkeypatch.setattr(asgi, "container", container)
+    client = TestClient(asgi.app)
+    
+    started = time.monotonic()
+    response = client.post("/query", json={"query": "lakers score"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+    assert client.post("/query/batch", json={"queries": ["lakers score"]}).status_code == 503
+    assert client.get("/stats").status_code == 503
+    assert client.get("/livez").status_code == 200
+    assert time.monotonic() - started < 1
+    assert not container.ready
+    
+    stub.models = ["stub:latest"]
+    assert container.wait_until_ready(timeout=5)
+    assert client.get("/stats").status_code == 200
+
+
+def test_debug_queries_require_the_admin_token(monkeypatch, tmp_path):
+    """Test ?debug=1 is refused without the admin bearer token and traced with it."""
+    class StubService:
+        async def aroute_query(self, text):
+            return QueryResult(text, "stored")
+    
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    stub_container = SimpleNamespace(
+        ready=True,
+        semantic_service=StubService(),
+        profiler=SamplingProfiler(directory=str(tmp_path))
+    )
+    monkeypatch.setattr(asgi, "container", stub_container)
+    client = TestClient(asgi.app)
+    
+    assert client.post("/query?debug=1", json={"query": "lakers score"}).status_code == 401
+    denied = client.post(
+        "/query?debug=1", json={"query": "lakers score"}, headers={"Authorization": "Bearer wrong"}
+    )
+    assert denied.status_code == 401
+    allowed = client.post(
+        "/query?debug=1", json={"query": "lakers score"}, headers={"Authorization": "Bearer secret"}
+    )
+    assert allowed.status_code == 200
+    assert "debug" in allowed.json() and "Server-Timing" in allowed.headers
+    assert "debug" not in client.post("/query", json={"query": "lakers score"}).json()
+
+
+def test_ping_only_lists_models(stub):
+    """Test ping needs the model in the host's list and never runs it."""
+    assert OllamaEmbeddingProvider(model="stub", pool=Container._create_ollama_pool()).ping()
+    with pytest.raises(LookupError):
+        OllamaEmbeddingProvider(model="missing", pool=Container._create_ollama_pool()).ping()
+    assert stub.requests == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
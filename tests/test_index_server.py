@@ -0,0 +1,94 @@
+"""Tests for the shared index server and its RemoteStore clients."""
+import threading
+import pytest
+from core.container import Container
+from core.settings import settings
+from services.lexical_index import LexicalIndex
+from storage.chroma_store import ChromaStore
+from storage.index_server import IndexServer
+from storage.numpy_store import NumpyStore
+from storage.remote_store import RemoteStore
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "index.sock")
+
+
+def serve(store, socket_path):
+    """Start an index server on a background thread."""
+    server = IndexServer(store, socket_path)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server
+
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+def test_writes_are_visible_to_every_client(tmp_path, socket_path):
+    """Test a put through one client is found at once through another."""
+    server = serve(NumpyStore(collection_name="test", persist_directory=str(tmp_path)), socket_path)
+    writer, reader = RemoteStore(socket_path), RemoteStore(socket_path)
+    
+    assert reader.ping()
+    assert reader.dimension is None
+    entry_id = writer.put("lakers score", [1.0, 0.0, 0.0], {"source": "test"})
+    ids = writer.put_batch(["jokic stats", "weather"], [[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    
+    match = reader.find([0.9, 0.1, 0.0], threshold=0.8)[0]
+    assert (match["id"], match["query"], match["metadata"]["source"]) == (entry_id, "lakers score", "test")
+    batch = reader.find_batch([[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], threshold=0.9)
+    assert [results[0]["id"] for results in batch] == ids
+    assert reader.count() == 3 and reader.dimension == 3
+    writer.put("lakers score", [0.9, 0.1, 0.0], {"alias_of": entry_id})
+    assert reader.count_aliases(entry_id) == 1 and reader.count_aliases(ids[0]) == 0
+    
+    with pytest.raises(ValueError):
+        writer.put("too short", [1.0, 0.0])
+    writer.close()
+    reader.close()
+    stop(server)
+
+
+def test_reads_reconnect_after_server_restart(tmp_path, socket_path):
+    """Test a client survives the server being replaced, and a live socket is not stolen."""
+    store = NumpyStore(collection_name="test", persist_directory=str(tmp_path))
+    server = serve(store, socket_path)
+    client = RemoteStore(socket_path)
+    client.put("lakers score", [1.0, 0.0])
+    with pytest.raises(OSError):
+        IndexServer(store, socket_path)
+    
+    stop(server)
+    server = serve(NumpyStore(collection_name="test", persist_directory=str(tmp_path)), socket_path)
+    assert client.find([1.0, 0.0], threshold=0.9)[0]["query"] == "lakers score"
+    client.close()
+    stop(server)
+
+
+def test_server_evictions_reach_worker_lexical_indexes(tmp_path, socket_path, monkeypatch):
+    """Test rows evicted by the server are deleted from a worker's lexical index."""
+    path = str(tmp_path / "lexical.jsonl")
+    monkeypatch.setattr(settings, "LEXICAL_INDEX", True)
+    monkeypatch.setattr(settings, "LEXICAL_INDEX_PATH", path)
+    store = ChromaStore(collection_name="test", persist_directory=str(tmp_path / "chroma"), max_entries=1)
+    Container().log_lexical_evictions(store)
+    server = serve(store, socket_path)
+    client = RemoteStore(socket_path)
+    worker_index = LexicalIndex(path=path)
+    
+    entry_id = client.put("lakers score", [1.0, 0.0, 0.0])
+    worker_index.add(entry_id, ["lakers score tonight"], "lakers score")
+    client.put("weather", [0.0, 0.0, 1.0])
+    assert worker_index.find("tonight lakers score") == "lakers score"
+    
+    assert store.evict() == 1
+    assert worker_index.find("tonight lakers score") is None
+    client.close()
+    stop(server)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
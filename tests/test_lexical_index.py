@@ -0,0 +1,52 @@
+"""Tests for the lexical near-duplicate index."""
+from services.lexical_index import LexicalIndex, tokenize
+
+
+def test_tokenize_ignores_case_punctuation_possessives_and_order():
+    """Test query variants reduce to the same word set."""
+    assert tokenize("Jokic's stats tonight?") == tokenize("tonight jokic stats")
+
+
+def test_find_matches_near_duplicates_only():
+    """Test lookups return the cached query above the Jaccard threshold only."""
+    index = LexicalIndex(threshold=0.8)
+    index.add("row-1", ["jokic stats tonight"], "jokic stats tonight")
+    
+    assert index.find("Jokic's stats tonight?") == "jokic stats tonight"
+    assert index.find("embiid stats tonight") is None
+    assert index.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_log_is_shared_and_deletes_persist(tmp_path):
+    """Test entries and deletes written by one instance reach another one."""
+    path = str(tmp_path / "lexical.jsonl")
+    first = LexicalIndex(path=path)
+    second = LexicalIndex(path=path)
+    first.add("row-1", ["Lakers score?", "lakers score"], "lakers score")
+    
+    assert second.find("score lakers") == "lakers score"
+    
+    second.delete(["row-1"])
+    
+    assert first.find("lakers score") is None
+    assert len(LexicalIndex(path=path)) == 0
+
+
+def test_compaction_keeps_live_entries_for_every_instance(tmp_path):
+    """Test compaction rewrites the log without deleted rows and other instances follow the new file."""
+    path = tmp_path / "lexical.jsonl"
+    owner = LexicalIndex(path=str(path))
+    worker = LexicalIndex(path=str(path))
+    owner.add("row-1", ["lakers score"], "lakers score")
+    owner.add("row-2", ["jokic stats tonight"], "jokic stats tonight")
+    owner.delete(["row-1"])
+    assert worker.find("score lakers") is None
+    
+    assert owner.compact() == 2
+    assert owner.compact() == 0
+    assert len(path.read_text().splitlines()) == 1
+    
+    worker.add("row-3", ["weather in denver"], "weather in denver")
+    assert owner.find("denver weather in") == "weather in denver"
+    assert worker.find("stats tonight jokic") == "jokic stats tonight"
+    assert len(worker) == len(LexicalIndex(path=str(path))) == 2
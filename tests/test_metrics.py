@@ -0,0 +1,67 @@
+"""Tests for the Prometheus pipeline metrics."""
+import os
+import subprocess
+import sys
+import textwrap
+from prometheus_client import CollectorRegistry
+from core.metrics import ServiceMetrics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CountingStore:
+    """Only exposes the row count and stats the scrape-time gauges read."""
+    
+    def count(self):
+        return 42
+    
+    def stats(self):
+        return {"write_behind": {"pending": 0, "flushed": 10, "dropped": 3, "failed_flushes": 6}}
+
+
+def test_stage_timer_skips_failed_stages():
+    """Test a stage that raises is not observed."""
+    metrics = ServiceMetrics(registry=CollectorRegistry())
+    with metrics.time("raw_embed"):
+        pass
+    try:
+        with metrics.time("raw_embed"):
+            raise RuntimeError("embedding failed")
+    except RuntimeError:
+        pass
+    
+    assert metrics.registry.get_sample_value("semantic_router_stage_seconds_count", {"stage": "raw_embed"}) == 1
+
+
+def test_render_publishes_collection_size():
+    """Test a scrape refreshes the collection and write-behind gauges from the store."""
+    metrics = ServiceMetrics(registry=CollectorRegistry())
+    body, content_type = metrics.render(CountingStore())
+    
+    assert content_type.startswith("text/plain")
+    assert b"semantic_router_collection_entries 42.0" in body
+    assert b"semantic_router_write_behind_dropped_rows 3.0" in body
+
+
+def test_multiprocess_scrape_sums_workers(tmp_path):
+    """Test /metrics aggregates the counters of every worker process."""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = textwrap.dedent("""
+        from core.metrics import ServiceMetrics
+        metrics = ServiceMetrics()
+        metrics.count_query("stored")
+        metrics.observe("transform", 0.2)
+    """)
+    scrape = textwrap.dedent("""
+        import sys
+        from core.metrics import ServiceMetrics
+        sys.stdout.write(ServiceMetrics().render()[0].decode())
+    """)
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], cwd=PROJECT_ROOT, env=env, check=True)
+    output = subprocess.run(
+        [sys.executable, "-c", scrape], cwd=PROJECT_ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    
+    assert 'semantic_router_queries_total{path="stored"} 2.0' in output
+    assert 'semantic_router_stage_seconds_count{stage="transform"} 2.0' in output
@@ -0,0 +1,142 @@
+"""Tests for the NumPy vector store."""
+import numpy as np
+import pytest
+from storage.numpy_store import NumpyStore
+from storage.quantization import QuantizedIndex
+
+
+@pytest.fixture
+def temp_store(tmp_path):
+    """Create a temporary NumPy store with a small initial capacity."""
+    return NumpyStore(
+        collection_name="test_collection",
+        persist_directory=str(tmp_path),
+        initial_capacity=2
+    )
+
+
+def test_find_exact_match(temp_store):
+    """Test a stored vector is found with similarity 1."""
+    embedding_id = temp_store.put(query="test query", embedding=[0.1] * 8)
+    
+    results = temp_store.find(embedding=[0.1] * 8, threshold=0.99)
+    
+    assert results[0]["id"] == embedding_id
+    assert results[0]["query"] == "test query"
+    assert results[0]["similarity"] == pytest.approx(1.0)
+
+
+def test_top_k_ordering_and_growth(temp_store):
+    """Test results are ordered by similarity across matrix growth."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 8))
+    for i, vector in enumerate(vectors):
+        temp_store.put(query=f"q{i}", embedding=vector.tolist())
+    
+    results = temp_store.find(embedding=vectors[7].tolist(), threshold=-1.0, top_k=5)
+    
+    assert len(results) == 5
+    assert results[0]["query"] == "q7"
+    similarities = [r["similarity"] for r in results]
+    assert similarities == sorted(similarities, reverse=True)
+
+
+def test_threshold_filters(temp_store):
+    """Test dissimilar vectors are filtered by threshold."""
+    temp_store.put(query="a", embedding=[1.0, 0.0])
+    
+    assert temp_store.find(embedding=[0.0, 1.0], threshold=0.5) == []
+
+
+def test_persistence(tmp_path):
+    """Test rows are reloaded by a new instance."""
+    store = NumpyStore(collection_name="c", persist_directory=str(tmp_path))
+    store.put(query="persisted", embedding=[1.0, 2.0, 3.0])
+    store.close()
+    
+    reloaded = NumpyStore(collection_name="c", persist_directory=str(tmp_path))
+    
+    assert reloaded.count() == 1
+    assert reloaded.find(embedding=[1.0, 2.0, 3.0])[0]["query"] == "persisted"
+
+
+def test_sees_rows_from_other_instance(tmp_path):
+    """Test a second instance on the same files sees new rows (multi-worker case)."""
+    first = NumpyStore(collection_name="c", persist_directory=str(tmp_path), initial_capacity=1)
+    second = NumpyStore(collection_name="c", persist_directory=str(tmp_path), initial_capacity=1)
+    first.put(query="one", embedding=[1.0, 0.0])
+    second.put(query="two", embedding=[0.0, 1.0])
+    
+    assert first.find(embedding=[0.0, 1.0])[0]["query"] == "two"
+    assert second.find(embedding=[1.0, 0.0])[0]["query"] == "one"
+
+
+def test_batch_put_and_find(temp_store):
+    """Test batched inserts and lookups agree with single-vector find."""
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(10, 8)).tolist()
+    ids = temp_store.put_batch(queries=[f"q{i}" for i in range(10)], embeddings=vectors)
+    
+    batch_results = temp_store.find_batch(embeddings=vectors[:3], threshold=0.0, top_k=3)
+    
+    assert len(ids) == 10
+    for vector, results in zip(vectors[:3], batch_results):
+        single = temp_store.find(embedding=vector, threshold=0.0, top_k=3)
+        assert [r["id"] for r in results] == [r["id"] for r in single]
+        assert [r["similarity"] for r in results] == pytest.approx([r["similarity"] for r in single])
+
+
+def test_dimension_mismatch_rejected(temp_store):
+    """Test storing a vector of the wrong dimension fails."""
+    temp_store.put(query="a", embedding=[1.0, 0.0])
+    
+    with pytest.raises(ValueError):
+        temp_store.put(query="b", embedding=[1.0, 0.0, 0.0])
+
+
+def test_reader_reopens_a_matrix_replaced_during_refresh(tmp_path):
+    """Test a reader whose matrix check raced a writer's grow reopens it before serving rows."""
+    writer = NumpyStore(collection_name="c", persist_directory=str(tmp_path), initial_capacity=2)
+    reader = NumpyStore(collection_name="c", persist_directory=str(tmp_path), quantization="int8")
+    writer.put(query="a", embedding=[1.0, 0.0])
+    assert reader.count() == 1
+    writer.put_batch(queries=["b", "c", "d"], embeddings=[[0.0, 1.0], [1.0, 1.0], [1.0, -1.0]])
+    
+    open_matrix = reader._open_matrix
+    # The first (unforced) check misses the replacement, as if the grow landed right after it
+    reader._open_matrix = lambda force=False: open_matrix(force) if force else None
+    
+    assert reader.find(embedding=[1.0, -1.0], threshold=0.99)[0]["query"] == "d"
+    assert reader._matrix.shape[0] >= reader.count() == 4
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_search_matches_exact(tmp_path, quantization, monkeypatch):
+    """Test code prefilter plus exact rerank returns the exact scan's best match."""
+    # Chunks smaller than the store so the scoring loop crosses several of them
+    monkeypatch.setattr(QuantizedIndex, "chunk_rows", 300)
+    monkeypatch.setattr(QuantizedIndex, "int8_chunk_rows", 300)
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(2000, 64))
+    exact = NumpyStore(collection_name="c", persist_directory=str(tmp_path))
+    exact.put_batch(queries=[f"q{i}" for i in range(len(vectors))], embeddings=vectors.tolist())
+    quantized = NumpyStore(
+        collection_name="c",
+        persist_directory=str(tmp_path),
+        quantization=quantization,
+        rerank_candidates=100
+    )
+    queries = (vectors[:50] + 0.3 * rng.normal(size=(50, 64))).tolist()
+    
+    exact_results = exact.find_batch(embeddings=queries, threshold=0.0, top_k=1)
+    quantized_results = quantized.find_batch(embeddings=queries, threshold=0.0, top_k=1)
+    
+    assert [r[0]["id"] for r in quantized_results] == [r[0]["id"] for r in exact_results]
+    assert [r[0]["similarity"] for r in quantized_results] == pytest.approx(
+        [r[0]["similarity"] for r in exact_results], abs=1e-5
+    )
+    assert quantized.stats()["index_bytes"] < quantized.stats()["matrix_bytes"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
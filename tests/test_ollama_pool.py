@@ -0,0 +1,150 @@
+"""Tests for the load-balanced Ollama pool against local stub servers."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from core.ollama_pool import OllamaPool
+from providers.ollama_provider import OllamaEmbeddingProvider
+
+
+class StubOllama:
+    """Minimal Ollama HTTP server answering /api/embed and /api/ps."""
+    
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.down = False
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, *args):
+                pass
+            
+            def _reply(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_GET(self):
+                self._reply(500 if stub.down else 200, {"error": "down"} if stub.down else {"models": []})
+            
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.connections.add(self.client_address)
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.in_flight -= 1
+                if stub.down:
+                    self._reply(500, {"error": "model runner crashed"})
+                else:
+                    self._reply(200, {"embeddings": [[1.0, 0.0]] * len(request["input"])})
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.host = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    """Start two stub Ollama servers."""
+    servers = [StubOllama(), StubOllama()]
+    yield servers
+    for server in servers:
+        server.close()
+
+
+def test_requests_are_balanced_over_backends(stubs):
+    """Test sequential requests alternate and reuse keep-alive connections."""
+    pool = OllamaPool([stub.host for stub in stubs], health_check_seconds=0)
+    provider = OllamaEmbeddingProvider(model="stub", pool=pool)
+    for _ in range(10):
+        assert provider.create("lakers score") == [1.0, 0.0]
+    
+    assert [stub.requests for stub in stubs] == [5, 5]
+    assert [len(stub.connections) for stub in stubs] == [1, 1]
+    pool.close()
+
+
+def test_concurrency_cap_per_backend():
+    """Test concurrent requests never exceed the per-backend cap."""
+    stub = StubOllama(delay=0.05)
+    pool = OllamaPool([stub.host], max_concurrency=2, health_check_seconds=0)
+    threads = [threading.Thread(target=pool.embed, kwargs={"model": "stub", "input": ["q"]}) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert stub.requests == 6
+    assert stub.max_in_flight == 2
+    pool.close()
+    stub.close()
+
+
+def test_async_waiters_hold_no_threads():
+    """Test coroutines waiting for a slot park on the loop and each get one as slots free up."""
+    stub = StubOllama(delay=0.05)
+    pool = OllamaPool([stub.host], max_concurrency=1, health_check_seconds=0)
+    
+    async def embed_many():
+        tasks = [asyncio.create_task(pool.async_client.embed(model="stub", input=["q"])) for _ in range(8)]
+        await asyncio.sleep(0.02)
+        # Default-executor threads are named asyncio_N
+        executor_threads = [thread for thread in threading.enumerate() if thread.name.startswith("asyncio_")]
+        waiting = (len(executor_threads), len(pool._async_waiters))
+        await asyncio.gather(*tasks)
+        return waiting
+    
+    assert asyncio.run(embed_many()) == (0, 7)
+    assert stub.requests == 8 and stub.max_in_flight == 1
+    assert pool.stats()[0]["outstanding"] == 0
+    pool.close()
+    stub.close()
+
+
+def test_failing_backend_is_ejected_and_readmitted(stubs):
+    """Test failures are retried elsewhere, eject the backend, and a health check re-admits it."""
+    stubs[0].down = True
+    pool = OllamaPool([stub.host for stub in stubs], eject_after_failures=2, health_check_seconds=0)
+    
+    async def embed_async():
+        return await pool.async_client.embed(model="stub", input=["q"])
+    
+    for _ in range(2):
+        assert pool.embed(model="stub", input=["q"])["embeddings"] == [[1.0, 0.0]]
+    assert [backend["healthy"] for backend in pool.stats()] == [False, True]
+    
+    requests = stubs[0].requests
+    asyncio.run(embed_async())
+    pool.check_health()
+    assert stubs[0].requests == requests
+    assert not pool.stats()[0]["healthy"]
+    
+    stubs[0].down = False
+    pool.check_health()
+    assert pool.stats()[0]["healthy"]
+    pool.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
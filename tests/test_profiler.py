@@ -0,0 +1,49 @@
+"""Tests for the request sampling profiler."""
+import time
+from core.profiler import SamplingProfiler
+
+
+def busy_handler(seconds):
+    """Spin so the sampler catches this frame."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_session_samples_requests_and_dumps_collapsed_stacks(tmp_path):
+    """Test a started session samples requests and writes flame-graph stacks when it ends."""
+    profiler = SamplingProfiler(directory=str(tmp_path), interval_ms=1, refresh_seconds=0.01)
+    with profiler.request():
+        busy_handler(0.01)
+    assert profiler.status()["sampled_requests"] == 0
+    
+    status = profiler.configure(sample_rate=1.0, duration_seconds=0.3)
+    assert status["active"]
+    with profiler.request():
+        busy_handler(0.1)
+    assert profiler.status()["samples"] > 0
+    
+    profiler._sampler.join(timeout=5)
+    assert not profiler.active
+    dumps = profiler.list_dumps()
+    assert len(dumps) == 1
+    lines = (tmp_path / dumps[0]).read_text().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.endswith("test_profiler.py:busy_handler")
+    assert int(count) > 0
+
+
+def test_control_file_reaches_other_processes(tmp_path):
+    """Test a session started by one worker is picked up by another sharing the directory."""
+    admin = SamplingProfiler(directory=str(tmp_path), refresh_seconds=0)
+    worker = SamplingProfiler(directory=str(tmp_path), refresh_seconds=0)
+    admin.configure(sample_rate=0.25, duration_seconds=60)
+    
+    with worker.request():
+        pass
+    assert worker.active and worker.sample_rate == 0.25
+    
+    admin.configure(sample_rate=0, duration_seconds=1)
+    with worker.request():
+        pass
+    assert not worker.active
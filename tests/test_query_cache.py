@@ -0,0 +1,61 @@
+"""Tests for the exact-match query cache."""
+import pytest
+from services.query_cache import QueryCache, canonicalize_query
+
+
+def test_canonicalize_folds_case_and_whitespace():
+    """Test that case and whitespace variants share a key."""
+    assert canonicalize_query("  Jokic   stats\tTonight ") == "jokic stats tonight"
+
+
+def test_cache_hit_on_canonical_variant():
+    """Test lookups hit for lightly different spellings of the same text."""
+    cache = QueryCache(max_size=10)
+    cache.set("Jokic stats tonight", "jokic stats")
+    
+    assert cache.get("jokic  STATS tonight") == "jokic stats"
+    assert cache.get("jokic stats today") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_size_eviction():
+    """Test least recently used entries are evicted when full."""
+    cache = QueryCache(max_size=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_ttl_expiry(monkeypatch):
+    """Test entries expire after the TTL."""
+    now = [1000.0]
+    monkeypatch.setattr("core.lru_cache.time.monotonic", lambda: now[0])
+    cache = QueryCache(max_size=10, ttl_seconds=5)
+    cache.set("a", "A")
+    
+    now[0] += 4
+    assert cache.get("a") == "A"
+    now[0] += 2
+    assert cache.get("a") is None
+
+
+def test_invalidate_drops_entries_and_stale_writes():
+    """Test invalidation clears entries and rejects results computed before it."""
+    cache = QueryCache(max_size=10)
+    cache.set("a", "A")
+    generation = cache.generation
+    cache.invalidate()
+    cache.set("b", "B", generation=generation)
+    
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
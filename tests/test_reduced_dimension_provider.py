@@ -0,0 +1,62 @@
+"""Tests for the reduced-dimension embedding provider."""
+import asyncio
+import numpy as np
+import pytest
+from providers.base import EmbeddingProvider
+from providers.reduced_dimension_provider import (
+    ReducedDimensionEmbeddingProvider,
+    fit_projection,
+    save_projection,
+)
+
+
+class FixedProvider(EmbeddingProvider):
+    """Returns a stored vector per text."""
+    
+    def __init__(self, vectors):
+        self.vectors = vectors
+    
+    def create(self, text):
+        return self.vectors[text]
+    
+    def ping(self):
+        return True
+
+
+def test_truncate_keeps_prefix_and_renormalizes():
+    """Test truncation keeps the leading coordinates at unit length."""
+    provider = ReducedDimensionEmbeddingProvider(
+        FixedProvider({"a": [3.0, 4.0, 12.0, 1.0]}), dimensions=2
+    )
+    
+    assert provider.create("a") == pytest.approx([0.6, 0.8])
+    assert provider.create_batch(["a", "a"]) == [pytest.approx([0.6, 0.8])] * 2
+    assert asyncio.run(provider.acreate("a")) == pytest.approx([0.6, 0.8])
+
+
+def test_pca_projection_round_trip(tmp_path):
+    """Test a saved projection keeps the dominant direction of the sample."""
+    rng = np.random.default_rng(0)
+    direction = np.array([1.0, 1.0, 0.0, 0.0]) / np.sqrt(2)
+    sample = np.outer(rng.standard_normal(200), direction) + 0.01 * rng.standard_normal((200, 4))
+    path = str(tmp_path / "projection.npz")
+    save_projection(path, *fit_projection(sample, dimensions=1))
+    
+    provider = ReducedDimensionEmbeddingProvider(
+        FixedProvider({"up": list(direction * 5), "down": list(-direction * 5)}),
+        dimensions=1,
+        method="pca",
+        projection_path=path
+    )
+    
+    assert abs(provider.create("up")[0]) == pytest.approx(1.0)
+    assert provider.create("up")[0] == pytest.approx(-provider.create("down")[0])
+
+
+def test_pca_requires_matching_projection(tmp_path):
+    """Test a projection with the wrong number of components is rejected."""
+    path = str(tmp_path / "projection.npz")
+    save_projection(path, *fit_projection(np.eye(4), dimensions=2))
+    
+    with pytest.raises(ValueError):
+        ReducedDimensionEmbeddingProvider(FixedProvider({}), dimensions=3, method="pca", projection_path=path)
@@ -0,0 +1,82 @@
+"""Tests for the rule-based and tiered query transformers."""
+from providers.base import EmbeddingProvider
+from storage.base import VectorStore
+from transformer.base import QueryTransformer
+from transformer.rule_transformer import RuleBasedQueryTransformer, light_stem
+from transformer.tiered_transformer import TieredQueryTransformer
+
+
+class TextEmbeddingProvider(EmbeddingProvider):
+    """Embeds text as itself so the stub store can compare strings."""
+    
+    def create(self, text):
+        return text
+    
+    def ping(self):
+        return True
+
+
+class ExactStore(VectorStore):
+    """Matches stored texts exactly."""
+    
+    def __init__(self, queries):
+        self.queries = set(queries)
+    
+    def ping(self):
+        return True
+    
+    def put(self, query, embedding, metadata=None):
+        self.queries.add(embedding)
+        return embedding
+    
+    def find(self, embedding, threshold=0.85, top_k=10, record_hits=True):
+        if embedding in self.queries:
+            return [{"id": embedding, "query": embedding, "similarity": 1.0}]
+        return []
+
+
+class CountingTransformer(QueryTransformer):
+    """Stands in for the LLM and counts calls."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def transform(self, query):
+        self.calls += 1
+        return "llm: " + query
+    
+    def ping(self):
+        return True
+
+
+def test_rules_fold_strip_stem_and_alias():
+    """Test the rule pipeline maps query variants to one normalized form."""
+    transformer = RuleBasedQueryTransformer(aliases={"lal": "los angeles lakers", "lakers": "los angeles lakers"})
+    
+    assert transformer.transform("What are the LAL's scores?!") == "los angeles lakers score"
+    assert transformer.transform("Los Angeles Lakers score") == "los angeles lakers score"
+    assert transformer.transform("ＬＡＬ　Scores") == "los angeles lakers score"
+
+
+def test_light_stem_only_folds_plurals():
+    """Test stemming folds plural endings and leaves other words alone."""
+    assert [light_stem(word) for word in ["games", "injuries", "matches", "stats", "bus", "scoring"]] == [
+        "game", "injury", "match", "stat", "bus", "scoring"
+    ]
+
+
+def test_tiered_uses_llm_only_on_cache_miss():
+    """Test the LLM is skipped when the rule output is already cached."""
+    llm = CountingTransformer()
+    transformer = TieredQueryTransformer(
+        fast=RuleBasedQueryTransformer(),
+        fallback=llm,
+        embedding_provider=TextEmbeddingProvider(),
+        storage=ExactStore(["jokic stat tonight"])
+    )
+    
+    assert transformer.transform("Jokic's stats tonight?") == "jokic stat tonight"
+    assert llm.calls == 0
+    assert transformer.transform("who won last night") == "llm: who won last night"
+    assert llm.calls == 1
+    assert transformer.stats() == {"fast_hits": 1, "fallbacks": 1}
@@ -0,0 +1,527 @@
+"""Tests for the semantic service orchestration."""
+import asyncio
+import math
+import threading
+import time
+import pytest
+from prometheus_client import CollectorRegistry
+from core.circuit_breaker import CircuitBreaker
+from core.metrics import ServiceMetrics
+from core.request_trace import trace_request
+from providers.base import EmbeddingProvider
+from storage.base import VectorStore
+from transformer.base import QueryTransformer
+from services.lexical_index import LexicalIndex
+from services.query_cache import QueryCache
+from services.semantic_service import QueryResult, SemanticService
+
+
+class StubEmbeddingProvider(EmbeddingProvider):
+    """Embeds text as a bag of lowercase words over a fixed vocabulary."""
+    
+    def __init__(self):
+        self.calls = 0
+        self.batch_calls = 0
+        self.vocab = {}
+    
+    def create(self, text):
+        self.calls += 1
+        vector = [0.0] * 64
+        for word in text.lower().split():
+            index = self.vocab.setdefault(word, len(self.vocab) % 64)
+            vector[index] += 1.0
+        return vector
+    
+    def create_batch(self, texts):
+        self.batch_calls += 1
+        return [self.create(text) for text in texts]
+    
+    def ping(self):
+        return True
+
+
+class StubStore(VectorStore):
+    """Brute-force cosine store kept in a list."""
+    
+    def __init__(self):
+        self.rows = []
+    
+    def ping(self):
+        return True
+    
+    def put(self, query, embedding, metadata=None):
+        embedding_id = str(len(self.rows))
+        self.rows.append((embedding_id, query, embedding, metadata or {}))
+        return embedding_id
+    
+    def count_aliases(self, entry_id):
+        return sum(1 for row in self.rows if row[3].get("alias_of") == entry_id)
+    
+    def find(self, embedding, threshold=0.85, top_k=10, record_hits=True):
+        results = []
+        for embedding_id, query, stored, metadata in self.rows:
+            dot = sum(a * b for a, b in zip(embedding, stored))
+            norm = math.sqrt(sum(a * a for a in embedding)) * math.sqrt(sum(b * b for b in stored))
+            similarity = dot / norm if norm else 0.0
+            if similarity >= threshold:
+                results.append({"id": embedding_id, "query": query, "similarity": similarity, "metadata": metadata})
+        results.sort(key=lambda item: item["similarity"], reverse=True)
+        return results[:top_k]
+
+
+class StubTransformer(QueryTransformer):
+    """Lowercases and drops a trailing question mark."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def transform(self, query):
+        self.calls += 1
+        return query.lower().rstrip("?")
+    
+    def ping(self):
+        return True
+
+
+@pytest.fixture
+def service():
+    """Create a service over stub components with a query cache."""
+    return SemanticService(
+        embedding_provider=StubEmbeddingProvider(),
+        storage=StubStore(),
+        query_transformer=StubTransformer(),
+        query_cache=QueryCache(max_size=100)
+    )
+
+
+def test_miss_stores_normalized_query(service):
+    """Test a miss transforms and stores the normalized query."""
+    assert service.process_query("Jokic stats tonight?") == "jokic stats tonight"
+    assert len(service.storage.rows) == 1
+
+
+def test_query_cache_skips_model_calls(service):
+    """Test a repeated query is answered without embedding or transforming."""
+    service.process_query("Jokic stats tonight?")
+    embed_calls = service.embedding_provider.calls
+    transform_calls = service.query_transformer.calls
+    
+    assert service.process_query("  jokic STATS tonight? ") == "jokic stats tonight"
+    assert service.embedding_provider.calls == embed_calls
+    assert service.query_transformer.calls == transform_calls
+    assert service.stats()["query_cache"]["hits"] == 1
+
+
+def test_store_keeps_query_cache(service):
+    """Test storing a new entry leaves earlier cached results in place."""
+    service.process_query("first query")
+    service.process_queries(["lakers score"])
+    generation = service.query_cache.generation
+    service.process_query("a completely different question")
+    
+    assert service.query_cache.generation == generation
+    assert service.query_cache.get("first query") == "first query"
+    assert service.query_cache.get("lakers score") == "lakers score"
+
+
+def test_batch_matches_single_query_results(service):
+    """Test batched processing routes like process_query and batches embed calls."""
+    service.process_query("jokic stats tonight")
+    
+    results = service.process_queries(["Jokic stats tonight?", "lakers score", "lakers score"])
+    
+    assert results == ["jokic stats tonight", "lakers score", "lakers score"]
+    assert service.embedding_provider.batch_calls == 2
+    assert [row[1] for row in service.storage.rows] == ["jokic stats tonight", "lakers score"]
+
+
+def test_batch_stores_shared_normalization_once(service):
+    """Test misses that normalize to the same query are stored once."""
+    results = service.process_queries(["Lakers score?", "lakers score"])
+    
+    assert results == ["lakers score", "lakers score"]
+    assert len(service.storage.rows) == 1
+    assert service.process_queries(["Lakers score?"]) == ["lakers score"]
+
+
+def test_batch_transforms_in_parallel_and_caches_hits(service):
+    """Test batch transforms run concurrently and hits are cached alongside stored misses."""
+    service.process_query("Lakers score?")
+    transform = service.query_transformer.transform
+    service.query_transformer.transform = lambda query: time.sleep(0.2) or transform(query)
+    
+    started = time.monotonic()
+    results = service.process_queries(["lakers score", "Jokic stats?", "Weather today?", "Nuggets roster?"])
+    assert time.monotonic() - started < 0.6
+    assert results == ["lakers score", "jokic stats", "weather today", "nuggets roster"]
+    assert all(service.query_cache.get(text) is not None for text in ("lakers score", "Jokic stats?", "Nuggets roster?"))
+
+
+def test_batch_degrades_through_the_breaker(service):
+    """Test a failing transformer in a batch routes on raw embeddings and opens the breaker."""
+    service.process_query("Lakers score?")
+    
+    def fail(query):
+        raise ConnectionError("ollama is down")
+    
+    service.query_transformer.transform = fail
+    service.transformer_breaker = CircuitBreaker("transformer", min_calls=2)
+    
+    assert service.process_queries(["lakers lakers score", "Jokic stats?", "Weather today?"]) == [
+        "lakers score", "Jokic stats?", "Weather today?"
+    ]
+    assert len(service.storage.rows) == 1
+    assert service.query_cache.get("Jokic stats?") is None
+    assert service.stats()["circuit_breakers"]["transformer"]["state"] == "open"
+
+
+def test_batch_transforms_queued_past_the_budget_spare_the_breaker():
+    """Test batch transforms still queued at the deadline are over budget and not breaker failures."""
+    transformer = StubTransformer()
+    transform = transformer.transform
+    transformer.transform = lambda query: time.sleep(0.15) or transform(query)
+    service = SemanticService(
+        embedding_provider=StubEmbeddingProvider(),
+        storage=StubStore(),
+        query_transformer=transformer,
+        latency_budget_ms=200,
+        speculative_threads=1,
+        transformer_breaker=CircuitBreaker("transformer", min_calls=3)
+    )
+    
+    service.process_queries(["Jokic stats?", "Weather today?", "Nuggets roster?", "Lakers score?"])
+    
+    degraded = service.stats()["degraded"]
+    assert (degraded["transformer_timeout"], degraded["over_budget"]) == (1, 2)
+    breaker = service.stats()["circuit_breakers"]["transformer"]
+    assert breaker["state"] == "closed" and breaker["calls"] == 2
+
+
+def test_async_path_matches_sync(service):
+    """Test aprocess_query routes like process_query."""
+    async def run():
+        first = await service.aprocess_query("Jokic stats tonight?")
+        second = await service.aprocess_query("jokic stats tonight")
+        return first, second
+    
+    assert asyncio.run(run()) == ("jokic stats tonight", "jokic stats tonight")
+    assert len(service.storage.rows) == 1
+
+
+def test_concurrent_identical_queries_are_coalesced(service):
+    """Test concurrent identical misses run one transform and one insert."""
+    release = threading.Event()
+    transform = service.query_transformer.transform
+    service.query_transformer.transform = lambda query: release.wait() and transform(query)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.process_query("Lakers score?")))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while service.stats()["single_flight"]["query"]["collapsed"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert results == ["lakers score"] * 5
+    assert service.query_transformer.calls == 1
+    assert len(service.storage.rows) == 1
+
+
+def test_phrasings_sharing_a_store_flight_each_get_an_alias():
+    """Test a caller that joined another phrasing's insert still stores its own alias row."""
+    service = SemanticService(
+        embedding_provider=StubEmbeddingProvider(),
+        storage=StubStore(),
+        query_transformer=StubTransformer(),
+        alias_limit=2
+    )
+    put = service.storage.put
+    
+    def held_put(query, embedding, metadata=None):
+        if not metadata:
+            # Hold the entry insert until the other phrasing has joined its flight
+            deadline = time.monotonic() + 5
+            while service.stats()["single_flight"]["store"]["collapsed"] < 1 and time.monotonic() < deadline:
+                time.sleep(0.001)
+        return put(query, embedding, metadata)
+    
+    service.storage.put = held_put
+    threads = [threading.Thread(target=service.process_query, args=(text,)) for text in ("Lakers score?", "Lakers score??")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert service.stats()["single_flight"]["store"] == {"executions": 1, "collapsed": 1}
+    assert [row[3] for row in service.storage.rows] == [{}, {"alias_of": "0"}, {"alias_of": "0"}]
+
+
+def test_batch_and_single_query_misses_share_one_insert(service):
+    """Test a batch miss racing process_query on the same normalized query stores it once."""
+    put = service.storage.put
+    
+    def held_put(query, embedding, metadata=None):
+        # Hold the insert until the other request has joined its flight
+        deadline = time.monotonic() + 5
+        while service.stats()["single_flight"]["store"]["collapsed"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return put(query, embedding, metadata)
+    
+    service.storage.put = held_put
+    threads = [
+        threading.Thread(target=service.process_queries, args=(["Lakers score?"],)),
+        threading.Thread(target=service.process_query, args=("lakers score",))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert [row[1] for row in service.storage.rows] == ["lakers score"]
+
+
+def test_concurrent_async_queries_are_coalesced(service):
+    """Test concurrent identical async misses share one pipeline run."""
+    async def run():
+        return await asyncio.gather(*[service.aprocess_query("Lakers score?") for _ in range(5)])
+    
+    assert asyncio.run(run()) == ["lakers score"] * 5
+    assert service.query_transformer.calls == 1
+    assert service.stats()["single_flight"]["query"]["collapsed"] == 4
+
+
+def test_speculative_transform_counters():
+    """Test speculative transforms are used on misses and discarded on high-confidence hits."""
+    service = SemanticService(
+        embedding_provider=StubEmbeddingProvider(),
+        storage=StubStore(),
+        query_transformer=StubTransformer(),
+        speculative_transform=True
+    )
+    
+    assert service.process_query("lakers score?") == "lakers score"
+    assert service.process_query("lakers score") == "lakers score"
+    
+    counters = service.stats()["speculative_transform"]
+    assert counters["started"] == 2
+    assert counters["used"] == 1
+    assert counters["cancelled"] + counters["wasted"] == 1
+
+
+def test_lexical_index_skips_model_calls():
+    """Test a word-level variant of a stored query is answered without embedding it."""
+    embeddings = StubEmbeddingProvider()
+    transformer = StubTransformer()
+    service = SemanticService(
+        embedding_provider=embeddings,
+        storage=StubStore(),
+        query_transformer=transformer,
+        lexical_index=LexicalIndex()
+    )
+    service.process_query("Jokic stats tonight?")
+    calls = (embeddings.calls, transformer.calls)
+    
+    assert service.process_query("tonight, Jokic's stats") == "jokic stats tonight"
+    assert (embeddings.calls, transformer.calls) == calls
+    assert service.stats()["lexical_index"]["hits"] == 1
+
+
+def test_async_lexical_index_calls_stay_off_the_event_loop():
+    """Test the async path reads and appends the lexical index from the storage threads."""
+    threads = []
+    
+    class RecordingLexicalIndex(LexicalIndex):
+        def find(self, text):
+            threads.append(threading.current_thread())
+            return super().find(text)
+        
+        def add(self, entry_id, texts, query):
+            threads.append(threading.current_thread())
+            super().add(entry_id, texts, query)
+    
+    service = SemanticService(
+        embedding_provider=StubEmbeddingProvider(),
+        storage=StubStore(),
+        query_transformer=StubTransformer(),
+        lexical_index=RecordingLexicalIndex()
+    )
+    
+    async def run():
+        await service.aprocess_query("Jokic stats tonight?")
+        await service.aprocess_query("jokic stats tonight")
+        return await service.aprocess_query("tonight, Jokic's stats")
+    
+    assert asyncio.run(run()) == "jokic stats tonight"
+    assert len(threads) == 4
+    assert threading.main_thread() not in threads
+
+
+def test_transformer_over_budget_degrades_to_raw_embedding():
+    """Test a transform that outlives the budget is abandoned and the breaker then skips it."""
+    transformer = StubTransformer()
+    transform = transformer.transform
+    transformer.transform = lambda query: time.sleep(0.5) or transform(query)
+    service = SemanticService(
+        embedding_provider=StubEmbeddingProvider(),
+        storage=StubStore(),
+        query_transformer=transformer,
+        query_cache=QueryCache(max_size=100),
+        latency_budget_ms=50,
+        transformer_breaker=CircuitBreaker("transformer", min_calls=1)
+    )
+    service.storage.put("lakers score", service.embedding_provider.create("lakers score"))
+    
+    assert service.route_query("Jokic stats?") == QueryResult("Jokic stats?", "raw_miss", "transformer_timeout")
+    assert service.route_query("lakers lakers score") == QueryResult("lakers score", "raw_hit", "transformer_open")
+    assert len(service.storage.rows) == 1
+    assert service.query_cache.get("Jokic stats?") is None
+    assert service.stats()["degraded"]["transformer_timeout"] == 1
+    assert service.stats()["circuit_breakers"]["transformer"]["state"] == "open"
+
+
+def test_failing_transformer_opens_breaker(service):
+    """Test a transformer error routes on the raw embedding and counts as a breaker failure."""
+    def fail(query):
+        raise ConnectionError("ollama is down")
+    
+    async def afail(query):
+        fail(query)
+    
+    service.query_transformer.transform = fail
+    service.query_transformer.atransform = afail
+    service.transformer_breaker = CircuitBreaker("transformer", min_calls=2)
+    
+    assert service.route_query("Jokic stats?") == QueryResult("Jokic stats?", "raw_miss", "transformer_error")
+    assert asyncio.run(service.aroute_query("Lakers score?")).degraded == "transformer_error"
+    assert service.storage.rows == []
+    assert service.query_cache.get("Jokic stats?") is None
+    assert service.stats()["degraded"]["transformer_error"] == 2
+    assert service.stats()["circuit_breakers"]["transformer"]["state"] == "open"
+
+
+def test_open_embedding_breaker_passes_query_through(service):
+    """Test queries are returned unrouted while the embedding circuit is open."""
+    service.embedding_breaker = CircuitBreaker("embedding", min_calls=1)
+    service.embedding_breaker.record_failure(1.0)
+    
+    async def run():
+        return await service.aroute_query("Lakers score?")
+    
+    assert service.route_query("Lakers score?") == QueryResult("Lakers score?", "passthrough", "embedding_open")
+    assert asyncio.run(run()).degraded == "embedding_open"
+    assert service.query_transformer.calls == 0
+    assert service.route_query("Lakers score?").path == "passthrough"
+
+
+def test_alias_rows_resolve_repeated_phrasings_in_first_tier():
+    """Test a routed raw phrasing is stored as an alias and repeats skip the transformer."""
+    service = SemanticService(
+        embedding_provider=StubEmbeddingProvider(),
+        storage=StubStore(),
+        query_transformer=StubTransformer(),
+        alias_limit=1
+    )
+    
+    assert service.route_query("Lakers score?").path == "stored"
+    assert service.route_query("Lakers score?") == QueryResult("lakers score", "alias")
+    # Second-tier hit, but the entry already has its one alias
+    assert service.route_query("LAKERS SCORE???") == QueryResult("lakers score", "cached")
+    assert service.query_transformer.calls == 2
+    assert [row[3] for row in service.storage.rows] == [{}, {"alias_of": "0"}]
+    
+    tiers = service.stats()["tiers"]
+    assert (tiers["alias_hits"], tiers["second_tier_hits"], tiers["misses"]) == (1, 1, 1)
+    assert tiers["first_tier_hit_rate"] == pytest.approx(1 / 3)
+    
+    # Another worker over the same store sees the alias already stored
+    other = SemanticService(
+        embedding_provider=service.embedding_provider,
+        storage=service.storage,
+        query_transformer=StubTransformer(),
+        alias_limit=1
+    )
+    assert other.route_query("LAKERS SCORE???") == QueryResult("lakers score", "cached")
+    assert len(service.storage.rows) == 2
+
+
+def test_metrics_record_stages_and_paths():
+    """Test stage histograms and path counters follow the pipeline."""
+    metrics = ServiceMetrics(registry=CollectorRegistry())
+    service = SemanticService(
+        embedding_provider=StubEmbeddingProvider(),
+        storage=StubStore(),
+        query_transformer=StubTransformer(),
+        query_cache=QueryCache(max_size=100),
+        metrics=metrics
+    )
+    
+    for text in ["Lakers score?", "lakers score", "Lakers score?", "Lakers score???"]:
+        service.route_query(text)
+    
+    def value(name, **labels):
+        return metrics.registry.get_sample_value(f"semantic_router_{name}", labels)
+    
+    paths = ("stored", "high_confidence", "query_cache", "cached")
+    assert [value("queries_total", path=path) for path in paths] == [1, 1, 1, 1]
+    assert value("stage_seconds_count", stage="raw_embed") == 3
+    assert value("stage_seconds_count", stage="first_tier_find") == 3
+    assert value("stage_seconds_count", stage="transform") == 2
+    assert value("stage_seconds_count", stage="normalized_embed") == 2
+    assert value("stage_seconds_count", stage="second_tier_find") == 2
+    assert value("stage_seconds_count", stage="put") == 1
+    assert value("in_flight_requests") == 0
+
+
+def test_request_trace_records_stages_and_similarities(service):
+    """Test a traced request sees its stage durations and per-tier similarities on both paths."""
+    with trace_request() as trace:
+        assert service.route_query("Lakers score?").path == "stored"
+    assert list(trace.stages) == ["raw_embed", "first_tier_find", "transform", "normalized_embed", "second_tier_find", "put"]
+    assert trace.similarities == {"first_tier": None, "second_tier": None}
+    assert trace.server_timing().startswith("raw_embed;dur=")
+    
+    async def run():
+        with trace_request() as async_trace:
+            result = await service.aroute_query("Lakers score???")
+        return result, async_trace
+    
+    result, async_trace = asyncio.run(run())
+    assert result.path == "cached"
+    assert async_trace.to_dict()["similarities"] == {"first_tier": None, "second_tier": 1.0}
+    assert "put" not in async_trace.stages
+
+
+def test_debug_trace_reports_nearest_similarity_on_a_miss(service):
+    """Test a debug trace reports a missed tier's nearest similarity without recording a hit."""
+    service.route_query("Lakers score?")
+    lookups = []
+    find = service.storage.find
+    
+    def recording_find(*args, **kwargs):
+        lookups.append(kwargs.get("record_hits", True))
+        return find(*args, **kwargs)
+    
+    service.storage.find = recording_find
+    with trace_request(debug=True) as trace:
+        assert service.route_query("lakers score tonight").path == "stored"
+    similarity = trace.similarities["first_tier"]
+    assert similarity is not None and similarity < service.high_confidence_threshold
+    assert lookups.count(False) == 2
+    
+    async def run():
+        with trace_request(debug=True) as async_trace:
+            await service.aroute_query("jokic stats")
+        return async_trace
+    
+    assert asyncio.run(run()).similarities["first_tier"] is not None
+    with trace_request() as trace:
+        service.route_query("weather in denver")
+    assert trace.similarities["first_tier"] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
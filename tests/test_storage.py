@@ -1,22 +1,21 @@
 """Tests for storage layer."""
+import threading
 import pytest
-import os
-import shutil
 from storage.chroma_store import ChromaStore
+from storage.eviction import CacheEvictor, EvictionSignal
+from storage.write_behind import WriteBehindBuffer
 
 
 @pytest.fixture
-def temp_storage():
+def temp_storage(tmp_path):
     """Create temporary storage for testing."""
-    test_dir = "./test_chroma_db"
+    # A fresh directory per test: Chroma caches clients by path, so reusing a
+    # deleted directory leaves the next test with a read-only database
     store = ChromaStore(
         collection_name="test_collection",
-        persist_directory=test_dir
+        persist_directory=str(tmp_path / "chroma_db")
     )
     yield store
-    # Cleanup
-    if os.path.exists(test_dir):
-        shutil.rmtree(test_dir)
 
 
 def test_add_embedding(temp_storage):
@@ -55,7 +54,7 @@ def test_find_similar(temp_storage):
 def test_find_similar_threshold(temp_storage):
     """Test similarity threshold filtering."""
     embedding1 = [0.1] * 384
-    embedding2 = [0.9] * 384  # Very different embedding
+    embedding2 = [0.9, -0.9] * 192  # Orthogonal direction (cosine space ignores magnitude)
     
     temp_storage.put(
         query="test query",
@@ -72,5 +71,182 @@ def test_find_similar_threshold(temp_storage):
     assert all(r["similarity"] < 0.95 for r in results) or len(results) == 0
 
 
+
+def test_cosine_similarity(temp_storage):
+    """Test similarities are cosine similarities."""
+    temp_storage.put(query="x axis", embedding=[1.0, 0.0, 0.0])
+    
+    same_direction = temp_storage.find(embedding=[5.0, 0.0, 0.0], threshold=0.0)
+    diagonal = temp_storage.find(embedding=[1.0, 1.0, 0.0], threshold=0.0)
+    
+    assert same_direction[0]["similarity"] == pytest.approx(1.0, abs=1e-4)
+    assert diagonal[0]["similarity"] == pytest.approx(0.7071, abs=1e-3)
+
+
+def test_reindex_in_place_switches_to_cosine(tmp_path):
+    """Test reindexing an L2 collection keeps its rows and switches to cosine."""
+    from cli.reindex import reindex_in_place
+    from storage.chroma_store import hnsw_configuration
+    
+    store = ChromaStore(
+        collection_name="legacy_collection",
+        persist_directory=str(tmp_path / "chroma_db"),
+        configuration=hnsw_configuration(space="l2")
+    )
+    store.put(query="x axis", embedding=[1.0, 0.0, 0.0])
+    
+    copied = reindex_in_place(store.client, "legacy_collection", hnsw_configuration(), batch_size=1)
+    collection = store.client.get_collection(name="legacy_collection")
+    
+    assert copied == 1
+    assert collection.configuration["hnsw"]["space"] == "cosine"
+    assert collection.get()["documents"] == ["x axis"]
+
+
+def test_write_behind_put_is_visible_before_flush(tmp_path):
+    """Test buffered rows are searchable immediately and persisted after flush."""
+    store = ChromaStore(
+        collection_name="buffered_collection",
+        persist_directory=str(tmp_path / "chroma_db"),
+        write_behind=True,
+        write_behind_flush_ms=60000
+    )
+    embedding_id = store.put(query="x axis", embedding=[1.0, 0.0, 0.0])
+    
+    results = store.find(embedding=[1.0, 0.0, 0.0], threshold=0.9)
+    assert [item["id"] for item in results] == [embedding_id]
+    assert store.count() == 0
+    
+    store.flush()
+    results = store.find(embedding=[1.0, 0.0, 0.0], threshold=0.9)
+    
+    assert store.count() == 1
+    assert [item["id"] for item in results] == [embedding_id]
+    assert store.stats()["write_behind"] == {"pending": 0, "flushed": 1, "dropped": 0, "failed_flushes": 0}
+    store.close()
+
+
+def test_write_behind_surfaces_dropped_rows():
+    """Test rows dropped after repeated flush failures are counted and make flush() and close() raise."""
+    def fail(rows):
+        raise OSError("disk full")
+    
+    buffer = WriteBehindBuffer(fail, flush_interval_ms=1, max_attempts=2)
+    buffer.add([{"id": "a", "embedding": [1.0], "document": "a", "metadata": {}}])
+    with pytest.raises(RuntimeError, match="dropped 1 rows"):
+        buffer.flush()
+    buffer.flush()
+    assert buffer.stats() == {"pending": 0, "flushed": 0, "dropped": 1, "failed_flushes": 2}
+    with pytest.raises(RuntimeError, match="dropped 1 rows"):
+        buffer.close()
+
+
+def test_evict_removes_expired_then_least_hit_rows(tmp_path, capfd):
+    """Test eviction drops expired rows first, then the coldest rows above capacity."""
+    store = ChromaStore(
+        collection_name="bounded_collection",
+        persist_directory=str(tmp_path / "chroma_db"),
+        max_entries=2,
+        max_age_seconds=3600
+    )
+    old_id = store.put(query="old", embedding=[1.0, 1.0, 0.0], metadata={"created_at": 0.0})
+    hot_id = store.put(query="hot", embedding=[1.0, 0.0, 0.0])
+    cold_id = store.put(query="cold", embedding=[0.0, 1.0, 0.0])
+    warm_id = store.put(query="warm", embedding=[0.0, 0.0, 1.0])
+    deleted = []
+    store.add_eviction_listener(deleted.extend)
+    
+    store.find(embedding=[1.0, 0.0, 0.0], threshold=0.99)
+    store.find(embedding=[1.0, 0.0, 0.0], threshold=0.99)
+    store.find(embedding=[0.0, 0.0, 1.0], threshold=0.99)
+    # Diagnostic lookups do not keep a row warm
+    assert store.find(embedding=[0.0, 1.0, 0.0], threshold=-1.0, top_k=1, record_hits=False)[0]["id"] == cold_id
+    
+    removed = store.evict()
+    remaining = store.collection.get(include=["metadatas"])
+    hits = dict(zip(remaining["ids"], (metadata["hits"] for metadata in remaining["metadatas"])))
+    
+    assert removed == 2
+    assert hits == {hot_id: 2, warm_id: 1}
+    assert old_id not in hits and cold_id not in hits
+    assert sorted(deleted) == sorted([old_id, cold_id])
+    assert store.stats()["eviction"]["expired"] == 1
+    assert store.stats()["eviction"]["evicted"] == 1
+    
+    capfd.readouterr()
+    store.compact()
+    assert store.count() == 2
+    assert store.stats()["eviction"]["compactions"] == 1
+    # The vacuum command's terminal output stays out of the service's stdout
+    assert capfd.readouterr().out == ""
+
+
+def test_ttl_covers_rows_without_created_at(tmp_path):
+    """Test legacy rows get created_at from their timestamp before the TTL filter runs."""
+    store = ChromaStore(
+        collection_name="legacy_collection",
+        persist_directory=str(tmp_path / "chroma_db"),
+        max_age_seconds=3600
+    )
+    store.collection.add(
+        ids=["old", "undated"],
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+        documents=["old", "undated"],
+        metadatas=[{"timestamp": "2020-01-01T00:00:00"}, {"hits": 0}]
+    )
+    
+    assert store.evict() == 1
+    remaining = store.collection.get(include=["metadatas"])
+    assert remaining["ids"] == ["undated"]
+    assert remaining["metadatas"][0]["created_at"] > 0
+
+
+def test_only_the_lock_owner_evicts(tmp_path):
+    """Test processes sharing a store elect one evictor; the others only persist hit counts."""
+    stores = [ChromaStore(
+        collection_name="shared_collection",
+        persist_directory=str(tmp_path / "chroma_db"),
+        max_entries=1
+    ) for _ in range(2)]
+    lock_path = str(tmp_path / "evictor.lock")
+    owner, follower = (CacheEvictor(store, lock_path=lock_path) for store in stores)
+    assert owner.run_once() == 0
+    entry_id = stores[0].put(query="hot", embedding=[1.0, 0.0, 0.0])
+    stores[0].put(query="cold", embedding=[0.0, 1.0, 0.0])
+    
+    stores[1].find(embedding=[1.0, 0.0, 0.0], threshold=0.99)
+    assert follower.run_once() == 0
+    assert owner.owner and not follower.owner
+    assert stores[0].collection.get(ids=[entry_id])["metadatas"][0]["hits"] == 1
+    
+    owner.stop()
+    assert follower.run_once() == 1
+    assert follower.owner
+    follower.stop()
+
+
+def test_eviction_signal_reaches_other_processes(tmp_path):
+    """Test a watcher in another process hears of evictions its own store never sees."""
+    store = ChromaStore(
+        collection_name="signal_collection",
+        persist_directory=str(tmp_path / "chroma_db"),
+        max_entries=1
+    )
+    path = str(tmp_path / "evictions.signal")
+    store.add_eviction_listener(EvictionSignal(path).notify)
+    watcher = EvictionSignal(path)
+    cleared = threading.Event()
+    watcher.watch(cleared.set, interval_seconds=0.01)
+    
+    store.put(query="first", embedding=[1.0, 0.0, 0.0])
+    assert not cleared.wait(0.1)
+    store.put(query="second", embedding=[0.0, 1.0, 0.0])
+    assert store.evict() == 1
+    assert cleared.wait(2.0)
+    watcher.stop()
+    assert watcher.stats()["changes"] == 1
+    assert not watcher.changed()
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
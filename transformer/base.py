@@ -1,4 +1,5 @@
 """Abstract base class for query transformer implementations."""
+import asyncio
 from abc import ABC, abstractmethod
 
 
@@ -12,15 +13,33 @@ class QueryTransformer(ABC):
         
         Args:
             query: User query text
-            
+        
         Returns:
             Normalized search query string
-            
+        
         Raises:
             Exception: If transformation fails
         """
         pass
     
+    async def atransform(self, query: str) -> str:
+        """
+        Asynchronously transform user query into a normalized search query.
+        
+        Backends with a native async client should override this; the default
+        runs transform() in a worker thread.
+        
+        Args:
+            query: User query text
+        
+        Returns:
+            Normalized search query string
+        
+        Raises:
+            Exception: If transformation fails
+        """
+        return await asyncio.to_thread(self.transform, query)
+    
     @abstractmethod
     def ping(self) -> bool:
         """
@@ -28,7 +47,7 @@ class QueryTransformer(ABC):
         
         Returns:
             True if the service is accessible, False otherwise
-            
+        
         Raises:
             Exception: If the service connection fails
         """
@@ -0,0 +1,190 @@
+"""Caching query transformer with in-memory LRU and persistent SQLite tiers."""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from core.lru_cache import LRUCache
+from transformer.base import QueryTransformer
+
+logger = logging.getLogger(__name__)
+
+
+class CachingQueryTransformer(QueryTransformer):
+    """
+    Query transformer decorator that memoizes normalizations.
+    
+    Results are keyed by (model, prompt version, raw query), kept in an LRU
+    with TTL and persisted to SQLite so restarts and other workers reuse them.
+    The model and prompt version are read from the wrapped transformer when it
+    exposes them, so any QueryTransformer can be wrapped.
+    """
+    
+    def __init__(
+        self,
+        transformer: QueryTransformer,
+        cache_path: Optional[str] = None,
+        memory_size: int = 4096,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600
+    ):
+        """
+        Initialize caching query transformer.
+        
+        Args:
+            transformer: Wrapped query transformer
+            cache_path: SQLite file for the persistent tier (None keeps memory only)
+            memory_size: Number of normalizations kept in the in-memory LRU tier
+            ttl_seconds: Lifetime of a cached normalization (None disables expiry)
+        """
+        self.transformer = transformer
+        self.model = getattr(transformer, "model", type(transformer).__name__)
+        self.prompt_version = getattr(transformer, "prompt_version", "")
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds or None
+        self._memory = LRUCache(max_size=memory_size, ttl_seconds=ttl_seconds)
+        self._disk_hits = 0
+        self._lock = threading.Lock()
+        self._conn = self._open(cache_path) if cache_path else None
+    
+    @staticmethod
+    def _open(cache_path: str) -> sqlite3.Connection:
+        """Open (and create if needed) the shared SQLite cache."""
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS transforms ("
+            "model TEXT NOT NULL, "
+            "prompt_version TEXT NOT NULL, "
+            "query TEXT NOT NULL, "
+            "normalized TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "PRIMARY KEY (model, prompt_version, query))"
+        )
+        conn.commit()
+        return conn
+    
+    def _load(self, query: str) -> Optional[str]:
+        """Read a non-expired normalization from the persistent tier."""
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT normalized, created_at FROM transforms "
+                "WHERE model = ? AND prompt_version = ? AND query = ?",
+                (self.model, self.prompt_version, query)
+            ).fetchone()
+        if row is None:
+            return None
+        normalized, created_at = row
+        if self.ttl_seconds and created_at + self.ttl_seconds <= time.time():
+            return None
+        return normalized
+    
+    def _save(self, query: str, normalized: str) -> None:
+        """Write a normalization to the persistent tier."""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO transforms "
+                    "(model, prompt_version, query, normalized, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.model, self.prompt_version, query, normalized, time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist cached transformation: {e}")
+    
+    def _lookup(self, query: str, persistent: bool = True) -> Optional[str]:
+        """Look a normalization up in the memory tier, then (if persistent) the persistent tier."""
+        key = (self.model, self.prompt_version, query)
+        normalized = self._memory.get(key)
+        if normalized is not None or not persistent:
+            return normalized
+        
+        normalized = self._load(query)
+        if normalized is not None:
+            self._disk_hits += 1
+            self._memory.set(key, normalized)
+        return normalized
+    
+    def _remember(self, query: str, normalized: str) -> None:
+        """Cache a fresh normalization in memory."""
+        # Queries already in normal form are cached too: transformers raise on
+        # failure rather than echo the query, so an identity result is a real answer
+        self._memory.set((self.model, self.prompt_version, query), normalized)
+    
+    def transform(self, query: str) -> str:
+        """
+        Transform user query, serving cached normalizations when possible.
+        
+        Args:
+            query: User query text
+        
+        Returns:
+            Normalized search query string
+        
+        Raises:
+            Exception: If transformation fails
+        """
+        normalized = self._lookup(query)
+        if normalized is not None:
+            return normalized
+        
+        normalized = self.transformer.transform(query)
+        self._remember(query, normalized)
+        self._save(query, normalized)
+        return normalized
+    
+    async def atransform(self, query: str) -> str:
+        """
+        Asynchronously transform user query, serving cached normalizations when possible.
+        
+        Args:
+            query: User query text
+        
+        Returns:
+            Normalized search query string
+        
+        Raises:
+            Exception: If transformation fails
+        """
+        normalized = self._lookup(query, persistent=False)
+        if normalized is None and self._conn is not None:
+            # SQLite reads may wait on another worker's write lock; keep them off the event loop
+            normalized = await asyncio.to_thread(self._lookup, query)
+        if normalized is not None:
+            return normalized
+        
+        normalized = await self.transformer.atransform(query)
+        self._remember(query, normalized)
+        await asyncio.to_thread(self._save, query, normalized)
+        return normalized
+    
+    def ping(self) -> bool:
+        """
+        Check if the wrapped transformer service is accessible and healthy.
+        
+        Returns:
+            True if the service is accessible, False otherwise
+        
+        Raises:
+            Exception: If the service connection fails
+        """
+        return self.transformer.ping()
+    
+    def stats(self) -> Dict:
+        """Return hit counters for both cache tiers."""
+        memory = self._memory.stats()
+        return {
+            "memory_hits": memory["hits"],
+            "disk_hits": self._disk_hits,
+            "misses": memory["misses"] - self._disk_hits,
+            "memory_size": memory["size"],
+        }
@@ -1,22 +1,54 @@
 """Ollama query transformer implementation."""
 import ollama
+import hashlib
 import logging
+from typing import Optional, Union
+from core.ollama_pool import OllamaPool, check_model
 from transformer.base import QueryTransformer
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "You are a query normalization assistant. Transform user queries into clean, normalized web search queries."
+
+USER_PROMPT_TEMPLATE = "Transform this user query into a normalized search query. Return only the normalized query, nothing else:\n\n{query}"
+
+# Changes whenever the prompts change, so cached normalizations are not reused across prompt edits
+PROMPT_VERSION = hashlib.sha256(f"{SYSTEM_PROMPT}\n{USER_PROMPT_TEMPLATE}".encode("utf-8")).hexdigest()[:12]
+
 
 class OllamaQueryTransformer(QueryTransformer):
     """Transformer that uses Ollama LLM to normalize queries."""
     
-    def __init__(self, model: str):
+    def __init__(
+        self,
+        model: str,
+        timeout: Optional[float] = None,
+        pool: Optional[OllamaPool] = None,
+        keep_alive: Optional[Union[float, str]] = None
+    ):
         """
         Initialize Ollama query transformer.
         
         Args:
             model: The LLM model to use for transformation (e.g., 'gemma2:2b')
+            timeout: Seconds before an Ollama request is abandoned (None waits indefinitely)
+            pool: Load-balanced backends to use instead of the default host
+            keep_alive: How long Ollama keeps the model loaded after each request
+                (negative pins it, None uses the server default)
         """
         self.model = model
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.client = pool if pool is not None else ollama.Client(timeout=timeout)
+        self.prompt_version = PROMPT_VERSION
+        self._async_client = pool.async_client if pool is not None else None
+    
+    @property
+    def async_client(self) -> ollama.AsyncClient:
+        """Lazily created async client (bound to the event loop that first uses it)."""
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient(timeout=self.timeout)
+        return self._async_client
     
     def transform(self, query: str) -> str:
         """
@@ -24,65 +56,114 @@ class OllamaQueryTransformer(QueryTransformer):
         
         Args:
             query: User query text
-            
+        
         Returns:
             Normalized search query string
-            
+        
         Raises:
-            Exception: If transformation fails
+            Exception: If the Ollama request fails (callers decide how to degrade)
         """
         try:
-            prompt = f"Transform this user query into a normalized search query. Return only the normalized query, nothing else:\n\n{query}"
-            
-            response = ollama.chat(
+            response = self.client.chat(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a query normalization assistant. Transform user queries into clean, normalized web search queries."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+                messages=self._messages(query),
+                keep_alive=self.keep_alive
             )
-            
-            normalized_query = response["message"]["content"].strip()
-            
-            if not normalized_query:
-                logger.warning("Transformer returned empty query, using original")
-                return query
-            print(f"Transformed query: '{query}' -> '{normalized_query}'")
-            logger.debug(f"Transformed query: '{query}' -> '{normalized_query}'")
-            return normalized_query
-            
+            return self._parse_response(query, response)
+        
         except Exception as e:
             logger.error(f"Failed to transform query: {e}")
-            logger.warning("Using original query due to transformation failure")
-            return query
+            raise
+    
+    async def atransform(self, query: str) -> str:
+        """
+        Transform user query into a normalized search query with the async Ollama client.
+        
+        Args:
+            query: User query text
+        
+        Returns:
+            Normalized search query string
+        
+        Raises:
+            Exception: If the Ollama request fails (callers decide how to degrade)
+        """
+        try:
+            response = await self.async_client.chat(
+                model=self.model,
+                messages=self._messages(query),
+                keep_alive=self.keep_alive
+            )
+            return self._parse_response(query, response)
+        
+        except Exception as e:
+            logger.error(f"Failed to transform query: {e}")
+            raise
+    
+    @staticmethod
+    def _messages(query: str) -> list:
+        """Build the chat messages for normalizing a query."""
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": USER_PROMPT_TEMPLATE.format(query=query)
+            }
+        ]
+    
+    @staticmethod
+    def _parse_response(query: str, response) -> str:
+        """
+        Extract the normalized query from a chat response.
+        
+        Raises:
+            ValueError: If the model returned no text (a failed transform, like any other)
+        """
+        normalized_query = response["message"]["content"].strip()
+        
+        if not normalized_query:
+            raise ValueError("Transformer returned an empty query")
+        logger.debug(f"Transformed query: '{query}' -> '{normalized_query}'")
+        return normalized_query
     
     def ping(self) -> bool:
         """
-        Check if Ollama is accessible and healthy.
+        Check that Ollama is reachable and has the model pulled.
+        
+        Only lists the server's models, so it neither loads the model nor
+        generates anything.
         
         Returns:
             True if Ollama is accessible, False otherwise
-            
+        
         Raises:
             Exception: If the service connection fails
         """
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{"role": "user", "content": "ping"}]
-            )
-            if response.get("message", {}).get("content"):
-                logger.info("Ollama transformer ping successful")
-                return True
-            else:
-                raise Exception("Ollama returned empty response")
+            check_model(self.client, self.model)
+            logger.info("Ollama transformer ping successful")
+            return True
         except Exception as e:
             logger.error(f"Ollama transformer ping failed: {e}")
             raise
+    
+    def warm_up(self) -> None:
+        """
+        Load the model on every Ollama host with this transformer's keep_alive.
+        
+        A chat request without messages loads the model without generating.
+        
+        Raises:
+            Exception: If no host could load the model
+        """
+        request = {"model": self.model, "messages": [], "keep_alive": self.keep_alive}
+        for_each = getattr(self.client, "for_each", None)
+        if callable(for_each):
+            for_each("chat", **request)
+        else:
+            self.client.chat(**request)
+        logger.info(f"Transformer model {self.model} loaded")
 
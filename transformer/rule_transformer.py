@@ -0,0 +1,130 @@
+"""Deterministic rule-based query transformer."""
+import json
+import logging
+import re
+import unicodedata
+from typing import Dict, FrozenSet, List, Optional
+from transformer.base import QueryTransformer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STOPWORDS = frozenset("""
+a an the is are was were be been being am do does did doing have has had
+i me my we our you your he him his she her it its they them their
+what which that this these those of for in on at to from by with about
+and or but if then so than as into over
+can could would should will shall may might must
+please tell show give find get know want need let lets
+any some just now also really very
+""".split())
+
+_POSSESSIVE = re.compile(r"['’]s\b")
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def light_stem(token: str) -> str:
+    """
+    Strip common English plural endings.
+    
+    Deliberately conservative: only plurals are folded, so "scores" and
+    "score" meet while "scoring" and "scored" keep their meaning.
+    
+    Args:
+        token: Lowercase word
+    
+    Returns:
+        Singular form of the word (or the word itself)
+    """
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith(("sses", "shes", "ches", "xes", "zes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def load_aliases(path: str) -> Dict[str, str]:
+    """Read an alias table (JSON object of phrase -> canonical phrase)."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RuleBasedQueryTransformer(QueryTransformer):
+    """
+    CPU-only normalizer: Unicode/case folding, punctuation and possessive
+    stripping, alias substitution, stopword removal and light stemming.
+    
+    The same input always produces the same output, and no model is involved,
+    so it costs microseconds instead of an LLM round trip. Aliases map phrases
+    (after folding) to canonical phrases, e.g. "king james" -> "lebron james";
+    the longest matching phrase wins and canonical phrases are not stemmed.
+    """
+    
+    def __init__(
+        self,
+        aliases: Optional[Dict[str, str]] = None,
+        stopwords: FrozenSet[str] = DEFAULT_STOPWORDS
+    ):
+        """
+        Initialize rule-based transformer.
+        
+        Args:
+            aliases: Phrase -> canonical phrase table (see load_aliases)
+            stopwords: Words dropped from the output
+        """
+        self.stopwords = stopwords
+        self.aliases: Dict[tuple, List[str]] = {}
+        for phrase, canonical in (aliases or {}).items():
+            key = tuple(self._fold(phrase))
+            if key:
+                self.aliases[key] = self._fold(canonical)
+                # Canonical phrases map to themselves, so "lebron james" is not
+                # expanded again by a "lebron" alias
+                self.aliases.setdefault(tuple(self.aliases[key]), self.aliases[key])
+        self._max_alias_length = max((len(key) for key in self.aliases), default=0)
+    
+    @staticmethod
+    def _fold(text: str) -> List[str]:
+        """Fold Unicode and case, drop possessives and punctuation, and split into words."""
+        text = unicodedata.normalize("NFKC", text).casefold()
+        text = _POSSESSIVE.sub("", text)
+        return _NON_WORD.sub(" ", text).split()
+    
+    def transform(self, query: str) -> str:
+        """
+        Normalize a query with the rule pipeline.
+        
+        Args:
+            query: User query text
+        
+        Returns:
+            Normalized query (the folded query if every word is a stopword)
+        """
+        tokens = self._fold(query)
+        output: List[str] = []
+        i = 0
+        while i < len(tokens):
+            for length in range(min(self._max_alias_length, len(tokens) - i), 0, -1):
+                canonical = self.aliases.get(tuple(tokens[i:i + length]))
+                if canonical is not None:
+                    output.extend(canonical)
+                    i += length
+                    break
+            else:
+                token = tokens[i]
+                if token not in self.stopwords:
+                    output.append(light_stem(token))
+                i += 1
+        return " ".join(output) if output else " ".join(tokens)
+    
+    def ping(self) -> bool:
+        """
+        Rule-based transformation needs no external service.
+        
+        Returns:
+            Always True
+        """
+        return True
@@ -0,0 +1,119 @@
+"""Tiered query transformer: cheap rules first, LLM only on a cache miss."""
+import asyncio
+import logging
+import threading
+from typing import Dict
+from providers.base import EmbeddingProvider
+from storage.base import VectorStore
+from transformer.base import QueryTransformer
+
+logger = logging.getLogger(__name__)
+
+
+class TieredQueryTransformer(QueryTransformer):
+    """
+    Transformer that accepts the fast transformer's output when it is already cached.
+    
+    The fast (rule-based) output is embedded and looked up at the service's
+    similarity threshold. On a hit, that output is returned and the service
+    routes it to the cached query exactly as it would an LLM normalization;
+    only on a miss is the fallback (LLM) transformer called, so repeated
+    traffic never reaches the LLM.
+    """
+    
+    def __init__(
+        self,
+        fast: QueryTransformer,
+        fallback: QueryTransformer,
+        embedding_provider: EmbeddingProvider,
+        storage: VectorStore,
+        similarity_threshold: float = 0.85
+    ):
+        """
+        Initialize tiered transformer.
+        
+        Args:
+            fast: Cheap deterministic transformer tried first
+            fallback: Expensive transformer used when the fast output misses the cache
+            embedding_provider: Provider used to embed the fast output
+            storage: Store the fast output is looked up in
+            similarity_threshold: Similarity the fast output needs to be accepted
+        """
+        self.fast = fast
+        self.fallback = fallback
+        self.embedding_provider = embedding_provider
+        self.storage = storage
+        self.similarity_threshold = similarity_threshold
+        self.fast_hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+    
+    def _count(self, fast_hit: bool) -> None:
+        """Increment the outcome counter."""
+        with self._lock:
+            if fast_hit:
+                self.fast_hits += 1
+            else:
+                self.fallbacks += 1
+    
+    def transform(self, query: str) -> str:
+        """
+        Transform with the fast tier, falling back when its output is not cached.
+        
+        Args:
+            query: User query text
+        
+        Returns:
+            Normalized search query string
+        """
+        candidate = self.fast.transform(query)
+        similar_items = self.storage.find(
+            embedding=self.embedding_provider.create(candidate),
+            threshold=self.similarity_threshold,
+            top_k=1
+        )
+        self._count(bool(similar_items))
+        if similar_items:
+            logger.debug(f"Rule-based normalization '{candidate}' is cached, skipping LLM")
+            return candidate
+        return self.fallback.transform(query)
+    
+    async def atransform(self, query: str) -> str:
+        """
+        Asynchronously transform with the fast tier, falling back on a miss.
+        
+        Args:
+            query: User query text
+        
+        Returns:
+            Normalized search query string
+        """
+        candidate = self.fast.transform(query)
+        embedding = await self.embedding_provider.acreate(candidate)
+        similar_items = await asyncio.to_thread(
+            self.storage.find,
+            embedding=embedding,
+            threshold=self.similarity_threshold,
+            top_k=1
+        )
+        self._count(bool(similar_items))
+        if similar_items:
+            return candidate
+        return await self.fallback.atransform(query)
+    
+    def ping(self) -> bool:
+        """
+        Check that the fallback transformer is reachable.
+        
+        Returns:
+            True if the fallback service is accessible
+        """
+        return self.fast.ping() and self.fallback.ping()
+    
+    def stats(self) -> Dict:
+        """Return tier counters plus the fallback transformer's counters."""
+        tier_stats = {"fast_hits": self.fast_hits, "fallbacks": self.fallbacks}
+        fallback_stats = getattr(self.fallback, "stats", None)
+        if callable(fallback_stats):
+            tier_stats["fallback"] = fallback_stats()
+        return tier_stats